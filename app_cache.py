@@ -4,8 +4,12 @@
 
 from __future__ import annotations
 
+from collections.abc import Iterable
+from dataclasses import dataclass
 from pathlib import Path
+import hashlib
 import sqlite3
+import time
 
 from platformdirs import user_cache_path
 
@@ -14,10 +18,43 @@ APP_NAME = "world-stage-recap-maker"
 DATABASE_FILENAME = "world-stage-cache.sqlite3"
 
 
+@dataclass(frozen=True)
+class MultipartUpload:
+    """An unfinished multipart upload and the parts S3 has already accepted."""
+
+    upload_id: str
+    source_path: str
+    size: int
+    mtime_ns: int
+    part_size: int
+    parts: dict[int, str]
+
+
+@dataclass(frozen=True)
+class PartialDownload:
+    """An interrupted download and what the server promised when it started."""
+
+    url: str
+    expected_size: int | None
+    validator: str | None
+
+
 def database_path() -> Path:
     return Path(user_cache_path(APP_NAME, appauthor=False, ensure_exists=True)) / DATABASE_FILENAME
 
 
+def downloads_directory(output_directory: Path) -> Path:
+    """Return the persistent home of one output directory's batch downloads.
+
+    Interrupted downloads resume in a later run, while concurrent runs into
+    other output directories never touch each other's working files.
+    """
+    key = hashlib.sha256(str(output_directory.resolve()).encode("utf-8")).hexdigest()[:16]
+    path = Path(user_cache_path(APP_NAME, appauthor=False, ensure_exists=True)) / "downloads" / key
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
 def _connect() -> sqlite3.Connection:
     connection = sqlite3.connect(database_path(), timeout=30)
     connection.execute("PRAGMA busy_timeout = 30000")
@@ -51,6 +88,54 @@ def initialize_database() -> Path:
             )
             """
         )
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(upload_cache)")}
+        if "content_md5" not in columns:
+            conn.execute("ALTER TABLE upload_cache ADD COLUMN content_md5 TEXT")
+        if "etag" not in columns:
+            conn.execute("ALTER TABLE upload_cache ADD COLUMN etag TEXT")
+        digest_keys = [row[1] for row in conn.execute("PRAGMA table_info(file_digests)") if row[5]]
+        if digest_keys == ["source_path"]:
+            # Digests used to be kept for one part size per file; they are only a cache.
+            conn.execute("DROP TABLE file_digests")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS file_digests (
+                source_path TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                part_size INTEGER NOT NULL,
+                content_md5 TEXT NOT NULL,
+                etag TEXT NOT NULL,
+                PRIMARY KEY (source_path, part_size)
+            )
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS multipart_uploads (
+                endpoint_url TEXT NOT NULL,
+                bucket TEXT NOT NULL,
+                object_name TEXT NOT NULL,
+                upload_id TEXT NOT NULL,
+                source_path TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                part_size INTEGER NOT NULL,
+                started_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (endpoint_url, bucket, object_name)
+            )
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS multipart_upload_parts (
+                upload_id TEXT NOT NULL,
+                part_number INTEGER NOT NULL,
+                etag TEXT NOT NULL,
+                PRIMARY KEY (upload_id, part_number)
+            )
+            """
+        )
         conn.execute(
             """
             CREATE TABLE IF NOT EXISTS recap_api_cache (
@@ -61,6 +146,28 @@ def initialize_database() -> Path:
             )
             """
         )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS partial_downloads (
+                path TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                expected_size INTEGER,
+                validator TEXT,
+                updated_at INTEGER NOT NULL
+            )
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS youtube_info_cache (
+                video_id TEXT NOT NULL,
+                attestation_mode TEXT NOT NULL,
+                info BLOB NOT NULL,
+                extracted_at INTEGER NOT NULL,
+                PRIMARY KEY (video_id, attestation_mode)
+            )
+            """
+        )
     return database
 
 
@@ -83,35 +190,171 @@ def store_recap_fingerprint(output: Path, fingerprint: str) -> None:
         )
 
 
-def is_cached_upload(path: Path, endpoint_url: str, bucket: str, object_name: str | None = None) -> bool:
+def is_cached_upload(
+    path: Path,
+    endpoint_url: str,
+    bucket: str,
+    object_name: str | None = None,
+    *,
+    content_md5: str | None = None,
+    etag: str | None = None,
+) -> bool:
+    """Return whether an object was uploaded from this file or from identical content.
+
+    Without a digest only the resolved path, size and modification time are
+    compared.  When the caller supplies the file's MD5 and S3-style ETag, a
+    matching stored digest or remote ETag is accepted even if the file's
+    metadata has changed.
+    """
     stat = path.stat()
     object_name = object_name or path.name
     with _connect() as conn:
         row = conn.execute(
             """
-            SELECT source_path, size, mtime_ns FROM upload_cache
+            SELECT source_path, size, mtime_ns, content_md5, etag FROM upload_cache
             WHERE endpoint_url = ? AND bucket = ? AND object_name = ?
             """,
             (endpoint_url, bucket, object_name),
         ).fetchone()
-    return row == (str(path.resolve()), stat.st_size, stat.st_mtime_ns)
+    if row is None:
+        return False
+    if tuple(row[:3]) == (str(path.resolve()), stat.st_size, stat.st_mtime_ns):
+        return True
+    if row[1] != stat.st_size:
+        return False
+    return bool(
+        (content_md5 is not None and row[3] == content_md5)
+        or (etag is not None and row[4] is not None and row[4] in {etag, content_md5})
+    )
 
 
-def store_upload(path: Path, endpoint_url: str, bucket: str, object_name: str | None = None) -> None:
+def store_upload(
+    path: Path,
+    endpoint_url: str,
+    bucket: str,
+    object_name: str | None = None,
+    *,
+    content_md5: str | None = None,
+    etag: str | None = None,
+) -> None:
     stat = path.stat()
     object_name = object_name or path.name
     with _connect() as conn:
         conn.execute(
             """
-            INSERT INTO upload_cache (endpoint_url, bucket, object_name, source_path, size, mtime_ns)
-            VALUES (?, ?, ?, ?, ?, ?)
+            INSERT INTO upload_cache
+                (endpoint_url, bucket, object_name, source_path, size, mtime_ns, content_md5, etag)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
             ON CONFLICT(endpoint_url, bucket, object_name) DO UPDATE SET
                 source_path = excluded.source_path,
                 size = excluded.size,
                 mtime_ns = excluded.mtime_ns,
+                content_md5 = excluded.content_md5,
+                etag = excluded.etag,
                 uploaded_at = CURRENT_TIMESTAMP
             """,
-            (endpoint_url, bucket, object_name, str(path.resolve()), stat.st_size, stat.st_mtime_ns),
+            (endpoint_url, bucket, object_name, str(path.resolve()), stat.st_size, stat.st_mtime_ns,
+             content_md5, etag),
+        )
+
+
+def remote_upload_record(endpoint_url: str, bucket: str, object_name: str) -> tuple[int, str] | None:
+    """Return the size and ETag of an object known only from a bucket listing."""
+    with _connect() as conn:
+        row = conn.execute(
+            """
+            SELECT size, etag FROM upload_cache
+            WHERE endpoint_url = ? AND bucket = ? AND object_name = ? AND source_path = ''
+                AND etag IS NOT NULL
+            """,
+            (endpoint_url, bucket, object_name),
+        ).fetchone()
+    return None if row is None else (int(row[0]), str(row[1]))
+
+
+def reconcile_uploads(
+    endpoint_url: str, bucket: str, prefix: str, objects: Iterable[tuple[str, int, str]],
+) -> tuple[int, int]:
+    """Replace cached upload knowledge under ``prefix`` with a bucket listing.
+
+    ``objects`` yields ``(object_name, size, etag)``.  Records whose size and
+    ETag still agree with the bucket keep their local source details; other
+    listed objects become remote-only records that later uploads verify by
+    content digest.  Records for objects missing from the listing are removed.
+    Returns the number of listed objects and of removed records.
+    """
+    with _connect() as conn:
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS listed_objects (object_name TEXT PRIMARY KEY)")
+        conn.execute("DELETE FROM listed_objects")
+        listed = 0
+        for name, size, etag in objects:
+            listed += 1
+            conn.execute("INSERT OR IGNORE INTO listed_objects (object_name) VALUES (?)", (name,))
+            # A record the bucket contradicts no longer describes a local source.
+            conn.execute(
+                """
+                UPDATE upload_cache SET source_path = '', mtime_ns = 0, content_md5 = NULL
+                WHERE endpoint_url = ? AND bucket = ? AND object_name = ?
+                    AND (size != ? OR (etag IS NOT NULL AND etag != ?))
+                """,
+                (endpoint_url, bucket, name, size, etag),
+            )
+            conn.execute(
+                """
+                INSERT INTO upload_cache (endpoint_url, bucket, object_name, source_path, size, mtime_ns, etag)
+                VALUES (?, ?, ?, '', ?, 0, ?)
+                ON CONFLICT(endpoint_url, bucket, object_name) DO UPDATE SET
+                    size = excluded.size,
+                    etag = excluded.etag
+                """,
+                (endpoint_url, bucket, name, size, etag),
+            )
+        removed = conn.execute(
+            """
+            DELETE FROM upload_cache
+            WHERE endpoint_url = ? AND bucket = ? AND substr(object_name, 1, ?) = ?
+                AND object_name NOT IN (SELECT object_name FROM listed_objects)
+            """,
+            (endpoint_url, bucket, len(prefix), prefix),
+        ).rowcount
+        conn.execute("DROP TABLE listed_objects")
+    return listed, removed
+
+
+def cached_file_digest(path: Path, part_size: int) -> tuple[str, str] | None:
+    """Return a file's cached MD5 and S3-style ETag if it is unchanged since hashing."""
+    stat = path.stat()
+    with _connect() as conn:
+        row = conn.execute(
+            """
+            SELECT content_md5, etag FROM file_digests
+            WHERE source_path = ? AND size = ? AND mtime_ns = ? AND part_size = ?
+            """,
+            (str(path.resolve()), stat.st_size, stat.st_mtime_ns, part_size),
+        ).fetchone()
+    return None if row is None else (str(row[0]), str(row[1]))
+
+
+def store_file_digest(path: Path, part_size: int, content_md5: str, etag: str) -> None:
+    """Record a file's digest for one part size, forgetting digests of its earlier contents."""
+    stat = path.stat()
+    source_path = str(path.resolve())
+    with _connect() as conn:
+        conn.execute(
+            "DELETE FROM file_digests WHERE source_path = ? AND (size != ? OR mtime_ns != ?)",
+            (source_path, stat.st_size, stat.st_mtime_ns),
+        )
+        conn.execute(
+            """
+            INSERT INTO file_digests (source_path, size, mtime_ns, part_size, content_md5, etag)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(source_path, part_size) DO UPDATE SET
+                size = excluded.size,
+                mtime_ns = excluded.mtime_ns,
+                content_md5 = excluded.content_md5,
+                etag = excluded.etag
+            """,
+            (source_path, stat.st_size, stat.st_mtime_ns, part_size, content_md5, etag),
         )
 
 
@@ -120,6 +363,110 @@ def clear_upload_cache() -> None:
         conn.execute("DELETE FROM upload_cache")
 
 
+def cached_multipart_upload(endpoint_url: str, bucket: str, object_name: str) -> MultipartUpload | None:
+    with _connect() as conn:
+        row = conn.execute(
+            """
+            SELECT upload_id, source_path, size, mtime_ns, part_size FROM multipart_uploads
+            WHERE endpoint_url = ? AND bucket = ? AND object_name = ?
+            """,
+            (endpoint_url, bucket, object_name),
+        ).fetchone()
+        if row is None:
+            return None
+        parts = dict(conn.execute(
+            "SELECT part_number, etag FROM multipart_upload_parts WHERE upload_id = ?", (row[0],)
+        ).fetchall())
+    return MultipartUpload(str(row[0]), str(row[1]), int(row[2]), int(row[3]), int(row[4]), parts)
+
+
+def store_multipart_upload(
+    path: Path, endpoint_url: str, bucket: str, object_name: str, upload_id: str, part_size: int,
+) -> None:
+    """Remember a newly created multipart upload so an interrupted run can resume it."""
+    stat = path.stat()
+    with _connect() as conn:
+        conn.execute(
+            """
+            INSERT INTO multipart_uploads
+                (endpoint_url, bucket, object_name, upload_id, source_path, size, mtime_ns, part_size)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(endpoint_url, bucket, object_name) DO UPDATE SET
+                upload_id = excluded.upload_id,
+                source_path = excluded.source_path,
+                size = excluded.size,
+                mtime_ns = excluded.mtime_ns,
+                part_size = excluded.part_size,
+                started_at = CURRENT_TIMESTAMP
+            """,
+            (endpoint_url, bucket, object_name, upload_id, str(path.resolve()),
+             stat.st_size, stat.st_mtime_ns, part_size),
+        )
+
+
+def store_multipart_part(upload_id: str, part_number: int, etag: str) -> None:
+    with _connect() as conn:
+        conn.execute(
+            """
+            INSERT INTO multipart_upload_parts (upload_id, part_number, etag) VALUES (?, ?, ?)
+            ON CONFLICT(upload_id, part_number) DO UPDATE SET etag = excluded.etag
+            """,
+            (upload_id, part_number, etag),
+        )
+
+
+def clear_multipart_upload(endpoint_url: str, bucket: str, object_name: str) -> None:
+    with _connect() as conn:
+        conn.execute(
+            """
+            DELETE FROM multipart_upload_parts WHERE upload_id IN (
+                SELECT upload_id FROM multipart_uploads
+                WHERE endpoint_url = ? AND bucket = ? AND object_name = ?
+            )
+            """,
+            (endpoint_url, bucket, object_name),
+        )
+        conn.execute(
+            "DELETE FROM multipart_uploads WHERE endpoint_url = ? AND bucket = ? AND object_name = ?",
+            (endpoint_url, bucket, object_name),
+        )
+
+
+def cached_partial_download(path: Path) -> PartialDownload | None:
+    with _connect() as conn:
+        row = conn.execute(
+            "SELECT url, expected_size, validator FROM partial_downloads WHERE path = ?", (str(path.resolve()),),
+        ).fetchone()
+    return None if row is None else PartialDownload(str(row[0]), row[1], row[2])
+
+
+def store_partial_download(path: Path, url: str, expected_size: int | None, validator: str | None) -> None:
+    """Remember an unfinished download so a later run can continue it."""
+    with _connect() as conn:
+        conn.execute(
+            """
+            INSERT INTO partial_downloads (path, url, expected_size, validator, updated_at) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(path) DO UPDATE SET
+                url = excluded.url, expected_size = excluded.expected_size,
+                validator = excluded.validator, updated_at = excluded.updated_at
+            """,
+            (str(path.resolve()), url, expected_size, validator, int(time.time())),
+        )
+
+
+def clear_partial_download(path: Path) -> None:
+    with _connect() as conn:
+        conn.execute("DELETE FROM partial_downloads WHERE path = ?", (str(path.resolve()),))
+
+
+def partial_downloads_in(directory: Path) -> list[Path]:
+    """Return the tracked partial downloads stored directly in ``directory``."""
+    with _connect() as conn:
+        rows = conn.execute("SELECT path FROM partial_downloads").fetchall()
+    directory = directory.resolve()
+    return [Path(path) for (path,) in rows if Path(path).parent == directory]
+
+
 def cached_api_response(url: str) -> tuple[str | None, Path] | None:
     with _connect() as conn:
         row = conn.execute("SELECT etag, path FROM recap_api_cache WHERE url = ?", (url,)).fetchone()
@@ -136,3 +483,36 @@ def store_api_response(url: str, etag: str | None, path: Path) -> None:
             """,
             (url, etag, str(path.resolve())),
         )
+
+
+def cached_youtube_info(video_id: str, attestation_mode: str, max_age: int) -> tuple[int, bytes] | None:
+    """Return the extraction time and payload of yt-dlp info extracted less than ``max_age`` seconds ago."""
+    with _connect() as conn:
+        row = conn.execute(
+            """
+            SELECT extracted_at, info FROM youtube_info_cache
+            WHERE video_id = ? AND attestation_mode = ? AND extracted_at > ?
+            """,
+            (video_id, attestation_mode, int(time.time()) - max_age),
+        ).fetchone()
+    return None if row is None else (row[0], bytes(row[1]))
+
+
+def store_youtube_info(video_id: str, attestation_mode: str, info: bytes) -> None:
+    with _connect() as conn:
+        conn.execute(
+            """
+            INSERT INTO youtube_info_cache (video_id, attestation_mode, info, extracted_at) VALUES (?, ?, ?, ?)
+            ON CONFLICT(video_id, attestation_mode) DO UPDATE SET
+                info = excluded.info, extracted_at = excluded.extracted_at
+            """,
+            (video_id, attestation_mode, info, int(time.time())),
+        )
+
+
+def clear_youtube_info(video_id: str, attestation_mode: str) -> None:
+    with _connect() as conn:
+        conn.execute(
+            "DELETE FROM youtube_info_cache WHERE video_id = ? AND attestation_mode = ?",
+            (video_id, attestation_mode),
+        )
@@ -34,6 +34,14 @@ RECAP_DEFAULTS: dict[str, str | bool] = {
     "opus_bitrate": "160k",
     "audio_normalization": "two-pass",
     "jobs": "0",
+    "upload_multipart_threshold": "64M",
+    "upload_part_size": "32M",
+    "upload_concurrency": "8",
+    "upload_dedup": "metadata",
+    "source_cache_budget": "0",
+    "source_link_mode": "auto",
+    "download_host_limits": "",
+    "download_bandwidth": "0",
 }
 
 
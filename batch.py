@@ -4,23 +4,34 @@
 from __future__ import annotations
 
 import argparse
-from dataclasses import dataclass, replace
+from contextlib import AbstractContextManager, ExitStack, nullcontext
+from dataclasses import asdict, dataclass, replace
 from pathlib import Path
 import multiprocessing as mp
+import queue
 import re
 import subprocess as sp
-import tempfile
-from typing import Any, Iterable, cast
+import threading
+from typing import Any, Callable, cast
 
+import app_cache
 import app_config
+import batch_journal
 import common
 import download
+import download_scheduler
 import ffmpeg_tools
 import prepare
 import recap_api
 import song_api
 
 
+DEFAULT_DOWNLOAD_JOBS = 4
+DEFAULT_PUBLISH_JOBS = 2
+# Queue marker telling a pipeline stage's workers that no more items follow.
+_STAGE_CLOSED = object()
+
+
 @dataclass(frozen=True)
 class BatchVideo:
     """One downloadable video row and its final World Stage filename."""
@@ -56,6 +67,10 @@ class BatchDownloadRequest:
     update_song_links: bool
     overwrite: bool
     dry_run: bool
+    download_jobs: int = DEFAULT_DOWNLOAD_JOBS
+    publish_jobs: int = DEFAULT_PUBLISH_JOBS
+    # Encode sources that need it straight from the network instead of a raw download.
+    stream: bool = False
 
 
 @dataclass(frozen=True)
@@ -68,6 +83,11 @@ class BatchTask:
     encoding: ffmpeg_tools.RecapEncoding
     target_height: int
     overwrite: bool
+    journal: Path | None = None
+    resume: batch_journal.JournalEntry | None = None
+    inspection: download.YouTubeInspection | None = None
+    stream: bool = False
+    scheduler: download_scheduler.DownloadScheduler | None = None
 
 
 @dataclass(frozen=True)
@@ -77,6 +97,19 @@ class BatchResult:
     status: str
     detail: str
     artwork: Path | None = None
+    resumed: batch_journal.JournalEntry | None = None
+
+
+@dataclass(frozen=True)
+class DownloadedMedia:
+    """A fetched source waiting in the pipeline for the transcoding stage."""
+
+    task: BatchTask
+    destination: Path
+    raw_path: Path
+    cover: Path | None
+    # Set when the transcoding stage reads the source from the network instead of ``raw_path``.
+    remote: ffmpeg_tools.RemoteSource | None = None
 
 
 @dataclass(frozen=True)
@@ -175,6 +208,65 @@ def _media_tags(video: BatchVideo) -> ffmpeg_tools.MediaTags:
     )
 
 
+def _raw_video_path(video: BatchVideo, destination: Path, raw_directory: Path) -> Path:
+    """Merge YouTube videos beside their destination so a tagged merge only needs a rename."""
+    directory = destination.parent if download.is_youtube_url(video.media_link) else raw_directory
+    return directory / f"{video.name}.download.mov"
+
+
+def _video_settings(task: BatchTask) -> download.DownloadSettings:
+    # yt-dlp's merge writes the tags and faststart itself; AV1/Opus results then need no rewrite.
+    merge_arguments = ("-map_metadata", "-1", *_media_tags(task.video).arguments())
+    return replace(task.downloader_settings, merge_arguments=merge_arguments)
+
+
+def _host_slot(task: BatchTask) -> AbstractContextManager[None]:
+    """Hold a download slot of the task's host while its source is read from the network."""
+    return task.scheduler.slot(task.video.media_link) if task.scheduler is not None else nullcontext()
+
+
+def _stream_source(task: BatchTask) -> ffmpeg_tools.RemoteSource | None:
+    """Resolve URLs FFmpeg can encode from directly, or ``None`` to download the source first.
+
+    Only sources that need re-encoding stream; compliant ones are cheaper to copy.
+    FFmpeg's reads cannot share a download bandwidth limit, so none stream under one.
+    """
+    url = task.video.media_link
+    if download.is_google_drive_url(url) or task.downloader_settings.bandwidth is not None:
+        return None
+    try:
+        with _host_slot(task):
+            if download.is_youtube_url(url):
+                source = download.remote_youtube_source(url, task.downloader_settings)
+            else:
+                remote = ffmpeg_tools.RemoteInput(url, tuple(download.HTTP_HEADERS.items()))
+                source = _worker_media(task).remote_source(remote)
+    except RuntimeError as exc:
+        print(f"[batch] Cannot stream {task.video.name}; downloading it first: {exc}")
+        return None
+    if source is None or (source.codecs.video == "av1" and source.height <= task.target_height):
+        return None
+    return source
+
+
+def _stream_transcode(item: DownloadedMedia) -> BatchResult | None:
+    """Encode straight from the network; ``None`` asks for the two-step fallback."""
+    task = item.task
+    assert item.remote is not None
+    try:
+        with _host_slot(task):
+            codecs = _worker_media(task).make_av1_opus_stream(
+                item.remote, item.destination, _media_tags(task.video), task.encoding, task.target_height,
+            )
+    except RuntimeError as exc:
+        item.destination.unlink(missing_ok=True)
+        print(f"[batch] Streaming {task.video.name} failed; downloading it first: {exc}")
+        return None
+    detail = f"{codecs.video}/{codecs.audio}, streamed"
+    _advance_journal(task.journal, task.video, "transcoded", detail, media=item.destination)
+    return BatchResult(task.video, item.destination, "complete", detail)
+
+
 def _fetch_task_media(
     task: BatchTask,
     destination: Path,
@@ -184,7 +276,8 @@ def _fetch_task_media(
 ) -> BatchResult | None:
     """Fetch one task source and convert an unavailable YouTube result to a status."""
     try:
-        download.fetch_external(task.video.media_link, media_type, raw_path, settings)
+        with _host_slot(task):
+            download.fetch_external(task.video.media_link, media_type, raw_path, settings)
     except download.YouTubeUnavailableError as exc:
         raw_path.unlink(missing_ok=True)
         return BatchResult(task.video, destination, "unavailable", str(exc))
@@ -193,18 +286,67 @@ def _fetch_task_media(
     return None
 
 
-def process_task(task: BatchTask) -> BatchResult:
-    """Download, transcode if needed, and tag one independent batch video."""
-    try:
-        topic_upload = download.youtube_topic_upload(task.video.media_link, task.downloader_settings)
-    except download.YouTubeUnavailableError as exc:
-        return BatchResult(task.video, task.destination, "unavailable", str(exc))
+def _advance_journal(
+    journal: Path | None, video: BatchVideo, state: str, detail: str | None = None, **artifacts: Path | None,
+) -> None:
+    if journal is not None:
+        batch_journal.advance(journal, video.name, state, detail, **artifacts)
+
+
+def _resume_task(task: BatchTask) -> BatchResult | DownloadedMedia | None:
+    """Continue a journaled video after its last completed step without network or probes."""
+    entry = task.resume
+    if entry is None:
+        return None
+    cover = entry.artifact("cover")
+    if entry.topic is not None and cover is None:
+        return None
+    if entry.reached("transcoded"):
+        media = entry.artifact("media")
+        if media is None:
+            return None
+        print(f"[batch] Resuming {task.video.name} after its {entry.state} step")
+        return BatchResult(task.video, media, "complete", entry.detail, cover, entry)
+    if entry.state == "downloaded" and (raw_path := entry.artifact("raw")) is not None:
+        destination = task.destination.with_suffix(".m4a") if entry.topic is not None else task.destination
+        print(f"[batch] Resuming {task.video.name} from its downloaded source")
+        return DownloadedMedia(task, destination, raw_path, cover)
+    return None
+
+
+def download_task(task: BatchTask) -> BatchResult | DownloadedMedia:
+    """Inspect and fetch one source: the network-bound first pipeline stage.
+
+    Finished outcomes, such as unavailable or existing files, are returned as
+    results and skip transcoding.  A journaled video reuses its inspection and
+    continues from its first incomplete step.
+    """
+    if resumed := _resume_task(task):
+        return resumed
+    if task.resume is not None:
+        topic = task.resume.topic
+        topic_upload = download.YouTubeTopicUpload(**topic) if topic is not None else None
+    else:
+        if task.inspection is not None:
+            topic_upload = task.inspection.topic
+        else:
+            try:
+                topic_upload = download.youtube_topic_upload(task.video.media_link, task.downloader_settings)
+            except download.YouTubeUnavailableError as exc:
+                return BatchResult(task.video, task.destination, "unavailable", str(exc))
+        if task.journal is not None:
+            batch_journal.record_inspection(
+                task.journal, task.video.name, task.video.media_link,
+                asdict(topic_upload) if topic_upload is not None else None,
+            )
+    # A journaled destination that never reached "transcoded" may be a partial write.
+    trust_existing = not task.overwrite and task.resume is None
 
     destination = task.destination
     if topic_upload is not None:
         destination = destination.with_suffix(".m4a")
         cover = destination.with_suffix(topic_upload.thumbnail_suffix)
-        if destination.exists() and not task.overwrite:
+        if destination.exists() and trust_existing:
             if cover.exists():
                 return BatchResult(task.video, destination, "existing", "Topic audio already exists", cover)
             download.download_direct(topic_upload.thumbnail_url, cover)
@@ -217,40 +359,146 @@ def process_task(task: BatchTask) -> BatchResult:
             replace(task.downloader_settings, prefer_av1_opus=False),
         ):
             return result
+        _advance_journal(task.journal, task.video, "downloaded", raw=raw_path, cover=cover)
+        return DownloadedMedia(task, destination, raw_path, cover)
 
-        _worker_media(task).make_audio(cover, raw_path, destination, _media_tags(task.video))
-        raw_path.unlink()
-        return BatchResult(task.video, destination, "complete", "YouTube Topic audio", cover)
-
-    if destination.exists() and not task.overwrite:
+    if destination.exists() and trust_existing:
         return BatchResult(task.video, destination, "existing", "already exists")
 
-    raw_path = task.raw_directory / f"{task.video.name}.download.mov"
-    if result := _fetch_task_media(
-        task, destination, "v", raw_path, task.downloader_settings,
-    ):
+    raw_path = _raw_video_path(task.video, destination, task.raw_directory)
+    if task.stream and (remote := _stream_source(task)) is not None:
+        print(f"[batch] Streaming {task.video.name} into the encoder")
+        return DownloadedMedia(task, destination, raw_path, None, remote)
+    if result := _fetch_task_media(task, destination, "v", raw_path, _video_settings(task)):
         return result
+    _advance_journal(task.journal, task.video, "downloaded", raw=raw_path)
+    return DownloadedMedia(task, destination, raw_path, None)
 
-    source_codecs = _worker_media(task).make_av1_opus_video(
-        raw_path,
-        destination,
-        _media_tags(task.video),
-        task.encoding,
-        preserve_flac=download.is_google_drive_url(task.video.media_link),
-        maximum_height=task.target_height,
-    )
-    raw_path.unlink()
-    return BatchResult(task.video, destination, "complete", f"{source_codecs.video}/{source_codecs.audio}")
+
+def transcode_task(item: DownloadedMedia) -> BatchResult:
+    """Tag, and re-encode if needed, one fetched source: the CPU-bound stage."""
+    task = item.task
+    if item.remote is not None:
+        if result := _stream_transcode(item):
+            return result
+        if result := _fetch_task_media(task, item.destination, "v", item.raw_path, _video_settings(task)):
+            return result
+        _advance_journal(task.journal, task.video, "downloaded", raw=item.raw_path)
+    if item.cover is not None:
+        _worker_media(task).make_audio(item.cover, item.raw_path, item.destination, _media_tags(task.video))
+        detail = "YouTube Topic audio"
+    else:
+        media = _worker_media(task)
+        tags = _media_tags(task.video)
+        if source_codecs := media.move_if_tagged(item.raw_path, item.destination, tags, task.target_height):
+            detail = f"{source_codecs.video}/{source_codecs.audio}, tagged during merge"
+        else:
+            source_codecs = media.make_av1_opus_video(
+                item.raw_path,
+                item.destination,
+                tags,
+                task.encoding,
+                preserve_flac=download.is_google_drive_url(task.video.media_link),
+                maximum_height=task.target_height,
+            )
+            detail = f"{source_codecs.video}/{source_codecs.audio}"
+    _advance_journal(task.journal, task.video, "transcoded", detail, media=item.destination, cover=item.cover)
+    item.raw_path.unlink(missing_ok=True)
+    return BatchResult(task.video, item.destination, "complete", detail, item.cover)
 
 
-def worker_count(jobs: int, task_count: int) -> int:
+def worker_count(jobs: int, task_count: int, encoding: ffmpeg_tools.RecapEncoding | None = None) -> int:
+    """Size the transcoding pool, budgeting cores by SVT-AV1's thread setting."""
     if jobs < 0:
-        raise ValueError("Concurrent downloads cannot be negative")
+        raise ValueError("Concurrent encodes cannot be negative")
     if jobs > 0:
         return min(task_count, jobs)
+    if encoding is not None and encoding.av1_threads > 0:
+        return min(task_count, max(1, mp.cpu_count() // encoding.av1_threads))
     return common.automatic_worker_count(task_count)
 
 
+def _start_stage(
+    name: str,
+    work: Callable[[Any], None],
+    inbox: queue.Queue[Any],
+    count: int,
+    failures: list[BaseException],
+) -> list[threading.Thread]:
+    """Start ``count`` threads applying ``work`` to items until the stage is closed.
+
+    After any failure the workers keep draining their queue without working,
+    so upstream stages blocked on a full queue can always finish.
+    """
+    def worker() -> None:
+        while (item := inbox.get()) is not _STAGE_CLOSED:
+            if failures:
+                continue
+            try:
+                work(item)
+            except BaseException as exc:
+                failures.append(exc)
+
+    threads = [
+        threading.Thread(target=worker, name=f"batch-{name}-{index}", daemon=True)
+        for index in range(count)
+    ]
+    for thread in threads:
+        thread.start()
+    return threads
+
+
+def _close_stage(inbox: queue.Queue[Any], threads: list[threading.Thread]) -> None:
+    for _thread in threads:
+        inbox.put(_STAGE_CLOSED)
+    for thread in threads:
+        thread.join()
+
+
+def run_pipeline(
+    tasks: list[BatchTask],
+    publish: Callable[[BatchResult], None],
+    *,
+    download_jobs: int,
+    transcode_jobs: int,
+    publish_jobs: int,
+) -> None:
+    """Run downloads, transcodes and publishing in separate bounded thread pools.
+
+    Each stage only orchestrates: yt-dlp and HTTP wait on sockets, FFmpeg runs
+    in child processes.  The bounded queues provide backpressure, so downloads
+    pause once ``transcode_jobs`` fetched sources are waiting for an encoder,
+    and encoders pause while uploads fall behind.
+    """
+    if min(download_jobs, transcode_jobs, publish_jobs) < 1:
+        raise ValueError("Every batch stage needs at least one worker")
+    failures: list[BaseException] = []
+    download_queue: queue.Queue[Any] = queue.Queue()
+    transcode_queue: queue.Queue[Any] = queue.Queue(maxsize=transcode_jobs)
+    publish_queue: queue.Queue[Any] = queue.Queue(maxsize=publish_jobs)
+
+    def fetch(task: BatchTask) -> None:
+        outcome = download_task(task)
+        if isinstance(outcome, DownloadedMedia):
+            transcode_queue.put(outcome)
+        else:
+            publish_queue.put(outcome)
+
+    def transcode(item: DownloadedMedia) -> None:
+        publish_queue.put(transcode_task(item))
+
+    publishers = _start_stage("publish", publish, publish_queue, publish_jobs, failures)
+    transcoders = _start_stage("transcode", transcode, transcode_queue, transcode_jobs, failures)
+    downloaders = _start_stage("download", fetch, download_queue, download_jobs, failures)
+    for task in tasks:
+        download_queue.put(task)
+    _close_stage(download_queue, downloaders)
+    _close_stage(transcode_queue, transcoders)
+    _close_stage(publish_queue, publishers)
+    if failures:
+        raise failures[0]
+
+
 def download_one_batch(
     videos: list[BatchVideo],
     *,
@@ -266,6 +514,10 @@ def download_one_batch(
     song_api_token: str | None,
     overwrite: bool,
     dry_run: bool,
+    download_jobs: int = DEFAULT_DOWNLOAD_JOBS,
+    publish_jobs: int = DEFAULT_PUBLISH_JOBS,
+    stream: bool = False,
+    scheduler: download_scheduler.DownloadScheduler | None = None,
 ) -> list[str]:
     if dry_run:
         for video in videos:
@@ -273,7 +525,9 @@ def download_one_batch(
             if destination.exists() and not overwrite:
                 print(f"[batch] Skipping existing {destination}")
                 continue
-            raw_path = raw_directory / f"{video.name}.download.mov"
+            raw_path = _raw_video_path(video, destination, raw_directory)
+            if stream:
+                print(f"[batch] Would stream {video.media_link} into the encoder if it needs re-encoding")
             print(f"[batch] Would download {video.media_link} -> {raw_path}")
             print(f"[batch] Would limit video output to {target_height}p")
             print(f"[batch] Would tag {raw_path} -> {destination}")
@@ -282,31 +536,73 @@ def download_one_batch(
         return []
 
     raw_directory.mkdir(parents=True, exist_ok=True)
+    download.prune_partials(raw_directory)
+    # YouTube merges are written beside their destination; see _raw_video_path.
+    if output_directory != raw_directory:
+        download.prune_partials(output_directory)
+    journal = batch_journal.journal_path(output_directory)
+    batch_journal.initialize_journal(journal)
+    entries = batch_journal.read_entries(journal)
     tasks: list[BatchTask] = []
     for video in videos:
         destination = output_directory / f"{video.name}.mov"
-        if destination.exists() and not overwrite and not download.is_youtube_url(video.media_link):
+        entry = entries.get(video.name)
+        if entry is not None and (overwrite or entry.media_link != video.media_link):
+            batch_journal.forget(journal, video.name)
+            entry = None
+        if entry is not None and entry.state == "linked" and entry.artifact("media") is not None:
+            print(f"[batch] Skipping completed {entry.artifact('media')}")
+            continue
+        if (
+            entry is None and destination.exists() and not overwrite
+            and not download.is_youtube_url(video.media_link)
+        ):
             print(f"[batch] Skipping existing {destination}")
             continue
         print(f"[batch] Queued {video.name} from {video.media_link}")
         tasks.append(BatchTask(
             video, destination, raw_directory, downloader_settings, ffprobe, encoding, target_height, overwrite,
+            journal, entry, stream=stream, scheduler=scheduler,
         ))
     if not tasks:
         return []
+    unavailable: list[str] = []
 
-    count = worker_count(jobs, len(tasks))
-    print(f"[batch] Processing {len(tasks)} videos with {count} worker(s).")
-    if count == 1:
-        return _consume_results(
-            map(process_task, tasks), s3_config, s3_client,
-            song_api_token, downloader_settings.ffmpeg, ffprobe, overwrite,
-        )
-    with mp.Pool(count) as pool:
-        return _consume_results(
-            pool.imap_unordered(process_task, tasks), s3_config, s3_client,
-            song_api_token, downloader_settings.ffmpeg, ffprobe, overwrite,
+    def publish(result: BatchResult) -> None:
+        _log_result(
+            result, s3_config, s3_client, song_api_token, downloader_settings.ffmpeg, ffprobe, overwrite,
+            journal,
         )
+        if result.status == "unavailable":
+            unavailable.append(f"{result.video.country} {result.video.year}")
+
+    inspections = download.prefetch_youtube(
+        (task.video.media_link for task in tasks if task.resume is None), downloader_settings,
+    )
+    ready: list[BatchTask] = []
+    for task in tasks:
+        inspection = inspections.get(task.video.media_link)
+        if inspection is not None and inspection.status == "unavailable":
+            publish(BatchResult(task.video, task.destination, "unavailable", inspection.detail))
+            continue
+        if inspection is not None and inspection.status == "failed":
+            inspection = None
+        ready.append(replace(task, inspection=inspection))
+    if not ready:
+        return unavailable
+
+    transcode_jobs = worker_count(jobs, len(ready), encoding)
+    download_jobs = min(len(ready), download_jobs)
+    publish_jobs = min(len(ready), publish_jobs)
+    print(
+        f"[batch] Processing {len(ready)} videos with {download_jobs} download, "
+        f"{transcode_jobs} encoding and {publish_jobs} publishing worker(s)."
+    )
+    run_pipeline(
+        ready, publish,
+        download_jobs=download_jobs, transcode_jobs=transcode_jobs, publish_jobs=publish_jobs,
+    )
+    return unavailable
 
 
 def _make_metadata(
@@ -354,6 +650,7 @@ def _log_result(
     ffmpeg: str,
     ffprobe: str,
     overwrite: bool,
+    journal: Path | None = None,
 ) -> None:
     if result.status == "unavailable":
         print(f"[batch] Skipping unavailable YouTube video {result.video.name}: {result.detail}")
@@ -366,29 +663,22 @@ def _log_result(
             print(f"[batch] Created missing metadata {metadata}")
             _upload_artifacts(s3_config, s3_client, metadata)
         return
-    print(f"[batch] Tagged {result.destination.name} ({result.detail})")
-    metadata = _make_metadata(result, ffmpeg, ffprobe, overwrite=True)
-    _upload_artifacts(s3_config, s3_client, result.destination, result.artwork, metadata)
-    if song_api_token is not None:
+    entry = result.resumed
+    state = entry.state if entry is not None else "transcoded"
+    if entry is None:
+        print(f"[batch] Tagged {result.destination.name} ({result.detail})")
+    metadata = entry.artifact("metadata") if entry is not None and entry.reached("metadata") else None
+    if metadata is None:
+        metadata = _make_metadata(result, ffmpeg, ffprobe, overwrite=True)
+        state = "metadata"
+        _advance_journal(journal, result.video, state, metadata=metadata)
+    if s3_config is not None and not batch_journal.reached(state, "uploaded"):
+        _upload_artifacts(s3_config, s3_client, result.destination, result.artwork, metadata)
+        state = "uploaded"
+        _advance_journal(journal, result.video, state)
+    if song_api_token is not None and not batch_journal.reached(state, "linked"):
         _update_song_links(result, song_api_token)
-
-
-def _consume_results(
-    results: Iterable[BatchResult],
-    s3_config: prepare.S3Config | None,
-    s3_client: Any,
-    song_api_token: str | None,
-    ffmpeg: str,
-    ffprobe: str,
-    overwrite: bool,
-) -> list[str]:
-    """Log completed tasks and collect the final unavailable-video report."""
-    unavailable: list[str] = []
-    for result in results:
-        _log_result(result, s3_config, s3_client, song_api_token, ffmpeg, ffprobe, overwrite)
-        if result.status == "unavailable":
-            unavailable.append(f"{result.video.country} {result.video.year}")
-    return unavailable
+        _advance_journal(journal, result.video, "linked")
 
 
 def print_report(unavailable: list[str], missing_media_links: list[str]) -> None:
@@ -415,7 +705,13 @@ def download_videos(request: BatchDownloadRequest) -> None:
         raise ValueError("The input contains no downloadable video rows")
 
     request.output_directory.mkdir(parents=True, exist_ok=True)
+    app_cache.initialize_database()
     settings = app_config.recap_settings()
+    host_limits = configured_text(settings, "download_host_limits")
+    scheduler = download_scheduler.DownloadScheduler(
+        download_scheduler.parse_host_limits(host_limits) if host_limits else None,
+        bandwidth=common.parse_byte_size(configured_text(settings, "download_bandwidth") or "0"),
+    )
     downloader_settings = download.DownloadSettings(
         browser=request.browser if request.browser is not None else configured_text(settings, "browser") or None,
         ffmpeg=request.ffmpeg if request.ffmpeg is not None else configured_text(settings, "ffmpeg"),
@@ -424,6 +720,8 @@ def download_videos(request: BatchDownloadRequest) -> None:
         po_token=configured_text(settings, "po_token") or None,
         bgutil_url=configured_text(settings, "bgutil_url") or None,
         maximum_video_height=request.target_height,
+        bandwidth=scheduler.bucket,
+        rate_limit=scheduler.bandwidth_share(request.download_jobs),
     )
     ffprobe = request.ffprobe if request.ffprobe is not None else configured_text(settings, "ffprobe")
     encoding = ffmpeg_tools.RecapEncoding(
@@ -433,7 +731,9 @@ def download_videos(request: BatchDownloadRequest) -> None:
         opus_bitrate=configured_text(settings, "opus_bitrate"),
     )
     if request.jobs < 0:
-        raise ValueError("Concurrent downloads cannot be negative")
+        raise ValueError("Concurrent encodes cannot be negative")
+    if request.download_jobs < 1 or request.publish_jobs < 1:
+        raise ValueError("Concurrent downloads and uploads must be positive")
     if request.target_height <= 0:
         raise ValueError("Target video height must be positive")
     try:
@@ -451,23 +751,20 @@ def download_videos(request: BatchDownloadRequest) -> None:
             raise ValueError("Configure a World Stage song API token before updating media links")
     else:
         song_token = ""
-    if request.temporary_directory is not None:
+    with ExitStack() as stack:
+        # Downloads stay in a persistent directory so an interrupted run resumes them.
+        raw_directory = request.temporary_directory or app_cache.downloads_directory(request.output_directory)
+        if not request.dry_run and any(download.is_youtube_url(video.media_link) for video in batch_input.videos):
+            downloader_settings = stack.enter_context(download.shared_cookies(downloader_settings))
         unavailable = download_one_batch(
-            batch_input.videos, output_directory=request.output_directory, raw_directory=request.temporary_directory,
+            batch_input.videos, output_directory=request.output_directory, raw_directory=raw_directory,
             downloader_settings=downloader_settings, ffprobe=ffprobe,
             encoding=encoding, jobs=request.jobs, target_height=request.target_height,
             s3_config=s3_config, s3_client=s3_client, song_api_token=song_token or None,
             overwrite=request.overwrite, dry_run=request.dry_run,
+            download_jobs=request.download_jobs, publish_jobs=request.publish_jobs,
+            stream=request.stream, scheduler=scheduler,
         )
-    else:
-        with tempfile.TemporaryDirectory(prefix="world-stage-batch-") as temporary_path:
-            unavailable = download_one_batch(
-                batch_input.videos, output_directory=request.output_directory, raw_directory=Path(temporary_path),
-                downloader_settings=downloader_settings, ffprobe=ffprobe,
-                encoding=encoding, jobs=request.jobs, target_height=request.target_height,
-                s3_config=s3_config, s3_client=s3_client, song_api_token=song_token or None,
-                overwrite=request.overwrite, dry_run=request.dry_run,
-            )
     print_report(unavailable, batch_input.missing_media_links)
 
 
@@ -483,10 +780,13 @@ def setup_args() -> argparse.ArgumentParser:
     downloader.add_argument("--browser", help="Browser profile for YouTube cookies")
     downloader.add_argument("--ffmpeg", help="ffmpeg executable (defaults to saved setting)")
     downloader.add_argument("--ffprobe", help="ffprobe executable (defaults to saved setting)")
-    downloader.add_argument("--jobs", type=int, default=0, help="Concurrent downloads (0 selects automatically)")
+    downloader.add_argument("--jobs", type=int, default=0, help="Concurrent encodes (0 budgets by CPU cores)")
+    downloader.add_argument("--download-jobs", type=int, default=DEFAULT_DOWNLOAD_JOBS, help="Concurrent downloads")
+    downloader.add_argument("--publish-jobs", type=int, default=DEFAULT_PUBLISH_JOBS, help="Concurrent uploads and link updates")
     downloader.add_argument("--target-height", type=int, default=480, help="Maximum downloaded video height in pixels")
     downloader.add_argument("--upload", action=argparse.BooleanOptionalAction, default=prepare.s3_configured(), help="Upload completed files to configured S3")
     downloader.add_argument("--update-song-links", action=argparse.BooleanOptionalAction, default=bool(settings["song_api_token"]) and prepare.s3_configured(), help="Update uploaded media links through the World Stage song API")
+    downloader.add_argument("--stream", action="store_true", help="Encode sources that need re-encoding while they download, without a raw copy (not with a download bandwidth limit)")
     downloader.add_argument("--overwrite", "-y", action="store_true")
     downloader.add_argument("--dry-run", "-n", action="store_true")
     return parser
@@ -510,6 +810,9 @@ def main() -> None:
             update_song_links=cast(bool, args.update_song_links),
             overwrite=cast(bool, args.overwrite),
             dry_run=cast(bool, args.dry_run),
+            download_jobs=cast(int, args.download_jobs),
+            publish_jobs=cast(int, args.publish_jobs),
+            stream=cast(bool, args.stream),
         ))
         return
     raise ValueError(f"Unsupported batch mode: {args.mode}")
@@ -0,0 +1,134 @@
+"""Crash-safe SQLite journal of per-video batch progress."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+import json
+import sqlite3
+import time
+
+
+JOURNAL_FILENAME = "batch-journal.sqlite3"
+# Steps in the order a batch video completes them.
+STATES = ("inspected", "downloaded", "transcoded", "metadata", "uploaded", "linked")
+
+
+@dataclass(frozen=True)
+class JournalEntry:
+    """The furthest completed step of one video and the artifacts it produced."""
+
+    name: str
+    media_link: str
+    state: str
+    topic: dict[str, str] | None
+    detail: str
+    artifacts: dict[str, tuple[str, int, int]]
+
+    def reached(self, state: str) -> bool:
+        return reached(self.state, state)
+
+    def artifact(self, role: str) -> Path | None:
+        """Return an artifact only if its size and mtime match the journal."""
+        value = self.artifacts.get(role)
+        if value is None:
+            return None
+        path = Path(value[0])
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return None
+        return path if (stat.st_size, stat.st_mtime_ns) == value[1:] else None
+
+
+def reached(current: str, state: str) -> bool:
+    """Return whether ``current`` is ``state`` or a later step."""
+    return STATES.index(current) >= STATES.index(state)
+
+
+def journal_path(output_directory: Path) -> Path:
+    return output_directory / JOURNAL_FILENAME
+
+
+def initialize_journal(database: Path) -> None:
+    with sqlite3.connect(database, timeout=30) as conn:
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS batch_items (
+                name TEXT PRIMARY KEY,
+                media_link TEXT NOT NULL,
+                state TEXT NOT NULL,
+                topic TEXT,
+                detail TEXT NOT NULL DEFAULT '',
+                updated_at INTEGER NOT NULL
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS batch_artifacts (
+                name TEXT NOT NULL,
+                role TEXT NOT NULL,
+                path TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                PRIMARY KEY (name, role)
+            )
+        """)
+
+
+def read_entries(database: Path) -> dict[str, JournalEntry]:
+    """Load every journaled video in two queries, keyed by output name."""
+    with sqlite3.connect(database, timeout=30) as conn:
+        items = conn.execute("SELECT name, media_link, state, topic, detail FROM batch_items").fetchall()
+        artifacts: dict[str, dict[str, tuple[str, int, int]]] = {}
+        for name, role, path, size, mtime_ns in conn.execute(
+            "SELECT name, role, path, size, mtime_ns FROM batch_artifacts"
+        ):
+            artifacts.setdefault(name, {})[role] = (path, size, mtime_ns)
+    return {
+        name: JournalEntry(
+            name, media_link, state, json.loads(topic) if topic else None, detail, artifacts.get(name, {}),
+        )
+        for name, media_link, state, topic, detail in items
+    }
+
+
+def record_inspection(database: Path, name: str, media_link: str, topic: dict[str, str] | None) -> None:
+    """Start a video's journal afresh from its inspection result."""
+    with sqlite3.connect(database, timeout=30) as conn:
+        conn.execute("DELETE FROM batch_artifacts WHERE name = ?", (name,))
+        conn.execute("""
+            INSERT INTO batch_items (name, media_link, state, topic, detail, updated_at)
+            VALUES (?, ?, 'inspected', ?, '', ?)
+            ON CONFLICT(name) DO UPDATE SET
+                media_link = excluded.media_link,
+                state = excluded.state,
+                topic = excluded.topic,
+                detail = excluded.detail,
+                updated_at = excluded.updated_at
+        """, (name, media_link, json.dumps(topic) if topic is not None else None, int(time.time())))
+
+
+def advance(database: Path, name: str, state: str, detail: str | None = None, **artifacts: Path | None) -> None:
+    """Record a completed step together with fingerprints of the files it wrote."""
+    if state not in STATES:
+        raise ValueError(f"Unknown batch journal state: {state!r}")
+    with sqlite3.connect(database, timeout=30) as conn:
+        conn.execute(
+            "UPDATE batch_items SET state = ?, detail = COALESCE(?, detail), updated_at = ? WHERE name = ?",
+            (state, detail, int(time.time()), name),
+        )
+        for role, path in artifacts.items():
+            if path is None:
+                continue
+            stat = path.stat()
+            conn.execute("""
+                INSERT INTO batch_artifacts (name, role, path, size, mtime_ns) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(name, role) DO UPDATE SET
+                    path = excluded.path, size = excluded.size, mtime_ns = excluded.mtime_ns
+            """, (name, role, str(path.resolve()), stat.st_size, stat.st_mtime_ns))
+
+
+def forget(database: Path, name: str) -> None:
+    with sqlite3.connect(database, timeout=30) as conn:
+        conn.execute("DELETE FROM batch_artifacts WHERE name = ?", (name,))
+        conn.execute("DELETE FROM batch_items WHERE name = ?", (name,))
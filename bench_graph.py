@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""Compare the legacy and optimized recap filter graphs on synthetic inputs."""
+
+from pathlib import Path
+import argparse
+import tempfile
+import time
+
+import cards
+import common
+import ffmpeg_tools
+import recap
+
+
+def synthetic_sources(
+    media: ffmpeg_tools.FFmpeg, directory: Path, count: int, size: tuple[int, int], fps: int, duration: float,
+) -> list[recap.Data]:
+    """Create ``count`` test-pattern videos and one audio entry with a cover."""
+    rows: list[recap.Data] = []
+    length = f"{duration + 2:.3f}"
+    for index in range(count):
+        source = directory / f"source{index}.mp4"
+        media.run([
+            media.executable, "-hide_banner", "-y", "-loglevel", "error",
+            "-f", "lavfi", "-i", f"testsrc2=size={size[0]}x{size[1]}:rate={fps}:duration={length}",
+            "-f", "lavfi", "-i", f"sine=frequency={220 * (index + 1)}:duration={length}",
+            "-c:v", "libx264", "-preset", "ultrafast", "-c:a", "aac", "-shortest", str(source),
+        ])
+        rows.append(recap.Data(
+            ro=f"{index + 1:02d}", show="bench", country=f"V{index}", artist="Artist", title="Title",
+            path=source, snippet_start=1.0, snippet_end=1.0 + duration, media_type="v", cover_path=None,
+        ))
+    audio = directory / "audio.m4a"
+    cover = directory / "audio.cover.jpg"
+    media.run([
+        media.executable, "-hide_banner", "-y", "-loglevel", "error",
+        "-f", "lavfi", "-i", f"sine=frequency=880:duration={length}", "-c:a", "aac", str(audio),
+    ])
+    media.run([
+        media.executable, "-hide_banner", "-y", "-loglevel", "error",
+        "-f", "lavfi", "-i", "testsrc2=size=1000x1000:rate=1", "-frames:v", "1", str(cover),
+    ])
+    rows.append(recap.Data(
+        ro=f"{count + 1:02d}", show="bench", country="AUD", artist="Artist", title="Title",
+        path=audio, snippet_start=1.0, snippet_end=1.0 + duration, media_type="a", cover_path=cover,
+    ))
+    return rows
+
+
+def synthetic_cards(media: ffmpeg_tools.FFmpeg, rows: list[recap.Data], args: common.Args) -> None:
+    """Draw a translucent card of the real cropped size and record its offset."""
+    assert args.size is not None
+    (card_width, card_height), offset = cards.card_geometry(*args.size)
+    database = cards.cache_database_path(args.cardsdir)
+    cards.initialize_cache(database)
+    for row in rows:
+        card = recap.card_path(row, args)
+        card.parent.mkdir(parents=True, exist_ok=True)
+        media.run([
+            media.executable, "-hide_banner", "-y", "-loglevel", "error", "-f", "lavfi",
+            "-i", f"color=c=0x0052B4@0.85:size={card_width}x{card_height},format=rgba",
+            "-frames:v", "1", str(card),
+        ])
+        cards.store_fingerprint(database, card, "benchmark", offset)
+        if row.media_type == "a":
+            still = recap.still_path(row, args)
+            still.parent.mkdir(parents=True, exist_ok=True)
+            media.make_still(
+                recap.still_visual(row), card, still, recap.video_normalizer(*args.size),
+                recap.card_position(card, cards.card_offsets(args.cardsdir)),
+            )
+
+
+def run_graph(media: ffmpeg_tools.FFmpeg, rows: list[recap.Data], args: common.Args, optimize: bool) -> float:
+    """Build one graph variant, save its script and time it into the null muxer."""
+    input_args, graph, _input_count = recap.build_graph(rows, args, media, optimize=optimize)
+    script = args.tmpdir / f"{'optimized' if optimize else 'legacy'}.ffscript"
+    script.write_text(graph, encoding="utf-8")
+    start = time.perf_counter()
+    media.run([
+        media.executable, "-hide_banner", "-y", "-loglevel", "error", *input_args,
+        "-filter_complex_script", str(script), "-map", "[vout]", "-map", "[aout]", "-f", "null", "-",
+    ])
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the legacy and optimized recap filter graphs.")
+    parser.add_argument("--size", type=common.parse_size, default=(1280, 720), help="Recap canvas WxH")
+    parser.add_argument("--fps", type=int, default=30, help="Recap frame rate")
+    parser.add_argument("--source-size", type=common.parse_size, default=(1920, 1080), help="Synthetic source WxH")
+    parser.add_argument("--source-fps", type=int, default=60, help="Synthetic source frame rate")
+    parser.add_argument("--clips", type=int, default=4, help="Number of synthetic video entries")
+    parser.add_argument("--duration", type=float, default=8.0, help="Snippet length in seconds")
+    parser.add_argument("--rounds", type=int, default=3, help="Timed runs per graph; the fastest is reported")
+    parser.add_argument("--keep", type=Path, help="Keep inputs and .ffscript files in this directory")
+    parser.add_argument("--ffmpeg", default="ffmpeg", help="Path to the ffmpeg executable")
+    parser.add_argument("--ffprobe", default="ffprobe", help="Path to the ffprobe executable")
+    options = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temporary:
+        directory = options.keep or Path(temporary)
+        directory.mkdir(parents=True, exist_ok=True)
+        # The benchmark's own commands would otherwise drown the results.
+        common.OUT_HANDLE = open(directory / "commands.log", "w", encoding="utf-8")
+        media = ffmpeg_tools.FFmpeg(options.ffmpeg, options.ffprobe, common.run)
+        args = common.Args(
+            csv=directory / "bench.csv", api_query=None, style="70s", tmpdir=directory, browser=None,
+            youtube_attestation_mode="none", po_token=None, bgutil_url=None, size=options.size,
+            default_height=options.size[1], fps=options.fps, fade_duration=0.25, av1_preset=8, av1_crf=30,
+            av1_threads=0, opus_bitrate="128k", audio_normalization="none", jobs=1, output=directory,
+            multiprocessing=False, cleanup=False, ffmpeg=options.ffmpeg, ffprobe=options.ffprobe,
+            inkscape="inkscape", card_renderer="resvg", resvg="resvg", only_straight=False,
+            only_reverse=False, vidsdir=directory, cardsdir=directory / "cards", clipsdir=directory,
+        )
+        rows = synthetic_sources(
+            media, directory, options.clips, options.source_size, options.source_fps, options.duration,
+        )
+        synthetic_cards(media, rows, args)
+        timings = {
+            optimize: min(run_graph(media, rows, args, optimize) for _ in range(options.rounds))
+            for optimize in (False, True)
+        }
+        common.OUT_HANDLE.close()
+
+    frames = round(len(rows) * (options.duration + 2 * args.fade_duration) * options.fps)
+    for optimize, seconds in timings.items():
+        print(f"{'optimized' if optimize else 'legacy':>9}: {seconds:.2f} s ({frames / seconds:.0f} frames/s)")
+    print(f"  speedup: {timings[False] / timings[True]:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
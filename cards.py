@@ -34,7 +34,8 @@ MARGIN = 12
 FONT_FAMILY_1 = "Aptos Display"
 FONT_FAMILY_2 = "Compacta"
 
-CARD_RENDER_VERSION = 1
+# Version 2 crops cards to their opaque band and records its canvas offset.
+CARD_RENDER_VERSION = 2
 
 
 def convert_svg_to_png(svg_path: Path, png_path: Path, renderer: str, inkscape: str, resvg: str) -> None:
@@ -115,6 +116,20 @@ def png_size(path: Path) -> tuple[int, int]:
     return struct.unpack(">II", header[16:24])
 
 
+def card_geometry(img_width: int, img_height: int) -> tuple[tuple[int, int], tuple[int, int]]:
+    """Return the PNG size of a card's opaque band and its top-left position on the canvas.
+
+    The band is where the bottom quarter of the card artwork lands when a
+    92.5% card is centred on the canvas, so the cropped card overlays
+    exactly the pixels the full transparent card used to.
+    """
+    card_height = height // 4
+    scale = min(img_width * 0.925 / width, img_height * 0.925 / height)
+    size = (round(width * scale), round(card_height * scale))
+    offset = (round((img_width - size[0]) / 2), round(img_height / 2 + (height / 2 - card_height) * scale))
+    return size, offset
+
+
 def cache_database_path(cards_dir: Path) -> Path:
     return cards_dir / "card-cache.sqlite3"
 
@@ -122,6 +137,10 @@ def cache_database_path(cards_dir: Path) -> Path:
 def initialize_cache(database: Path) -> None:
     with sqlite3.connect(database, timeout=30) as conn:
         conn.execute("CREATE TABLE IF NOT EXISTS cards (path TEXT PRIMARY KEY, fingerprint TEXT NOT NULL)")
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(cards)")}
+        if "offset_x" not in columns:
+            conn.execute("ALTER TABLE cards ADD COLUMN offset_x INTEGER")
+            conn.execute("ALTER TABLE cards ADD COLUMN offset_y INTEGER")
 
 
 def card_fingerprint(v: Data, size: tuple[int, int], style: str, renderer: str) -> str:
@@ -139,12 +158,25 @@ def cached_fingerprint(database: Path, path: Path) -> str | None:
     return None if row is None else row[0]
 
 
-def store_fingerprint(database: Path, path: Path, fingerprint: str) -> None:
+def store_fingerprint(database: Path, path: Path, fingerprint: str, offset: tuple[int, int]) -> None:
     with sqlite3.connect(database, timeout=30) as conn:
         conn.execute("""
-            INSERT INTO cards (path, fingerprint) VALUES (?, ?)
-            ON CONFLICT(path) DO UPDATE SET fingerprint = excluded.fingerprint
-        """, (str(path.absolute()), fingerprint))
+            INSERT INTO cards (path, fingerprint, offset_x, offset_y) VALUES (?, ?, ?, ?)
+            ON CONFLICT(path) DO UPDATE SET
+                fingerprint = excluded.fingerprint, offset_x = excluded.offset_x, offset_y = excluded.offset_y
+        """, (str(path.absolute()), fingerprint, *offset))
+
+
+def card_offsets(cards_dir: Path) -> dict[Path, tuple[int, int]]:
+    """Load the canvas position of every cropped card in one query."""
+    database = cache_database_path(cards_dir)
+    if not database.exists():
+        return {}
+    with sqlite3.connect(database, timeout=30) as conn:
+        rows = conn.execute(
+            "SELECT path, offset_x, offset_y FROM cards WHERE offset_x IS NOT NULL AND offset_y IS NOT NULL"
+        ).fetchall()
+    return {Path(path): (x, y) for path, x, y in rows}
 
 
 def process_entry(
@@ -155,7 +187,7 @@ def process_entry(
     svg_path = outdir / "svg" / f"{base_name}.svg"
     svg_path.parent.mkdir(parents=True, exist_ok=True)
     png_path = outdir / f"{base_name}.png"
-    expected_size = (round(img_width * 0.925), round(img_height * 0.925))
+    expected_size, offset = card_geometry(img_width, img_height)
     database = cache_database_path(outdir)
     fingerprint = card_fingerprint(v, (img_width, img_height), style, renderer)
     if (
@@ -167,17 +199,19 @@ def process_entry(
     if png_path.exists():
         print(f"[cards] {png_path} has the wrong size; regenerating.", file=common.OUT_HANDLE)
     print(f"[cards] Processing {v.ro:02} {v.country} ({v.show})", file=common.OUT_HANDLE)
-    d = svg.svg(img_width * 0.925, img_height * 0.925, width, height, origin="top-left")
+    # Only the opaque band is drawn; recaps overlay it at the recorded offset.
+    card_height = height // 4
+    d = svg.svg(*expected_size, width, card_height, origin="top-left")
 
     if v.country != 'XXX':
         scheme = country_schemes.schemes[v.country]
 
         make_entry_svg = entry_functions[style]
-        make_entry_svg(d, width, height, height // 4, v, scheme)
+        make_entry_svg(d, width, card_height, card_height, v, scheme)
 
     svg.save(d, svg_path)
     convert_svg_to_png(svg_path, png_path, renderer, inkscape, resvg)
-    store_fingerprint(database, png_path, fingerprint)
+    store_fingerprint(database, png_path, fingerprint, offset)
 
 def make_svgs(
     data: list[Data], size: tuple[int, int], style: str, outdir: Path, multi: bool,
@@ -7,8 +7,11 @@ import ctypes
 import csv
 import json
 import multiprocessing as mp
+import re
 from typing import cast
 
+import ffmpeg_tools
+
 OUT_HANDLE = sys.stdout
 ERR_HANDLE = sys.stderr
 
@@ -23,6 +26,26 @@ def parse_size(arg: str) -> tuple[int, int]:
     return w, h
 
 
+_BYTE_UNITS = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+
+
+def parse_byte_size(value: str) -> int:
+    """Parse a byte count such as ``8388608``, ``64M``, ``64MiB`` or ``1.5G``."""
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)\s*([KMGT]?)(?:I?B)?", value.strip(), flags=re.IGNORECASE)
+    if not match:
+        raise ValueError(f"Invalid byte size: {value!r}")
+    number, unit = match.groups()
+    return int(float(number) * _BYTE_UNITS[unit.upper()])
+
+
+def format_byte_size(size: int) -> str:
+    """Format a byte count with the largest binary unit that keeps it above one."""
+    for unit in ("T", "G", "M", "K"):
+        if size >= _BYTE_UNITS[unit]:
+            return f"{size / _BYTE_UNITS[unit]:.1f} {unit}iB"
+    return f"{size} B"
+
+
 def automatic_worker_count(job_count: int) -> int:
     """Choose a conservative process count for multithreaded AV1 work."""
     if job_count < 1:
@@ -117,6 +140,14 @@ class Args:
     cardsdir: Path
     clipsdir: Path
     upload_recaps: bool = True
+    cookie_file: Path | None = None
+    source_cache_budget: int = 0
+    link_mode: str = "auto"
+    download_host_limits: str = ""
+    download_bandwidth: int = 0
+    preview: bool = False
+    # Extra outputs rendered alongside the full-canvas recap.
+    renditions: tuple[ffmpeg_tools.Rendition, ...] = ()
 
 
 colours = {
@@ -1,28 +1,61 @@
 #!/usr/bin/env python3
+import asyncio
+import base64
+import binascii
 from collections import defaultdict
-from dataclasses import dataclass
+from collections.abc import Iterable, Iterator, Mapping
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
 from pathlib import Path
+import copy
+import errno
 import hashlib
-import multiprocessing as mp
+import json
+import os
 import re
 import shutil
 import sqlite3
+import sys
+import tempfile
+import threading
 import time
-from typing import Any, cast
+import zlib
+from typing import IO, Any, cast
 from urllib.error import HTTPError, URLError
 from urllib.parse import urlparse
 from urllib.request import Request, urlopen
 
+import aiohttp
 from gdown.download import download as gdown_download
 from yt_dlp import YoutubeDL
+from yt_dlp.cookies import extract_cookies_from_browser
 
+import app_cache
 import common
+import download_scheduler
+import ffmpeg_tools
 
 RECAP_MEDIA_TYPES = {"v", "a"}
 WORLD_STAGE_HOST = "media.world-stage.org"
 HTTP_HEADERS = {"User-Agent": "World Stage recap maker"}
 _YT_RE = re.compile(r"(?:youtube\.com\/watch.*?[?&]v=|youtu\.be\/)([\w-]{11})")
 _GDRIVE_RE = re.compile(r"/d/([A-Za-z0-9_-]{10,})")
+# Signed YouTube stream URLs expire after about six hours.
+YOUTUBE_INFO_TTL = 4 * 60 * 60
+_youtube_info_memo: dict[tuple[str, str], tuple[float, dict[str, Any]]] = {}
+_youtube_info_lock = threading.Lock()
+YOUTUBE_PREFETCH_JOBS = 4
+# Concurrent auth failures share one re-export of the browser cookies.
+COOKIE_REFRESH_INTERVAL = 60
+_cookie_lock = threading.Lock()
+_cookie_refreshed_at: dict[Path, float] = {}
+LINK_MODES = ("auto", "reflink", "hardlink", "symlink")
+_FICLONE = 0x40049409
+# Younger partial downloads may still be written by a concurrent run.
+PARTIAL_MAX_AGE = 60 * 60
+# Tracked partials can resume in a later run, so they are kept much longer.
+RESUMABLE_PARTIAL_MAX_AGE = 7 * 24 * 60 * 60
 
 
 @dataclass(frozen=True)
@@ -43,6 +76,20 @@ class CacheRecord:
     display_aspect: float | None
 
 
+@dataclass(frozen=True)
+class ContentDigest:
+    sha256: str
+    size: int
+
+
+@dataclass(frozen=True)
+class FetchedMedia:
+    # What yt-dlp reported for a YouTube video; other sources are probed instead.
+    display: tuple[float, int] | None = None
+    # Hashed while the bytes arrived; yt-dlp's merged output is hashed afterwards.
+    content: ContentDigest | None = None
+
+
 class YtDlpLogger:
     """Forward embedded yt-dlp warnings and errors to the application log."""
 
@@ -67,6 +114,11 @@ class DownloadSettings:
     po_token: str | None = None
     bgutil_url: str | None = None
     maximum_video_height: int | None = None
+    cookie_file: Path | None = None
+    bandwidth: download_scheduler.TokenBucket | None = None
+    rate_limit: int | None = None
+    # Extra FFmpeg output arguments for yt-dlp's format merge, such as metadata tags.
+    merge_arguments: tuple[str, ...] = ()
 
 
 @dataclass(frozen=True)
@@ -77,10 +129,35 @@ class YouTubeTopicUpload:
     thumbnail_suffix: str
 
 
+@dataclass(frozen=True)
+class YouTubeInspection:
+    """What a prefetch learned about one YouTube URL before any download starts."""
+
+    url: str
+    status: str
+    detail: str = ""
+    topic: YouTubeTopicUpload | None = None
+    format_id: str | None = None
+    width: int | None = None
+    height: int | None = None
+    filesize: int | None = None
+
+
 class YouTubeUnavailableError(RuntimeError):
     """A YouTube source is unavailable and may be skipped by a batch job."""
 
 
+def is_youtube_auth_error(error: BaseException) -> bool:
+    """Recognize yt-dlp errors that fresh browser cookies may resolve."""
+    message = str(error).lower()
+    return any(marker in message for marker in (
+        "sign in to confirm",
+        "login required",
+        "use --cookies",
+        "cookies are no longer valid",
+    ))
+
+
 def is_youtube_unavailable_error(error: BaseException) -> bool:
     """Recognize yt-dlp's explicit source-unavailable responses only."""
     message = str(error).lower()
@@ -93,6 +170,12 @@ def is_youtube_unavailable_error(error: BaseException) -> bool:
     ))
 
 
+def is_stale_stream_error(error: BaseException) -> bool:
+    """Recognize a download refused because cached stream URLs expired or were revoked."""
+    message = str(error).lower()
+    return any(marker in message for marker in ("http error 403", "http error 410"))
+
+
 def youtube_id(url: str) -> str:
     match = _YT_RE.search(url)
     if not match:
@@ -125,13 +208,75 @@ def youtube_options(settings: DownloadSettings) -> dict[str, object]:
         "no_warnings": True,
         "noplaylist": True,
     }
-    if settings.browser:
+    if settings.cookie_file is not None:
+        options["cookiefile"] = str(_private_cookie_file(settings.cookie_file))
+    elif settings.browser:
         options["cookiesfrombrowser"] = (settings.browser,)
     if settings.ffmpeg != "ffmpeg":
         options["ffmpeg_location"] = settings.ffmpeg
+    if settings.rate_limit is not None:
+        options["ratelimit"] = settings.rate_limit
     return options
 
 
+def export_browser_cookies(browser: str, destination: Path) -> None:
+    """Decrypt a browser's cookie database once into a Netscape cookie file."""
+    try:
+        jar = extract_cookies_from_browser(browser)
+        jar.save(str(destination), ignore_discard=True, ignore_expires=True)
+    except Exception as exc:
+        message = f"Could not load {browser} cookies: {exc}"
+        print(message, file=common.ERR_HANDLE)
+        raise RuntimeError(message) from exc
+    _cookie_refreshed_at[destination] = time.time()
+
+
+@contextmanager
+def browser_cookies(browser: str | None) -> Iterator[Path | None]:
+    """Yield a private cookie file exported from ``browser`` for the whole run.
+
+    yt-dlp otherwise re-reads and decrypts the browser profile for every
+    ``YoutubeDL`` it constructs.
+    """
+    if not browser:
+        yield None
+        return
+    with tempfile.TemporaryDirectory(prefix="world-stage-cookies-") as directory:
+        cookie_file = Path(directory) / "cookies.txt"
+        export_browser_cookies(browser, cookie_file)
+        print(f"[dl] Loaded {browser} cookies", file=common.OUT_HANDLE)
+        yield cookie_file
+
+
+@contextmanager
+def shared_cookies(settings: DownloadSettings) -> Iterator[DownloadSettings]:
+    """Return ``settings`` pointing at cookies exported once for all workers."""
+    if settings.cookie_file is not None:
+        yield settings
+        return
+    with browser_cookies(settings.browser) as cookie_file:
+        yield replace(settings, cookie_file=cookie_file)
+
+
+def _private_cookie_file(cookie_file: Path) -> Path:
+    """Copy the shared cookies for one ``YoutubeDL``, which saves its jar on close."""
+    private = cookie_file.with_name(f"{cookie_file.stem}-{os.getpid()}-{threading.get_ident()}.txt")
+    with _cookie_lock:
+        shutil.copyfile(cookie_file, private)
+    return private
+
+
+def refresh_cookies_after(error: BaseException, settings: DownloadSettings) -> bool:
+    """Re-export the shared cookies after an auth failure; return whether to retry."""
+    if settings.cookie_file is None or not settings.browser or not is_youtube_auth_error(error):
+        return False
+    with _cookie_lock:
+        if time.time() - _cookie_refreshed_at.get(settings.cookie_file, 0) > COOKIE_REFRESH_INTERVAL:
+            print(f"[dl] Reloading {settings.browser} cookies after: {error}", file=common.ERR_HANDLE)
+            export_browser_cookies(settings.browser, settings.cookie_file)
+    return True
+
+
 def youtube_video_format_selector(settings: DownloadSettings) -> str:
     """Prefer the best video at or below the requested height limit.
 
@@ -163,20 +308,51 @@ def youtube_video_format_selector(settings: DownloadSettings) -> str:
     )
 
 
-def youtube_topic_upload(url: str, settings: DownloadSettings) -> YouTubeTopicUpload | None:
-    """Return Topic-upload artwork metadata, or ``None`` for a normal video.
+def _youtube_info_key(url: str, settings: DownloadSettings) -> tuple[str, str]:
+    match = _YT_RE.search(url)
+    return (match.group(1) if match else url, settings.youtube_attestation_mode)
 
-    YouTube labels auto-generated music channels as ``Artist - Topic``.  These
-    uploads are audio releases, so the batch downloader stores them as M4A
-    together with yt-dlp's selected thumbnail instead of treating them as video.
+
+def youtube_info(
+    url: str, settings: DownloadSettings, refresh: bool = False, downloader: YoutubeDL | None = None,
+) -> dict[str, Any]:
+    """Return yt-dlp's sanitized info dict for a YouTube URL, extracting it at most once per TTL.
+
+    Extraction fetches the player page and solves its signature challenges,
+    so the result is kept in memory and in the shared cache keyed by video id
+    and attestation mode.  ``refresh`` discards a stale entry first.  A
+    caller-owned ``downloader`` is reused instead of opening a new one.
     """
-    if not is_youtube_url(url):
-        return None
+    key = _youtube_info_key(url, settings)
+    if refresh:
+        with _youtube_info_lock:
+            _youtube_info_memo.pop(key, None)
+        app_cache.clear_youtube_info(*key)
+    else:
+        with _youtube_info_lock:
+            memo = _youtube_info_memo.get(key)
+        if memo is not None and time.time() - memo[0] < YOUTUBE_INFO_TTL:
+            return copy.deepcopy(memo[1])
+        if (cached := app_cache.cached_youtube_info(*key, YOUTUBE_INFO_TTL)) is not None:
+            extracted_at, payload = cached
+            info = json.loads(zlib.decompress(payload))
+            # Keep the extraction time, so the memo expires with the signed URLs it holds.
+            with _youtube_info_lock:
+                _youtube_info_memo[key] = (extracted_at, info)
+            return copy.deepcopy(info)
     try:
-        options = youtube_options(settings)
-        options["skip_download"] = True
-        with YoutubeDL(cast(Any, options)) as downloader:
-            info = downloader.extract_info(url, download=False)
+        try:
+            if downloader is not None:
+                info = _extract_youtube_info(downloader, url)
+            else:
+                with YoutubeDL(cast(Any, _inspection_options(settings))) as owned:
+                    info = _extract_youtube_info(owned, url)
+        except Exception as exc:
+            if not refresh_cookies_after(exc, settings):
+                raise
+            # A shared downloader still holds the stale jar, so retry with a new one.
+            with YoutubeDL(cast(Any, _inspection_options(settings))) as owned:
+                info = _extract_youtube_info(owned, url)
     except Exception as exc:
         message = f"Could not inspect YouTube media {url}: {exc}"
         print(message, file=common.ERR_HANDLE)
@@ -185,6 +361,70 @@ def youtube_topic_upload(url: str, settings: DownloadSettings) -> YouTubeTopicUp
         raise RuntimeError(message) from exc
     if not isinstance(info, dict):
         raise RuntimeError(f"yt-dlp did not return metadata for {url}")
+    app_cache.store_youtube_info(*key, zlib.compress(json.dumps(info).encode("utf-8")))
+    with _youtube_info_lock:
+        _youtube_info_memo[key] = (time.time(), info)
+    return copy.deepcopy(info)
+
+
+def _inspection_options(settings: DownloadSettings) -> dict[str, object]:
+    options = youtube_options(settings)
+    options["skip_download"] = True
+    return options
+
+
+def _extract_youtube_info(downloader: YoutubeDL, url: str) -> Any:
+    info = downloader.extract_info(url, download=False)
+    return downloader.sanitize_info(info, remove_private_keys=True) if isinstance(info, dict) else info
+
+
+def _codec_name(codec: str) -> str:
+    """Map a yt-dlp codec string such as ``av01.0.08M.08`` to FFprobe's codec name."""
+    family = codec.split(".", 1)[0].lower()
+    return {"av01": "av1", "vp09": "vp9", "vp9": "vp9", "avc1": "h264", "mp4a": "aac"}.get(family, family)
+
+
+def remote_youtube_source(url: str, settings: DownloadSettings) -> ffmpeg_tools.RemoteSource | None:
+    """Return the selected YouTube format URLs for FFmpeg to read directly.
+
+    Returns ``None`` when a selected format is fragmented (HLS or DASH
+    segments) or lacks a direct URL, so the caller has to download it first.
+    """
+    info = youtube_info(url, settings)
+    with YoutubeDL(cast(Any, _inspection_options(settings))) as downloader:
+        selected = _selected_format(downloader, info, youtube_video_format_selector(settings))
+    if selected is None:
+        return None
+    parts = selected.get("requested_formats") or [selected]
+    if any(part.get("protocol") not in {"http", "https"} or not part.get("url") for part in parts):
+        return None
+    video = next((part for part in parts if part.get("vcodec") not in {None, "none"}), None)
+    audio = next((part for part in reversed(parts) if part.get("acodec") not in {None, "none"}), None)
+    if video is None or audio is None or not selected.get("height"):
+        return None
+    inputs = tuple(
+        ffmpeg_tools.RemoteInput(
+            str(part["url"]), tuple((str(key), str(value)) for key, value in (part.get("http_headers") or {}).items()),
+        )
+        for part in ((video,) if video is audio else (video, audio))
+    )
+    codecs = ffmpeg_tools.StreamCodecs(_codec_name(str(video["vcodec"])), _codec_name(str(audio["acodec"])))
+    return ffmpeg_tools.RemoteSource(inputs, codecs, int(selected["height"]))
+
+
+def youtube_topic_upload(url: str, settings: DownloadSettings) -> YouTubeTopicUpload | None:
+    """Return Topic-upload artwork metadata, or ``None`` for a normal video.
+
+    YouTube labels auto-generated music channels as ``Artist - Topic``.  These
+    uploads are audio releases, so the batch downloader stores them as M4A
+    together with yt-dlp's selected thumbnail instead of treating them as video.
+    """
+    if not is_youtube_url(url):
+        return None
+    return _topic_upload_from_info(url, youtube_info(url, settings))
+
+
+def _topic_upload_from_info(url: str, info: dict[str, Any]) -> YouTubeTopicUpload | None:
     if not any(
         isinstance(value, str) and value.strip().lower().endswith(" - topic")
         for value in (info.get("channel"), info.get("uploader"))
@@ -199,6 +439,93 @@ def youtube_topic_upload(url: str, settings: DownloadSettings) -> YouTubeTopicUp
     return YouTubeTopicUpload(thumbnail_url, thumbnail_suffix)
 
 
+def _selected_format(downloader: YoutubeDL, info: dict[str, Any], selector: str) -> dict[str, Any] | None:
+    """Run yt-dlp's format selection on extracted info without downloading."""
+    formats = info.get("formats") or []
+    if not formats:
+        return None
+    has_video = [fmt.get("vcodec") != "none" for fmt in formats]
+    has_audio = [fmt.get("acodec") != "none" for fmt in formats]
+    context = {
+        "formats": formats,
+        "has_merged_format": any(v and a for v, a in zip(has_video, has_audio)),
+        "incomplete_formats": all(has_video) and not any(has_audio) or all(has_audio) and not any(has_video),
+    }
+    return next(iter(downloader.build_format_selector(selector)(context)), None)
+
+
+def _inspect_youtube(
+    downloader: YoutubeDL, url: str, settings: DownloadSettings,
+) -> YouTubeInspection:
+    try:
+        info = youtube_info(url, settings, downloader=downloader)
+        topic = _topic_upload_from_info(url, info)
+    except YouTubeUnavailableError as exc:
+        return YouTubeInspection(url, "unavailable", str(exc))
+    except RuntimeError as exc:
+        # Leave other failures to the download itself, which reports them per row.
+        return YouTubeInspection(url, "failed", str(exc))
+    # Topic uploads are fetched as plain M4A audio, like fetch_external's audio selector.
+    selector = "ba[ext=m4a]/ba" if topic is not None else youtube_video_format_selector(settings)
+    selected = _selected_format(downloader, info, selector)
+    if selected is None:
+        return YouTubeInspection(url, "topic" if topic else "video", topic=topic)
+    parts = selected.get("requested_formats") or [selected]
+    sizes: list[int] = []
+    for part in parts:
+        size = part.get("filesize") or part.get("filesize_approx")
+        if isinstance(size, (int, float)) and size > 0:
+            sizes.append(int(size))
+    return YouTubeInspection(
+        url, "topic" if topic else "video",
+        topic=topic,
+        format_id=selected.get("format_id"),
+        width=selected.get("width"),
+        height=selected.get("height"),
+        # A merged download's size is only known when every part reports one.
+        filesize=sum(sizes) if len(sizes) == len(parts) else None,
+    )
+
+
+def prefetch_youtube(
+    urls: Iterable[str], settings: DownloadSettings, jobs: int = YOUTUBE_PREFETCH_JOBS,
+) -> dict[str, YouTubeInspection]:
+    """Inspect every YouTube URL up front with one ``YoutubeDL`` per thread.
+
+    Unavailable sources are reported before any long download or encode
+    starts, and the extracted info is left in the metadata cache for the
+    downloads that follow.
+    """
+    pending = list(dict.fromkeys(url for url in urls if is_youtube_url(url)))
+    if not pending:
+        return {}
+    local = threading.local()
+    opened: list[YoutubeDL] = []
+
+    def inspect(url: str) -> YouTubeInspection:
+        downloader = getattr(local, "downloader", None)
+        if downloader is None:
+            downloader = local.downloader = YoutubeDL(cast(Any, _inspection_options(settings)))
+            with _youtube_info_lock:
+                opened.append(downloader)
+        return _inspect_youtube(downloader, url, settings)
+
+    start = time.time()
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, min(jobs, len(pending)))) as executor:
+            inspections = dict(zip(pending, executor.map(inspect, pending)))
+    finally:
+        for downloader in opened:
+            downloader.close()
+    unavailable = sum(inspection.status == "unavailable" for inspection in inspections.values())
+    print(
+        f"[dl] Inspected {len(inspections)} YouTube sources in {time.time() - start:.2f} seconds"
+        f" ({unavailable} unavailable)",
+        file=common.OUT_HANDLE,
+    )
+    return inspections
+
+
 def cache_database_path(sources_dir: Path) -> Path:
     return sources_dir / "source-cache.sqlite3"
 
@@ -223,6 +550,14 @@ def initialize_cache(database: Path) -> None:
         columns = {row[1] for row in conn.execute("PRAGMA table_info(source_cache)")}
         if "display_height" not in columns:
             conn.execute("ALTER TABLE source_cache ADD COLUMN display_height INTEGER")
+        if "accessed_at" not in columns:
+            conn.execute("ALTER TABLE source_cache ADD COLUMN accessed_at INTEGER")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS source_cache_counters (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            )
+        """)
         if "source_cache_legacy" in {
             row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")
         }:
@@ -236,18 +571,63 @@ def initialize_cache(database: Path) -> None:
                     VALUES (?, ?, ?, ?, NULL, ?)
                 """, (key, url, etag, media_path, updated_at))
             conn.execute("DROP TABLE source_cache_legacy")
-        for key, stored_path in conn.execute("SELECT cache_key, object_path FROM source_cache"):
-            normalized = str(Path(stored_path).resolve())
+        if "content_sha256" not in columns:
+            conn.execute("ALTER TABLE source_cache ADD COLUMN content_sha256 TEXT")
+        if "content_size" not in columns:
+            conn.execute("ALTER TABLE source_cache ADD COLUMN content_size INTEGER")
+        conn.execute("CREATE INDEX IF NOT EXISTS source_cache_content ON source_cache (content_sha256)")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS source_aliases (
+                alias_path TEXT PRIMARY KEY,
+                object_path TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL
+            )
+        """)
+        # Objects are stored relative to the sources directory so it can be moved.
+        sources_dir = database.parent
+        for key, stored_path in conn.execute("SELECT cache_key, object_path FROM source_cache").fetchall():
+            normalized = _stored_path(sources_dir, Path(stored_path))
             if normalized != stored_path:
                 conn.execute("UPDATE source_cache SET object_path = ? WHERE cache_key = ?", (normalized, key))
 
 
-def cache_key(kind: str, url: str, etag: str | None) -> str:
+def _stored_path(sources_dir: Path, path: Path) -> str:
+    """Return how the cache stores ``path``: relative when it lies in ``sources_dir``."""
+    if not path.is_absolute():
+        return path.as_posix()
+    resolved = path.resolve()
+    try:
+        return resolved.relative_to(sources_dir.resolve()).as_posix()
+    except ValueError:
+        return str(resolved)
+
+
+def _alias_key(sources_dir: Path, alias: Path) -> str:
+    # Aliases may be symlinks, so they are located without resolving them.
+    return alias.absolute().relative_to(sources_dir.absolute()).as_posix()
+
+
+def cache_key(kind: str, url: str, etag: str | None, maximum_height: int | None = None) -> str:
     if is_world_stage_url(url) and etag:
         return f"{kind}:etag:{etag}"
+    if maximum_height is not None and is_youtube_url(url):
+        return f"{kind}:url:{url}:height<={maximum_height}"
     return f"{kind}:url:{url}"
 
 
+def source_keys(kind: str, url: str, etag: str | None, maximum_height: int | None = None) -> list[str]:
+    """Return the cache keys that satisfy a source, the exact one first.
+
+    An uncapped download is at least as good as any capped one, so it is
+    reused rather than fetching the source again at a lower resolution.
+    """
+    keys = [cache_key(kind, url, etag, maximum_height)]
+    if (uncapped := cache_key(kind, url, etag)) not in keys:
+        keys.append(uncapped)
+    return keys
+
+
 def read_cache_record(database: Path, key: str) -> CacheRecord | None:
     with sqlite3.connect(database, timeout=30) as conn:
         row = conn.execute(
@@ -256,22 +636,104 @@ def read_cache_record(database: Path, key: str) -> CacheRecord | None:
         ).fetchone()
     if row is None:
         return None
-    return CacheRecord(row[0], row[1], Path(row[2]), row[3])
+    return CacheRecord(row[0], row[1], database.parent / row[2], row[3])
 
 
 def write_cache_record(
-    database: Path, key: str, url: str, etag: str | None, object_path: Path,
+    database: Path, key: str, url: str, etag: str | None, object_path: Path, content: ContentDigest | None = None,
 ) -> None:
     with sqlite3.connect(database, timeout=30) as conn:
         conn.execute("""
-            INSERT INTO source_cache (cache_key, url, etag, object_path, updated_at)
-            VALUES (?, ?, ?, ?, ?)
+            INSERT INTO source_cache (cache_key, url, etag, object_path, content_sha256, content_size, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
             ON CONFLICT(cache_key) DO UPDATE SET
                 url = excluded.url,
                 etag = excluded.etag,
                 object_path = excluded.object_path,
+                content_sha256 = excluded.content_sha256,
+                content_size = excluded.content_size,
                 updated_at = excluded.updated_at
-        """, (key, url, etag, str(object_path.resolve()), int(time.time())))
+        """, (
+            key, url, etag, _stored_path(database.parent, object_path),
+            content.sha256 if content is not None else None, content.size if content is not None else None,
+            int(time.time()),
+        ))
+
+
+def object_with_content(database: Path, content_sha256: str) -> Path | None:
+    """Return an existing cached object with identical content, if any."""
+    with sqlite3.connect(database, timeout=30) as conn:
+        rows = conn.execute(
+            "SELECT object_path FROM source_cache WHERE content_sha256 = ?", (content_sha256,),
+        ).fetchall()
+    for (stored_path,) in rows:
+        if (path := database.parent / stored_path).exists():
+            return path
+    return None
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as source:
+        while block := source.read(1024 * 1024):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def content_digests(sources_dir: Path, media_paths: Iterable[Path]) -> dict[Path, str]:
+    """Return the download-time SHA-256 of cached sources, keyed by the alias or object path given.
+
+    A file whose size or alias record no longer matches is left out, so it
+    is identified by its stat instead.
+    """
+    database = cache_database_path(sources_dir)
+    result: dict[Path, str] = {}
+    with sqlite3.connect(database, timeout=30) as conn:
+        for path in dict.fromkeys(media_paths):
+            try:
+                size, link = path.stat().st_size, path.lstat()
+            except OSError:
+                continue
+            try:
+                alias = conn.execute(
+                    "SELECT object_path, size, mtime_ns FROM source_aliases WHERE alias_path = ?",
+                    (_alias_key(sources_dir, path),),
+                ).fetchone()
+            except ValueError:
+                alias = None
+            if alias is not None and (link.st_size, link.st_mtime_ns) != tuple(alias[1:]):
+                continue
+            row = conn.execute("""
+                SELECT content_sha256 FROM source_cache
+                WHERE object_path = ? AND content_size = ? AND content_sha256 IS NOT NULL
+            """, (alias[0] if alias is not None else _stored_path(sources_dir, path), size)).fetchone()
+            if row is not None:
+                result[path] = row[0]
+    return result
+
+
+def record_cache_access(database: Path, key: str, hit: bool) -> None:
+    """Count a cache lookup and, for hits, refresh the entry's LRU timestamp."""
+    with sqlite3.connect(database, timeout=30) as conn:
+        if hit:
+            conn.execute(
+                "UPDATE source_cache SET accessed_at = ? WHERE cache_key = ?", (int(time.time()), key),
+            )
+        conn.execute("""
+            INSERT INTO source_cache_counters (name, value) VALUES (?, 1)
+            ON CONFLICT(name) DO UPDATE SET value = value + 1
+        """, ("hits" if hit else "misses",))
+
+
+def _source_object(conn: sqlite3.Connection, sources_dir: Path, media_path: Path) -> str:
+    """Map a show alias to the stored path of the object it was linked from."""
+    try:
+        row = conn.execute(
+            "SELECT object_path FROM source_aliases WHERE alias_path = ?", (_alias_key(sources_dir, media_path),),
+        ).fetchone()
+    except ValueError:
+        row = None
+    return row[0] if row is not None else _stored_path(sources_dir, media_path)
 
 
 def cached_display_properties(sources_dir: Path, media_path: Path) -> tuple[float, int] | None:
@@ -279,12 +741,35 @@ def cached_display_properties(sources_dir: Path, media_path: Path) -> tuple[floa
     with sqlite3.connect(database, timeout=30) as conn:
         row = conn.execute(
             "SELECT display_aspect, display_height FROM source_cache WHERE object_path = ?",
-            (str(media_path.resolve()),),
+            (_source_object(conn, sources_dir, media_path),),
         ).fetchone()
     if row is None or row[0] is None or row[1] is None:
         return None
     return float(row[0]), int(row[1])
 
+
+def cached_display_properties_many(
+    sources_dir: Path, media_paths: Iterable[Path],
+) -> dict[Path, tuple[float, int]]:
+    """Look up display properties for many aliases or objects over one connection."""
+    database = cache_database_path(sources_dir)
+    paths = list(dict.fromkeys(media_paths))
+    result: dict[Path, tuple[float, int]] = {}
+    with sqlite3.connect(database, timeout=30) as conn:
+        conn.execute("CREATE TEMP TABLE wanted (position INTEGER PRIMARY KEY, stored TEXT NOT NULL)")
+        conn.executemany(
+            "INSERT INTO wanted (position, stored) VALUES (?, ?)",
+            ((position, _source_object(conn, sources_dir, path)) for position, path in enumerate(paths)),
+        )
+        for position, aspect, height in conn.execute("""
+            SELECT wanted.position, source_cache.display_aspect, source_cache.display_height
+            FROM wanted JOIN source_cache ON source_cache.object_path = wanted.stored
+            WHERE source_cache.display_aspect IS NOT NULL AND source_cache.display_height IS NOT NULL
+        """):
+            result[paths[position]] = float(aspect), int(height)
+    return result
+
+
 def store_display_properties(
     sources_dir: Path, media_path: Path, aspect: float, height: int,
 ) -> None:
@@ -292,7 +777,7 @@ def store_display_properties(
     with sqlite3.connect(database, timeout=30) as conn:
         conn.execute(
             "UPDATE source_cache SET display_aspect = ?, display_height = ? WHERE object_path = ?",
-            (aspect, height, str(media_path.resolve())),
+            (aspect, height, _source_object(conn, sources_dir, media_path)),
         )
 
 
@@ -315,23 +800,153 @@ def world_stage_etag(url: str) -> str | None:
         raise RuntimeError(message) from exc
 
 
-def download_direct(url: str, destination: Path) -> None:
-    """Stream a direct URL and resume a partial file when the server supports it."""
+def _resume_request(url: str, destination: Path) -> tuple[int, dict[str, str]] | None:
+    """Return the offset and headers that continue ``destination``, or ``None`` if it is complete.
+
+    Only a partial tracked with a validator for the same URL is continued;
+    ``If-Range`` makes the server resend the whole file if it has changed.
+    """
+    record = app_cache.cached_partial_download(destination)
     offset = destination.stat().st_size if destination.exists() else 0
-    headers = dict(HTTP_HEADERS)
-    if offset:
-        headers["Range"] = f"bytes={offset}-"
-    request = Request(url, headers=headers)
+    if not offset or record is None or record.url != url or not record.validator:
+        return 0, {}
+    if record.expected_size is not None:
+        if offset == record.expected_size:
+            return None
+        if offset > record.expected_size:
+            return 0, {}
+    return offset, {"Range": f"bytes={offset}-", "If-Range": record.validator}
+
+
+def _track_response(url: str, destination: Path, offset: int, status: int, headers: Any) -> bool:
+    """Record the size and validator a response promises; return whether it continues the partial."""
+    resumed = bool(offset) and status == 206
+    expected_size = None
+    if headers.get("Content-Encoding", "identity") == "identity":
+        if resumed:
+            match = re.fullmatch(r"bytes \d+-\d+/(\d+)", headers.get("Content-Range", "").strip())
+            expected_size = int(match[1]) if match else None
+        elif (length := headers.get("Content-Length", "")).isdigit():
+            expected_size = int(length)
+    etag = headers.get("ETag")
+    # If-Range only accepts strong validators.
+    validator = etag if etag and not etag.startswith("W/") else headers.get("Last-Modified")
+    app_cache.store_partial_download(destination, url, expected_size, validator)
+    return resumed
+
+
+def _range_not_satisfiable(url: str, destination: Path, offset: int, headers: Any) -> bool:
+    """Settle an HTTP 416 answer to a resume request; return whether the partial is already complete.
+
+    ``If-Range`` lets a server refuse the range only while the validator still
+    matches, so a partial as long as the reported size holds the whole file.
+    Otherwise it is discarded and the next request starts over.
+    """
+    match = re.fullmatch(r"bytes \*/(\d+)", headers.get("Content-Range", "").strip())
+    record = app_cache.cached_partial_download(destination)
+    if match is not None and int(match[1]) == offset and record is not None:
+        app_cache.store_partial_download(destination, url, offset, record.validator)
+        return True
+    app_cache.clear_partial_download(destination)
+    destination.unlink(missing_ok=True)
+    return False
+
+
+def _published_checksums(headers: Any, resumed: bool) -> dict[str, str]:
+    """Return the whole-file checksums a response publishes, as hex digests by hashlib name.
+
+    ``Repr-Digest``, ``Digest`` and ``x-goog-hash`` describe the whole file;
+    ``Content-MD5`` only covers the body, so it is ignored on a range response.
+    """
+    if headers.get("Content-Encoding", "identity") != "identity":
+        return {}
+    fields = [headers.get(name, "") for name in ("Repr-Digest", "Digest", "x-goog-hash")]
+    if not resumed and (md5 := headers.get("Content-MD5")):
+        fields.append(f"md5={md5}")
+    checksums: dict[str, str] = {}
+    for item in ",".join(fields).split(","):
+        name, separator, value = item.strip().partition("=")
+        algorithm = {"sha-256": "sha256", "md5": "md5"}.get(name.lower())
+        if not separator or algorithm is None:
+            continue
+        try:
+            digest = base64.b64decode(value.strip().strip(":"), validate=True)
+        except binascii.Error:
+            continue
+        if len(digest) == hashlib.new(algorithm).digest_size:
+            checksums[algorithm] = digest.hex()
+    return checksums
+
+
+def _content_hashes(destination: Path, resumed: bool, algorithms: Iterable[str]) -> dict[str, Any]:
+    """Start hashing the final content of ``destination``, fed the bytes a resumed partial already holds."""
+    hashes = {name: hashlib.new(name) for name in {"sha256", *algorithms}}
+    if resumed:
+        with destination.open("rb") as existing:
+            while block := existing.read(1024 * 1024):
+                for digest in hashes.values():
+                    digest.update(block)
+    return hashes
+
+
+def _write_block(output: IO[bytes], hashes: dict[str, Any], block: bytes) -> None:
+    output.write(block)
+    for digest in hashes.values():
+        digest.update(block)
+
+
+def _finish_partial(
+    url: str, destination: Path, hashes: dict[str, Any], checksums: dict[str, str],
+) -> ContentDigest:
+    """Check a finished transfer against its expected size and checksums and stop tracking it."""
+    record = app_cache.cached_partial_download(destination)
+    size = destination.stat().st_size
+    if record is not None and record.expected_size is not None and size != record.expected_size:
+        message = f"Download of {url} stopped at {size} of {record.expected_size} bytes; run again to resume it"
+        print(message, file=common.ERR_HANDLE)
+        raise RuntimeError(message)
+    app_cache.clear_partial_download(destination)
+    mismatched = [name for name, expected in checksums.items() if hashes[name].hexdigest() != expected]
+    if mismatched:
+        # Resuming cannot repair corrupt bytes, so the next attempt starts over.
+        destination.unlink(missing_ok=True)
+        message = f"Download of {url} does not match the server's {', '.join(mismatched)} checksum"
+        print(message, file=common.ERR_HANDLE)
+        raise RuntimeError(message)
+    return ContentDigest(hashes["sha256"].hexdigest(), size)
+
+
+def download_direct(
+    url: str, destination: Path, bandwidth: download_scheduler.TokenBucket | None = None,
+) -> ContentDigest:
+    """Stream a direct URL, resuming a tracked partial file from an earlier attempt or run.
+
+    The content is hashed as it is written and checked against any checksum
+    the server publishes.
+    """
+    if (resume := _resume_request(url, destination)) is None:
+        return _finish_partial(url, destination, _content_hashes(destination, True, ()), {})
+    offset, resume_headers = resume
+    request = Request(url, headers={**HTTP_HEADERS, **resume_headers})
     try:
         with urlopen(request, timeout=60) as response:
-            status = response.getcode()
-            mode = "ab" if offset and status == 206 else "wb"
-            with destination.open(mode) as output:
-                shutil.copyfileobj(response, output, length=1024 * 1024)
+            resumed = _track_response(url, destination, offset, response.getcode(), response.headers)
+            checksums = _published_checksums(response.headers, resumed)
+            hashes = _content_hashes(destination, resumed, checksums)
+            with destination.open("ab" if resumed else "wb") as output:
+                while block := response.read(1024 * 1024):
+                    if bandwidth is not None:
+                        bandwidth.consume(len(block))
+                    _write_block(output, hashes, block)
     except (HTTPError, URLError) as exc:
+        if isinstance(exc, HTTPError) and exc.code == 416 and offset:
+            if _range_not_satisfiable(url, destination, offset, exc.headers):
+                return _finish_partial(url, destination, _content_hashes(destination, True, ()), {})
+            return download_direct(url, destination, bandwidth)
         message = f"Could not download {url}: {exc}"
         print(message, file=common.ERR_HANDLE)
         raise RuntimeError(message) from exc
+    return _finish_partial(url, destination, hashes, checksums)
 
 
 def object_path(sources_dir: Path, key: str, suffix: str) -> Path:
@@ -341,25 +956,328 @@ def object_path(sources_dir: Path, key: str, suffix: str) -> Path:
     return path
 
 
-def link_object(existing: Path, alias: Path) -> Path:
+def _reflink(source: Path, destination: Path) -> None:
+    """Clone ``source`` copy-on-write (Linux FICLONE), failing on other filesystems."""
+    if not sys.platform.startswith("linux"):
+        raise OSError(errno.EOPNOTSUPP, "Reflinks are only implemented on Linux")
+    import fcntl
+
+    with source.open("rb") as src, destination.open("xb") as dst:
+        fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+
+
+def _is_linked(existing: Path, alias: Path, mode: str) -> bool:
+    if not alias.exists():
+        return False
+    if alias.is_symlink():
+        # Absolute symlinks from older runs break when the directory moves.
+        return mode == "symlink" and not os.path.isabs(os.readlink(alias)) and alias.resolve() == existing.resolve()
+    return mode != "symlink" and os.path.samefile(existing, alias)
+
+
+def link_object(existing: Path, alias: Path, mode: str = "symlink") -> Path:
+    """Expose ``existing`` at ``alias`` by reflink, hard link or relative symlink.
+
+    ``auto`` tries those in order, so aliases survive moving the sources
+    directory and work for ffmpeg without following links.
+    """
+    if mode not in LINK_MODES:
+        raise ValueError(f"Unknown source link mode: {mode!r}")
     alias.parent.mkdir(parents=True, exist_ok=True)
-    if existing.absolute() == alias.absolute():
-        return alias
-    if alias.is_symlink() and alias.resolve() == existing.resolve():
+    if existing.absolute() == alias.absolute() or _is_linked(existing, alias, mode):
         return alias
     if alias.exists() or alias.is_symlink():
         alias.unlink()
-    alias.symlink_to(existing.absolute())
+    error: OSError | None = None
+    for method in ("reflink", "hardlink", "symlink") if mode == "auto" else (mode,):
+        try:
+            if method == "reflink":
+                _reflink(existing, alias)
+            elif method == "hardlink":
+                alias.hardlink_to(existing)
+            else:
+                alias.symlink_to(os.path.relpath(existing.resolve(), alias.parent.resolve()))
+            return alias
+        except OSError as exc:
+            error = exc
+            alias.unlink(missing_ok=True)
+    raise RuntimeError(f"Could not link {alias} to {existing}: {error}")
+
+
+def link_source(sources_dir: Path, existing: Path, alias: Path, mode: str) -> Path:
+    """Link a cached object to a show alias and remember which object it came from."""
+    database = cache_database_path(sources_dir)
+    key = _alias_key(sources_dir, alias)
+    stored_object = _stored_path(sources_dir, existing)
+    with sqlite3.connect(database, timeout=30) as conn:
+        row = conn.execute(
+            "SELECT object_path, size, mtime_ns FROM source_aliases WHERE alias_path = ?", (key,),
+        ).fetchone()
+    # Reflinked aliases cannot be told apart from copies, so trust an unchanged record.
+    if row is not None and row[0] == stored_object and alias.exists():
+        stat = alias.lstat()
+        kind_matches = mode == "auto" or alias.is_symlink() == (mode == "symlink")
+        if kind_matches and (stat.st_size, stat.st_mtime_ns) == tuple(row[1:]):
+            return alias
+    link_object(existing, alias, mode)
+    stat = alias.lstat()
+    with sqlite3.connect(database, timeout=30) as conn:
+        conn.execute("""
+            INSERT INTO source_aliases (alias_path, object_path, size, mtime_ns) VALUES (?, ?, ?, ?)
+            ON CONFLICT(alias_path) DO UPDATE SET
+                object_path = excluded.object_path, size = excluded.size, mtime_ns = excluded.mtime_ns
+        """, (key, stored_object, stat.st_size, stat.st_mtime_ns))
     return alias
 
 
+@dataclass(frozen=True)
+class SourceCacheStats:
+    """Source cache usage and the space a garbage collection would free."""
+
+    entries: int
+    total_bytes: int
+    hits: int
+    misses: int
+    orphan_bytes: int
+    partial_bytes: int
+    evictable_bytes: int
+    # Evictable or orphaned data that hard-linked or reflinked aliases keep on disk.
+    shared_bytes: int = 0
+
+    @property
+    def hit_rate(self) -> float | None:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else None
+
+    @property
+    def reclaimable_bytes(self) -> int:
+        return self.orphan_bytes + self.partial_bytes + self.evictable_bytes
+
+
+@dataclass(frozen=True)
+class _CachedObject:
+    keys: tuple[str, ...]
+    path: Path
+    last_used: int
+    size: int
+    # Removing a shared object frees nothing while its aliases remain.
+    shared: bool = False
+
+
+def protected_objects(sources_dir: Path, shows: Iterable[str]) -> set[Path]:
+    """Return the objects that the given shows' aliases were linked from."""
+    protected: set[Path] = set()
+    with sqlite3.connect(cache_database_path(sources_dir), timeout=30) as conn:
+        for show in shows:
+            protected.update(
+                (sources_dir / stored_path).resolve()
+                for (stored_path,) in conn.execute(
+                    "SELECT object_path FROM source_aliases WHERE substr(alias_path, 1, ?) = ?",
+                    (len(show) + 1, f"{show}/"),
+                )
+            )
+            directory = sources_dir / show
+            if directory.is_dir():
+                protected.update(alias.resolve() for alias in directory.iterdir() if alias.is_symlink())
+    return protected
+
+
+def _cache_inventory(sources_dir: Path) -> tuple[list[_CachedObject], list[str], list[Path], list[Path]]:
+    """Split the object store into live entries, dangling rows, orphans and stale partials."""
+    with sqlite3.connect(cache_database_path(sources_dir), timeout=30) as conn:
+        rows = conn.execute(
+            "SELECT cache_key, object_path, COALESCE(accessed_at, updated_at) FROM source_cache"
+        ).fetchall()
+    # Content deduplication lets several cache keys share one object.
+    grouped: dict[Path, tuple[list[str], int]] = {}
+    dangling: list[str] = []
+    for key, stored_path, last_used in rows:
+        path = (sources_dir / stored_path).resolve()
+        if not path.exists():
+            dangling.append(key)
+            continue
+        keys, used = grouped.setdefault(path, ([], 0))
+        keys.append(key)
+        grouped[path] = (keys, max(used, last_used))
+    copied = _copied_objects(sources_dir)
+    entries = [
+        _CachedObject(
+            tuple(keys), path, last_used, (stat := path.stat()).st_size, stat.st_nlink > 1 or path in copied,
+        )
+        for path, (keys, last_used) in grouped.items()
+    ]
+    referenced = {entry.path for entry in entries}
+    orphans: list[Path] = []
+    partials: list[Path] = []
+    objects = sources_dir / "objects"
+    resumable = _resumable_prefixes(objects)
+    for path in objects.iterdir() if objects.is_dir() else ():
+        if not path.is_file() or path.resolve() in referenced:
+            continue
+        if ".download" in path.suffixes:
+            if _is_stale_partial(path, resumable):
+                partials.append(path)
+        else:
+            orphans.append(path)
+    return entries, dangling, orphans, partials
+
+
+def _copied_objects(sources_dir: Path) -> set[Path]:
+    """Return objects with a reflinked alias, whose blocks stay allocated when the object goes."""
+    with sqlite3.connect(cache_database_path(sources_dir), timeout=30) as conn:
+        rows = conn.execute("SELECT alias_path, object_path FROM source_aliases").fetchall()
+    return {
+        (sources_dir / stored_path).resolve()
+        for alias_path, stored_path in rows
+        if (alias := sources_dir / alias_path).exists() and not alias.is_symlink()
+    }
+
+
+def _is_shared(path: Path, entries: dict[Path, _CachedObject]) -> bool:
+    entry = entries.get(path)
+    return entry.shared if entry is not None else path.stat().st_nlink > 1
+
+
+def _resumable_prefixes(directory: Path) -> set[str]:
+    """Return the file-name stems of partial downloads tracked for resuming in ``directory``."""
+    return {path.name.split(".", 1)[0] for path in app_cache.partial_downloads_in(directory)}
+
+
+def _is_stale_partial(path: Path, resumable: set[str]) -> bool:
+    max_age = RESUMABLE_PARTIAL_MAX_AGE if path.name.split(".", 1)[0] in resumable else PARTIAL_MAX_AGE
+    return path.stat().st_mtime < time.time() - max_age
+
+
+def _forget_removed_partials(directory: Path) -> None:
+    """Stop tracking partial downloads whose working files are all gone."""
+    for tracked in app_cache.partial_downloads_in(directory):
+        if not tracked.exists() and not _partial_files(tracked):
+            app_cache.clear_partial_download(tracked)
+
+
+def prune_partials(directory: Path) -> int:
+    """Remove partial downloads in ``directory`` too old to resume; return freed bytes."""
+    if not directory.is_dir():
+        return 0
+    freed = 0
+    for path in directory.iterdir():
+        if not path.is_file() or ".download" not in path.suffixes:
+            continue
+        if path.stat().st_mtime < time.time() - RESUMABLE_PARTIAL_MAX_AGE:
+            freed += path.stat().st_size
+            path.unlink(missing_ok=True)
+    _forget_removed_partials(directory)
+    return freed
+
+
+def _eviction_candidates(
+    entries: list[_CachedObject], budget: int, protected: set[Path],
+) -> list[_CachedObject]:
+    """Pick least-recently-used unprotected entries until the store fits ``budget``."""
+    excess = sum(entry.size for entry in entries) - budget
+    if budget <= 0 or excess <= 0:
+        return []
+    candidates: list[_CachedObject] = []
+    for entry in sorted(entries, key=lambda entry: entry.last_used):
+        if excess <= 0:
+            break
+        if entry.path in protected:
+            continue
+        candidates.append(entry)
+        excess -= entry.size
+    return candidates
+
+
+def source_cache_stats(sources_dir: Path, budget: int = 0, protected: set[Path] | None = None) -> SourceCacheStats:
+    entries, _, orphans, partials = _cache_inventory(sources_dir)
+    with sqlite3.connect(cache_database_path(sources_dir), timeout=30) as conn:
+        counters = dict(conn.execute("SELECT name, value FROM source_cache_counters").fetchall())
+    evicted = _eviction_candidates(entries, budget, protected or set())
+    orphan_sizes = [(path.stat().st_size, path.stat().st_nlink > 1) for path in orphans]
+    return SourceCacheStats(
+        entries=len(entries),
+        total_bytes=sum(entry.size for entry in entries),
+        hits=counters.get("hits", 0),
+        misses=counters.get("misses", 0),
+        orphan_bytes=sum(size for size, shared in orphan_sizes if not shared),
+        partial_bytes=sum(path.stat().st_size for path in partials),
+        evictable_bytes=sum(entry.size for entry in evicted if not entry.shared),
+        shared_bytes=(
+            sum(entry.size for entry in evicted if entry.shared)
+            + sum(size for size, shared in orphan_sizes if shared)
+        ),
+    )
+
+
+def collect_garbage(sources_dir: Path, budget: int = 0, protected: set[Path] | None = None) -> int:
+    """Remove orphans, stale partials and LRU objects over ``budget``; return freed bytes.
+
+    A ``budget`` of zero keeps every cached object.  Objects in ``protected``
+    are never evicted; other shows' aliases to an evicted object dangle until
+    their next download fetches it again.  Objects that hard-linked or
+    reflinked aliases still share are removed but not counted as freed.
+    """
+    entries, dangling, orphans, partials = _cache_inventory(sources_dir)
+    evicted = _eviction_candidates(entries, budget, protected or set())
+    by_path = {entry.path: entry for entry in evicted}
+    freed = shared = 0
+    for path in [*orphans, *partials, *by_path]:
+        size = path.stat().st_size
+        if _is_shared(path, by_path):
+            shared += size
+        else:
+            freed += size
+        path.unlink(missing_ok=True)
+    _forget_removed_partials(sources_dir / "objects")
+    with sqlite3.connect(cache_database_path(sources_dir), timeout=30) as conn:
+        conn.executemany(
+            "DELETE FROM source_cache WHERE cache_key = ?",
+            [(key,) for key in [*dangling, *(key for entry in evicted for key in entry.keys)]],
+        )
+    if freed or shared or dangling:
+        kept = f" ({common.format_byte_size(shared)} stays in use by linked aliases)" if shared else ""
+        print(
+            f"[dl] Source cache: evicted {len(evicted)} objects, removed {len(orphans)} orphans and "
+            f"{len(partials)} partial downloads, freed {common.format_byte_size(freed)}{kept}",
+            file=common.OUT_HANDLE,
+        )
+    return freed
+
+
+def _partial_files(destination: Path) -> list[Path]:
+    """Return the downloader's working files for ``destination``, such as ``.part`` and format files."""
+    prefix = destination.with_suffix("").name
+    return [
+        path for path in destination.parent.glob(f"{prefix}.*")
+        if path.is_file() and "." in path.name[len(prefix) + 1:]
+    ]
+
+
+def _claim_partials(url: str, destination: Path) -> None:
+    """Track a downloader's working files for ``url``, discarding any another URL left behind.
+
+    yt-dlp and gdown resume these files by name alone.  yt-dlp partials are
+    tracked by URL only: it reports neither a size nor a validator per
+    format file.  Google Drive partials also record the size gdown reports.
+    """
+    record = app_cache.cached_partial_download(destination)
+    if record is None or record.url != url:
+        for path in [destination, *_partial_files(destination)]:
+            path.unlink(missing_ok=True)
+        app_cache.store_partial_download(destination, url, None, None)
+
+
 def fetch_external(
     url: str,
     media_type: str,
     destination: Path,
     settings: DownloadSettings,
-) -> None:
-    """Download one external media file to an exact destination path."""
+) -> FetchedMedia:
+    """Download one external media file to an exact destination path.
+
+    Returns the display aspect and height yt-dlp reported for a YouTube video
+    and, for other sources, the digest computed while the file was written.
+    """
     if is_youtube_url(url):
         if media_type == "a":
             format_selector = "ba[acodec^=opus]/ba" if settings.prefer_av1_opus else "ba[ext=m4a]/ba"
@@ -373,73 +1291,346 @@ def fetch_external(
         })
         if media_type == "v":
             options["merge_output_format"] = "mp4"
+            if settings.merge_arguments:
+                options["postprocessor_args"] = {"merger+ffmpeg_o": list(settings.merge_arguments)}
+        # Finished formats and .part files from an interrupted run are continued, not fetched again.
+        options["continuedl"] = True
+        _claim_partials(url, destination)
+        destination.unlink(missing_ok=True)
         try:
-            with YoutubeDL(cast(Any, options)) as downloader:
-                status = downloader.download([url])
-            if status:
-                raise RuntimeError(f"yt-dlp exited with status {status}")
+            info = youtube_info(url, settings)
+            try:
+                with YoutubeDL(cast(Any, options)) as downloader:
+                    info = downloader.process_ie_result(cast(Any, info), download=True)
+            except Exception as exc:
+                if refresh_cookies_after(exc, settings):
+                    options.update(youtube_options(settings))
+                elif not is_stale_stream_error(exc):
+                    raise
+                # Cached stream URLs may have expired or been revoked; extract once more.
+                print(f"[dl] Retrying {url} with fresh metadata: {exc}", file=common.ERR_HANDLE)
+                info = youtube_info(url, settings, refresh=True)
+                with YoutubeDL(cast(Any, options)) as downloader:
+                    info = downloader.process_ie_result(cast(Any, info), download=True)
             prefix = destination.with_suffix("").name
+            leftovers = _partial_files(destination)
             files = [
                 path for path in destination.parent.glob(f"{prefix}.*")
-                if path.is_file() and path.suffix not in {".part", ".ytdl"}
+                if path.is_file() and path not in leftovers
             ]
             if len(files) != 1:
                 names = ", ".join(str(path) for path in files) or "none"
                 raise RuntimeError(f"yt-dlp did not produce one merged media file for {url}: {names}")
             files[0].replace(destination)
+            # Formats a previous run chose before the selection changed.
+            for path in leftovers:
+                path.unlink(missing_ok=True)
+            app_cache.clear_partial_download(destination)
         except Exception as exc:
             message = f"Could not download YouTube media {url}: {exc}"
             print(message, file=common.ERR_HANDLE)
             if is_youtube_unavailable_error(exc):
                 raise YouTubeUnavailableError(message) from exc
             raise RuntimeError(message) from exc
+        return FetchedMedia(_display_properties(info))
     elif match := _GDRIVE_RE.search(url):
-        try:
-            output = gdown_download(id=match.group(1), output=str(destination), quiet=True)
-        except Exception as exc:
-            message = f"Could not download Google Drive file {match.group(1)}: {exc}"
-            print(message, file=common.ERR_HANDLE)
-            raise RuntimeError(message) from exc
-        if output is None or not destination.exists():
-            raise RuntimeError(f"Google Drive download did not create expected file: {destination}")
-    else:
-        download_direct(url, destination)
+        return _fetch_google_drive(match.group(1), url, destination, settings)
+    return FetchedMedia(content=download_direct(url, destination, settings.bandwidth))
 
 
-def fetch(url: str, media_type: str, destination: Path, args: common.Args) -> None:
-    """Download a recap source using the recap command's configured tools."""
-    fetch_external(
-        url, media_type, destination,
-        DownloadSettings(
-            args.browser, args.ffmpeg,
-            youtube_attestation_mode=args.youtube_attestation_mode,
-            po_token=args.po_token,
-            bgutil_url=args.bgutil_url,
-        ),
+def _fetch_google_drive(file_id: str, url: str, destination: Path, settings: DownloadSettings) -> FetchedMedia:
+    """Download a Google Drive file, resuming gdown's partial only while the file keeps its size.
+
+    gdown checks each resumed range with ``If-Range`` against the current
+    file, not the one an earlier run started on, and does not expose its
+    validator.  The size it reports is recorded instead, and a transfer that
+    resumed a partial of a different size is discarded and fetched again.
+    """
+    _claim_partials(url, destination)
+    record = app_cache.cached_partial_download(destination)
+    recorded_size = record.expected_size if record is not None and _partial_files(destination) else None
+    # gdown skips a finished file without reading it, so only a transfer is hashed.
+    finished = destination.exists()
+    hasher = hashlib.sha256()
+    reported: list[int] = []
+
+    def track_size(_: int, total: int | None) -> None:
+        if total is not None and not reported:
+            reported.append(total)
+            app_cache.store_partial_download(destination, url, total, None)
+
+    try:
+        # gdown continues its own <output>*.part file.
+        output = gdown_download(
+            id=file_id, output=str(destination), quiet=True, speed=settings.rate_limit, resume=True,
+            hasher=hasher, progress=track_size,
+        )
+    except Exception as exc:
+        message = f"Could not download Google Drive file {file_id}: {exc}"
+        print(message, file=common.ERR_HANDLE)
+        raise RuntimeError(message) from exc
+    if output is None or not destination.exists():
+        raise RuntimeError(f"Google Drive download did not create expected file: {destination}")
+    app_cache.clear_partial_download(destination)
+    if reported and recorded_size is not None and reported[0] != recorded_size:
+        print(f"[dl] Google Drive file {file_id} changed since its partial download; fetching it again",
+              file=common.ERR_HANDLE)
+        destination.unlink()
+        return _fetch_google_drive(file_id, url, destination, settings)
+    if not finished:
+        return FetchedMedia(content=ContentDigest(hasher.hexdigest(), destination.stat().st_size))
+    return FetchedMedia()
+
+
+def _display_properties(info: Mapping[str, Any] | None) -> tuple[float, int] | None:
+    """Derive display properties from a downloaded format, as ffprobe would report them."""
+    if not info or info.get("vcodec") == "none":
+        return None
+    width, height = info.get("width"), info.get("height")
+    if not width or not height:
+        return None
+    # yt-dlp reports a non-square sample aspect ratio as ``stretched_ratio``.
+    return width / height * float(info.get("stretched_ratio") or 1), int(height)
+
+
+def recap_video_height(args: common.Args) -> int:
+    """Return the tallest video a recap needs: the explicit canvas or the default height."""
+    return args.size[1] if args.size is not None else args.default_height
+
+
+def recap_download_settings(
+    args: common.Args,
+    scheduler: download_scheduler.DownloadScheduler | None = None,
+    concurrency: int = 1,
+) -> DownloadSettings:
+    return DownloadSettings(
+        args.browser, args.ffmpeg,
+        youtube_attestation_mode=args.youtube_attestation_mode,
+        po_token=args.po_token,
+        bgutil_url=args.bgutil_url,
+        maximum_video_height=recap_video_height(args),
+        cookie_file=args.cookie_file,
+        bandwidth=scheduler.bucket if scheduler is not None else None,
+        rate_limit=scheduler.bandwidth_share(concurrency) if scheduler is not None else None,
     )
 
 
+def fetch(
+    url: str, media_type: str, destination: Path, args: common.Args, settings: DownloadSettings | None = None,
+) -> FetchedMedia:
+    """Download a recap source using the recap command's configured tools."""
+    return fetch_external(url, media_type, destination, settings or recap_download_settings(args))
+
+
 def fetch_cached(
     url: str, suffix: str, kind: str, media_type: str, args: common.Args,
+    settings: DownloadSettings | None = None,
 ) -> Path:
     database = cache_database_path(args.vidsdir)
     etag = world_stage_etag(url) if is_world_stage_url(url) else None
-    key = cache_key(kind, url, etag)
-    record = read_cache_record(database, key)
-    if record is not None and record.object_path.exists():
-        return record.object_path
+    settings = settings or recap_download_settings(args)
+    keys = source_keys(kind, url, etag, settings.maximum_video_height if media_type == "v" else None)
+    if (cached := _cached_object(database, keys)) is not None:
+        return cached
 
+    key = keys[0]
     destination = object_path(args.vidsdir, key, suffix)
     partial = destination.with_suffix(f".download{destination.suffix}")
     print(f"[dl] Fetching {url.rsplit('/', 1)[-1]}", file=common.OUT_HANDLE)
-    fetch(url, media_type, partial, args)
+    fetched = fetch(url, media_type, partial, args, settings)
+    stored = _store_fetched(database, key, url, etag, partial, destination, fetched.content)
+    if media_type == "v":
+        _record_display_properties(stored, args, fetched.display)
+    return stored
+
+
+def probe_display_properties(path: Path, args: common.Args) -> tuple[float, int] | None:
+    media = ffmpeg_tools.FFmpeg(args.ffmpeg, args.ffprobe, common.run)
+    try:
+        properties = media.video_properties(path)
+    except (RuntimeError, ValueError, KeyError) as exc:
+        # Canvas resolution probes again and reports the failure in context.
+        print(f"[dl] Could not probe {path.name}: {exc}", file=common.ERR_HANDLE)
+        return None
+    return properties.display_aspect, properties.height
+
+
+def _record_display_properties(
+    stored: Path, args: common.Args, properties: tuple[float, int] | None = None,
+) -> None:
+    """Persist a fetched video's canvas inputs with its cache record, probing once if needed."""
+    if properties is None:
+        properties = probe_display_properties(stored, args)
+    if properties is not None:
+        store_display_properties(args.vidsdir, stored, *properties)
+
+
+def _cached_object(database: Path, keys: list[str]) -> Path | None:
+    """Return the first existing object among ``keys``, counting one hit or miss."""
+    for key in keys:
+        record = read_cache_record(database, key)
+        if record is not None and record.object_path.exists():
+            record_cache_access(database, key, hit=True)
+            return record.object_path
+    record_cache_access(database, keys[0], hit=False)
+    return None
+
+
+def _store_fetched(
+    database: Path, key: str, url: str, etag: str | None, partial: Path, destination: Path,
+    content: ContentDigest | None = None,
+) -> Path:
+    """Move a finished download into the object store, sharing an identical object if one exists.
+
+    Without a digest from the transfer, the file is read once to hash it.
+    """
     if not partial.exists():
         raise FileNotFoundError(f"Downloader did not create expected file: {partial}")
-    partial.replace(destination)
-    write_cache_record(database, key, url, etag, destination)
+    if content is None:
+        content = ContentDigest(file_sha256(partial), partial.stat().st_size)
+    if (duplicate := object_with_content(database, content.sha256)) is not None:
+        # The same performance under another URL or ETag occupies disk only once.
+        print(f"[dl] {url.rsplit('/', 1)[-1]} duplicates a cached source", file=common.OUT_HANDLE)
+        partial.unlink()
+        destination = duplicate
+    else:
+        partial.replace(destination)
+    write_cache_record(database, key, url, etag, destination, content)
     return destination
 
 
+def is_direct_url(url: str) -> bool:
+    """Return whether a URL is plain HTTP(S) rather than a yt-dlp or Drive source."""
+    return not is_youtube_url(url) and not _GDRIVE_RE.search(url)
+
+
+async def _download_direct_async(
+    session: aiohttp.ClientSession,
+    url: str,
+    destination: Path,
+    bandwidth: download_scheduler.TokenBucket | None,
+) -> ContentDigest:
+    """Asynchronous counterpart of :func:`download_direct`, streaming to disk.
+
+    Cache lookups, file writes and hashing run in worker threads, so they
+    never stall the other transfers on the event loop.
+    """
+    if (resume := await asyncio.to_thread(_resume_request, url, destination)) is None:
+        hashes = await asyncio.to_thread(_content_hashes, destination, True, ())
+        return await asyncio.to_thread(_finish_partial, url, destination, hashes, {})
+    offset, headers = resume
+    try:
+        async with session.get(url, headers=headers) as response:
+            if response.status == 416 and offset:
+                if await asyncio.to_thread(_range_not_satisfiable, url, destination, offset, response.headers):
+                    hashes = await asyncio.to_thread(_content_hashes, destination, True, ())
+                    return await asyncio.to_thread(_finish_partial, url, destination, hashes, {})
+                response.release()
+                return await _download_direct_async(session, url, destination, bandwidth)
+            response.raise_for_status()
+            resumed = await asyncio.to_thread(
+                _track_response, url, destination, offset, response.status, response.headers,
+            )
+            checksums = _published_checksums(response.headers, resumed)
+            hashes = await asyncio.to_thread(_content_hashes, destination, resumed, checksums)
+            output = await asyncio.to_thread(destination.open, "ab" if resumed else "wb")
+            try:
+                async for block in response.content.iter_chunked(1024 * 1024):
+                    if bandwidth is not None and (wait := bandwidth.reserve(len(block))):
+                        await asyncio.sleep(wait)
+                    await asyncio.to_thread(_write_block, output, hashes, block)
+            finally:
+                await asyncio.to_thread(output.close)
+    except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+        message = f"Could not download {url}: {exc}"
+        print(message, file=common.ERR_HANDLE)
+        raise RuntimeError(message) from exc
+    return await asyncio.to_thread(_finish_partial, url, destination, hashes, checksums)
+
+
+async def _world_stage_etag_async(session: aiohttp.ClientSession, url: str) -> str | None:
+    try:
+        async with session.head(url) as response:
+            response.raise_for_status()
+            return response.headers.get("ETag")
+    except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+        message = f"Could not read ETag for {url}: {exc}"
+        print(message, file=common.ERR_HANDLE)
+        raise RuntimeError(message) from exc
+
+
+async def _fetch_cached_direct(
+    session: aiohttp.ClientSession,
+    url: str,
+    suffix: str,
+    kind: str,
+    media_type: str,
+    args: common.Args,
+    scheduler: download_scheduler.DownloadScheduler,
+) -> Path:
+    database = cache_database_path(args.vidsdir)
+    etag = await _world_stage_etag_async(session, url) if is_world_stage_url(url) else None
+    key = cache_key(kind, url, etag)
+    if (cached := await asyncio.to_thread(_cached_object, database, [key])) is not None:
+        return cached
+    destination = object_path(args.vidsdir, key, suffix)
+    partial = destination.with_suffix(f".download{destination.suffix}")
+    print(f"[dl] Fetching {url.rsplit('/', 1)[-1]}", file=common.OUT_HANDLE)
+    content = await _download_direct_async(session, url, partial, scheduler.bucket)
+    stored = await asyncio.to_thread(_store_fetched, database, key, url, etag, partial, destination, content)
+    if media_type == "v":
+        await asyncio.to_thread(_record_display_properties, stored, args)
+    return stored
+
+
+async def _fetch_direct_sources(
+    sources: list[tuple[str, str, str, str]], args: common.Args, scheduler: download_scheduler.DownloadScheduler,
+) -> dict[tuple[str, str, str, str], Path]:
+    semaphores: dict[str, asyncio.Semaphore] = {}
+
+    async def fetch_one(url: str, suffix: str, kind: str, media_type: str) -> Path:
+        host = download_scheduler.host_group(url)
+        semaphore = semaphores.setdefault(host, asyncio.Semaphore(scheduler.limit(host)))
+        attempt = 0
+        while True:
+            # A throttled transfer pauses its whole host, including transfers waiting for a slot.
+            while (paused := scheduler.paused_for(host)) > 0:
+                await asyncio.sleep(paused)
+            async with semaphore:
+                if scheduler.paused_for(host) > 0:
+                    continue
+                try:
+                    return await _fetch_cached_direct(session, url, suffix, kind, media_type, args, scheduler)
+                except Exception as exc:
+                    if (delay := scheduler.backoff(url, exc, attempt)) is None:
+                        raise
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    timeout = aiohttp.ClientTimeout(total=None, sock_connect=60, sock_read=60)
+    async with aiohttp.ClientSession(headers=HTTP_HEADERS, timeout=timeout) as session:
+        results = await asyncio.gather(*(fetch_one(*source) for source in sources), return_exceptions=True)
+    objects: dict[tuple[str, str, str, str], Path] = {}
+    for source, result in zip(sources, results):
+        if isinstance(result, BaseException):
+            raise result
+        objects[source] = result
+    return objects
+
+
+def fetch_direct_sources(
+    sources: Iterable[tuple[str, str, str, str]], args: common.Args, scheduler: download_scheduler.DownloadScheduler,
+) -> dict[tuple[str, str, str, str], Path]:
+    """Fetch plain HTTP(S) ``(url, suffix, kind, media_type)`` sources into the cache on one event loop.
+
+    Hundreds of transfers can wait on sockets in a single thread, so the
+    worker threads stay reserved for yt-dlp and Google Drive.  Returns the
+    cached object of every source.
+    """
+    pending = list(dict.fromkeys(sources))
+    return asyncio.run(_fetch_direct_sources(pending, args, scheduler)) if pending else {}
+
+
 def create_filename(row: Data, path: Path) -> Path:
     suffix = ".m4a" if row.media_type == "a" else ".mov"
     return path / row.show / f"{row.ro}_{row.country}{suffix}"
@@ -452,31 +1643,85 @@ def cover_filename(row: Data, path: Path) -> Path | None:
     return path / row.show / f"{row.ro}_{row.country}.cover{suffix}"
 
 
-def download_media(data: Data, args: common.Args) -> Path:
+def _media_object(data: Data, args: common.Args, settings: DownloadSettings | None = None) -> Path:
     suffix = ".m4a" if data.media_type == "a" else ".mov"
-    object_file = fetch_cached(data.media_link, suffix, "media", data.media_type, args)
-    return link_object(object_file, create_filename(data, args.vidsdir))
+    return fetch_cached(data.media_link, suffix, "media", data.media_type, args, settings)
+
+
+def download_media(data: Data, args: common.Args) -> Path:
+    return link_source(args.vidsdir, _media_object(data, args), create_filename(data, args.vidsdir), args.link_mode)
 
 
-def download_cover(data: Data, args: common.Args) -> None:
+def download_cover(data: Data, args: common.Args, settings: DownloadSettings | None = None) -> None:
     alias = cover_filename(data, args.vidsdir)
     if alias is None:
         return
-    object_file = fetch_cached(data.image_link, alias.suffix, "cover", "a", args)
-    link_object(object_file, alias)
+    object_file = fetch_cached(data.image_link, alias.suffix, "cover", "a", args, settings)
+    link_source(args.vidsdir, object_file, alias, args.link_mode)
 
 
-def download_many(data: list[Data], args: common.Args) -> list[tuple[str, str, str, Path]]:
-    master = download_media(data[0], args)
-    result = [(data[0].show, data[0].country, data[0].ro, master)]
-    for row in data[1:]:
-        result.append((row.show, row.country, row.ro, link_object(master.resolve(), create_filename(row, args.vidsdir))))
+def _link_rows(data: list[Data], args: common.Args, object_file: Path) -> list[tuple[str, str, str, Path]]:
+    return [
+        (row.show, row.country, row.ro,
+         link_source(args.vidsdir, object_file, create_filename(row, args.vidsdir), args.link_mode))
+        for row in data
+    ]
+
+
+def download_many(
+    data: list[Data], args: common.Args, settings: DownloadSettings | None = None,
+) -> list[tuple[str, str, str, Path]]:
+    result = _link_rows(data, args, _media_object(data[0], args, settings))
     for row in data:
         if row.media_type == "a":
-            download_cover(row, args)
+            download_cover(row, args, settings)
     return result
 
 
+def _download_sources(
+    data: dict[tuple[str, str], list[Data]], uncached: list[str], args: common.Args,
+) -> list[tuple[str, str, str, Path]]:
+    inspections = prefetch_youtube(uncached, recap_download_settings(args))
+    if unavailable := [item for item in inspections.values() if item.status == "unavailable"]:
+        for item in unavailable:
+            print(f"[dl] Unavailable: {item.url}", file=common.ERR_HANDLE)
+        raise RuntimeError(f"{len(unavailable)} recap YouTube sources are unavailable")
+    start = time.time()
+    scheduler = download_scheduler.DownloadScheduler(
+        download_scheduler.parse_host_limits(args.download_host_limits) if args.download_host_limits else None,
+        bandwidth=args.download_bandwidth,
+    )
+    direct_groups = [values for values in data.values() if is_direct_url(values[0].media_link)]
+    tool_groups = [values for values in data.values() if not is_direct_url(values[0].media_link)]
+    def media_source(row: Data) -> tuple[str, str, str, str]:
+        return row.media_link, ".m4a" if row.media_type == "a" else ".mov", "media", row.media_type
+
+    direct_covers = [
+        (row, cover) for values in direct_groups for row in values
+        if row.media_type == "a" and (cover := cover_filename(row, args.vidsdir)) is not None
+    ]
+    direct_sources = [media_source(values[0]) for values in direct_groups] + [
+        (row.image_link, cover.suffix, "cover", "a") for row, cover in direct_covers
+    ]
+    max_workers = None if args.multiprocessing else 1
+    concurrency = scheduler.concurrency([values[0].media_link for values in tool_groups], max_workers)
+    settings = recap_download_settings(args, scheduler, concurrency)
+    with ThreadPoolExecutor(max_workers=1) as engine:
+        direct = engine.submit(fetch_direct_sources, direct_sources, args, scheduler)
+        grouped = scheduler.map(
+            lambda values: download_many(values, args, settings), tool_groups,
+            lambda values: values[0].media_link, max_workers,
+        )
+        objects = direct.result()
+    # Direct sources are fetched already; link their objects without looking them up again.
+    grouped += [_link_rows(values, args, objects[media_source(values[0])]) for values in direct_groups]
+    for row, cover in direct_covers:
+        link_source(args.vidsdir, objects[(row.image_link, cover.suffix, "cover", "a")], cover, args.link_mode)
+    clips = [item for group in grouped for item in group]
+    print(f"[dl] Processed {len(clips)} sources in {time.time() - start:.2f} seconds", file=common.OUT_HANDLE)
+    return clips
+
+
 def main(args: common.Args) -> common.Clips:
     data: dict[tuple[str, str], list[Data]] = defaultdict(list)
     result: common.Clips = defaultdict(dict)
@@ -495,15 +1740,27 @@ def main(args: common.Args) -> common.Clips:
 
     args.vidsdir.mkdir(parents=True, exist_ok=True)
     initialize_cache(cache_database_path(args.vidsdir))
+    app_cache.initialize_database()
     print(f"[dl] Found {sum(map(len, data.values()))} recap sources in {args.csv}", file=common.OUT_HANDLE)
-    start = time.time()
-    jobs = [(values, args) for values in data.values()]
-    if args.multiprocessing and jobs:
-        with mp.Pool(max(1, mp.cpu_count() // 2)) as pool:
-            clips = [item for group in pool.starmap(download_many, jobs) for item in group]
-    else:
-        clips = [item for values in data.values() for item in download_many(values, args)]
-    print(f"[dl] Processed {len(clips)} sources in {time.time() - start:.2f} seconds", file=common.OUT_HANDLE)
+    database = cache_database_path(args.vidsdir)
+    uncached = []
+    maximum_height = recap_video_height(args)
+    for media_link, media_type in data:
+        records = (
+            read_cache_record(database, key)
+            for key in source_keys("media", media_link, None, maximum_height if media_type == "v" else None)
+        )
+        if not any(record is not None and record.object_path.exists() for record in records):
+            uncached.append(media_link)
+    # Decrypt the browser profile once, and only when a YouTube source is still needed.
+    browser = args.browser if args.cookie_file is None and any(map(is_youtube_url, uncached)) else None
+    with browser_cookies(browser) as cookie_file:
+        if cookie_file is not None:
+            args = replace(args, cookie_file=cookie_file)
+        clips = _download_sources(data, uncached, args)
+    if args.source_cache_budget:
+        shows = {value.show for values in data.values() for value in values}
+        collect_garbage(args.vidsdir, args.source_cache_budget, protected_objects(args.vidsdir, shows))
     for show, country, ro, path in clips:
         result[(show, ro)][country] = path
     return result
@@ -0,0 +1,265 @@
+"""Host-aware scheduling, retry and bandwidth shaping for source downloads."""
+
+from __future__ import annotations
+
+from collections import Counter, deque
+from collections.abc import Callable, Iterator, Mapping, Sequence
+from contextlib import contextmanager
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+import random
+import threading
+import time
+from typing import TypeVar
+from urllib.parse import urlparse
+
+import common
+
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+DEFAULT_HOST_LIMIT = 4
+# YouTube and Drive penalize bursts long before the network is saturated.
+DEFAULT_HOST_LIMITS = "youtube=3,drive.google.com=2,media.world-stage.org=8"
+THROTTLING_STATUSES = {429, 503}
+_THROTTLING_MARKERS = (
+    "http error 429",
+    "http error 503",
+    "too many requests",
+    "too many users have viewed or downloaded this file recently",
+)
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """Exponential backoff with full jitter for throttled downloads."""
+
+    attempts: int = 5
+    base_delay: float = 2.0
+    max_delay: float = 120.0
+
+    def delay(self, attempt: int, retry_after: float | None = None) -> float:
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        return max(delay, retry_after or 0)
+
+
+def host_group(url: str) -> str:
+    """Name the rate-limit domain of a URL; all YouTube hosts share one."""
+    host = (urlparse(url).hostname or "").lower()
+    if "youtu" in host or host.endswith("googlevideo.com"):
+        return "youtube"
+    return host
+
+
+def parse_host_limits(value: str) -> dict[str, int]:
+    """Parse ``host=count`` pairs such as ``youtube=3,drive.google.com=2``."""
+    limits: dict[str, int] = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        host, separator, count = item.partition("=")
+        if not separator or not host.strip() or not count.strip().isdigit() or int(count) < 1:
+            raise ValueError(f"Invalid host download limit: {item!r}")
+        limits[host.strip().lower()] = int(count)
+    return limits
+
+
+def _retry_after(value: str | None) -> float | None:
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def throttling(error: BaseException) -> tuple[bool, float | None]:
+    """Return whether an error (or its cause) is a throttling response and its Retry-After."""
+    current: BaseException | None = error
+    while current is not None:
+        # urllib's HTTPError and aiohttp's ClientResponseError both expose these.
+        if getattr(current, "status", None) in THROTTLING_STATUSES:
+            headers = getattr(current, "headers", None)
+            return True, _retry_after(headers.get("Retry-After") if headers else None)
+        current = current.__cause__
+    message = str(error).lower()
+    return any(marker in message for marker in _THROTTLING_MARKERS), None
+
+
+class TokenBucket:
+    """A thread-safe global byte-rate limit shared by all transfers."""
+
+    def __init__(self, rate: int) -> None:
+        self.rate = rate
+        self._tokens = float(rate)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, size: int) -> float:
+        """Take ``size`` bytes from the bucket and return how long to wait before using them."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.rate, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= size
+            return -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+    def consume(self, size: int) -> None:
+        """Block until ``size`` bytes fit in the configured rate."""
+        if wait := self.reserve(size):
+            time.sleep(wait)
+
+
+class DownloadScheduler:
+    """Run downloads with per-host caps, fair host interleaving and throttling backoff."""
+
+    def __init__(
+        self,
+        host_limits: Mapping[str, int] | None = None,
+        *,
+        default_limit: int = DEFAULT_HOST_LIMIT,
+        bandwidth: int = 0,
+        retry: RetryPolicy = RetryPolicy(),
+    ) -> None:
+        self.host_limits = dict(parse_host_limits(DEFAULT_HOST_LIMITS) if host_limits is None else host_limits)
+        self.default_limit = default_limit
+        self.bucket = TokenBucket(bandwidth) if bandwidth > 0 else None
+        self.retry = retry
+        self._condition = threading.Condition()
+        self._paused_until: dict[str, float] = {}
+        # Transfers holding a host slot, from map() or slot(), across all callers.
+        self._active: Counter[str] = Counter()
+
+    def limit(self, host: str) -> int:
+        return self.host_limits.get(host, self.default_limit)
+
+    def concurrency(self, urls: Sequence[str], max_workers: int | None = None) -> int:
+        """Return how many transfers :meth:`map` would run at once for ``urls``."""
+        counts = Counter(host_group(url) for url in urls)
+        capacity = sum(min(self.limit(host), count) for host, count in counts.items())
+        return min(capacity, max_workers) if max_workers is not None else capacity
+
+    def bandwidth_share(self, workers: int) -> int | None:
+        """Split the global limit for tools with their own per-transfer limiter."""
+        return None if self.bucket is None else max(1, self.bucket.rate // max(1, workers))
+
+    def backoff(self, url: str, error: BaseException, attempt: int) -> float | None:
+        """Return how long to wait before retrying a throttled transfer, or ``None`` to fail."""
+        throttled, retry_after = throttling(error)
+        if not throttled or attempt + 1 >= self.retry.attempts:
+            return None
+        host = host_group(url)
+        delay = self.retry.delay(attempt, retry_after)
+        print(f"[dl] {host} is throttling; retrying in {delay:.1f} seconds", file=common.OUT_HANDLE)
+        with self._condition:
+            self._paused_until[host] = max(self._paused_until.get(host, 0), time.monotonic() + delay)
+        return delay
+
+    def paused_for(self, host: str) -> float:
+        """Return how long ``host`` stays paused after a throttled transfer, or 0."""
+        with self._condition:
+            return max(0.0, self._paused_until.get(host, 0) - time.monotonic())
+
+    @contextmanager
+    def slot(self, url: str) -> Iterator[None]:
+        """Hold one of the URL's host slots for a transfer run outside :meth:`map`.
+
+        Waits while the host is at its limit or paused after throttling.
+        """
+        host = host_group(url)
+        with self._condition:
+            while True:
+                paused = self._paused_until.get(host, 0) - time.monotonic()
+                if paused <= 0 and self._active[host] < self.limit(host):
+                    break
+                self._condition.wait(paused if paused > 0 else None)
+            self._active[host] += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._active[host] -= 1
+                self._condition.notify_all()
+
+    def call(self, url: str, function: Callable[[], R]) -> R:
+        """Run one transfer, backing off its whole host while it is throttled."""
+        attempt = 0
+        while True:
+            try:
+                return function()
+            except Exception as exc:
+                if (delay := self.backoff(url, exc, attempt)) is None:
+                    raise
+            time.sleep(delay)
+            attempt += 1
+
+    def map(
+        self,
+        function: Callable[[T], R],
+        items: Sequence[T],
+        url: Callable[[T], str],
+        max_workers: int | None = None,
+    ) -> list[R]:
+        """Apply ``function`` to every item, interleaving hosts round-robin.
+
+        Results keep the input order.  The first failure stops new transfers
+        from starting and is re-raised once running ones finish.
+        """
+        pending: dict[str, deque[tuple[int, T]]] = {}
+        for index, item in enumerate(items):
+            pending.setdefault(host_group(url(item)), deque()).append((index, item))
+        hosts = deque(pending)
+        active = self._active
+        results: dict[int, R] = {}
+        errors: list[BaseException] = []
+        workers = self.concurrency([url(item) for item in items], max_workers)
+
+        def next_item() -> tuple[str, int, T] | None | float:
+            """Pick the next host in turn with a free slot, or how long to wait for one."""
+            now = time.monotonic()
+            wait = 0.0
+            for _ in range(len(hosts)):
+                host = hosts[0]
+                hosts.rotate(-1)
+                if not pending[host] or active[host] >= self.limit(host):
+                    continue
+                if (paused := self._paused_until.get(host, 0) - now) > 0:
+                    wait = min(wait, paused) if wait else paused
+                    continue
+                index, item = pending[host].popleft()
+                return host, index, item
+            return wait or None
+
+        def worker() -> None:
+            while True:
+                with self._condition:
+                    while True:
+                        if errors or not any(pending.values()):
+                            return
+                        pick = next_item()
+                        if isinstance(pick, tuple):
+                            break
+                        self._condition.wait(pick)
+                    host, index, item = pick
+                    active[host] += 1
+                try:
+                    results[index] = self.call(url(item), lambda: function(item))
+                except BaseException as exc:
+                    with self._condition:
+                        errors.append(exc)
+                finally:
+                    with self._condition:
+                        active[host] -= 1
+                        self._condition.notify_all()
+
+        threads = [threading.Thread(target=worker, daemon=True) for _ in range(max(1, workers))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if errors:
+            raise errors[0]
+        return [results[index] for index in range(len(items))]
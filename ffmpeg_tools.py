@@ -2,7 +2,8 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass
+from collections.abc import Sequence
+from dataclasses import dataclass, replace
 from pathlib import Path
 from typing import Any, Callable
 import json
@@ -13,12 +14,10 @@ import subprocess as sp
 
 CommandRunner = Callable[..., sp.CompletedProcess[Any]]
 
-
-@dataclass(frozen=True)
-class MediaProbe:
-    has_audio: bool
-    has_picture: bool
-    has_video: bool
+# Recap loudnorm targets: integrated loudness, true-peak ceiling and loudness range.
+LOUDNORM_I = -14.0
+LOUDNORM_TP = -1.5
+LOUDNORM_LRA = 11.0
 
 
 @dataclass(frozen=True)
@@ -27,12 +26,47 @@ class VideoProperties:
     height: int
 
 
+@dataclass(frozen=True)
+class MediaProbe:
+    has_audio: bool
+    has_picture: bool
+    has_video: bool
+    video: VideoProperties | None = None
+
+
 @dataclass(frozen=True)
 class StreamCodecs:
     video: str
     audio: str
 
 
+@dataclass(frozen=True)
+class RemoteInput:
+    """An HTTP(S) media URL FFmpeg reads directly, with the request headers it needs."""
+
+    url: str
+    headers: tuple[tuple[str, str], ...] = ()
+
+    def arguments(self) -> list[str]:
+        header_args = [
+            "-headers", "".join(f"{key}: {value}\r\n" for key, value in self.headers),
+        ] if self.headers else []
+        # A read stalled for a minute fails, so a streamed encode falls back instead of hanging.
+        return [
+            *header_args, "-reconnect", "1", "-reconnect_streamed", "1", "-reconnect_delay_max", "10",
+            "-rw_timeout", "60000000", "-i", self.url,
+        ]
+
+
+@dataclass(frozen=True)
+class RemoteSource:
+    """Separate or combined stream URLs of one remote video and what they contain."""
+
+    inputs: tuple[RemoteInput, ...]
+    codecs: StreamCodecs
+    height: int
+
+
 @dataclass(frozen=True)
 class MediaTags:
     title: str
@@ -57,12 +91,95 @@ class MediaTags:
         ]
 
 
+@dataclass(frozen=True)
+class LoudnessMeasurement:
+    """First-pass loudnorm inputs for one snippet."""
+
+    integrated: float
+    true_peak: float
+    lra: float
+    threshold: float
+
+    def is_linear(self) -> bool:
+        """Whether loudnorm will apply one linear gain, checked the way ``af_loudnorm`` does."""
+        if self.true_peak == 99 or self.threshold == -70 or self.lra == 0 or self.integrated == 0:
+            return False
+        gain = LOUDNORM_I - self.integrated
+        return self.true_peak + gain <= LOUDNORM_TP and self.lra <= LOUDNORM_LRA
+
+
 @dataclass(frozen=True)
 class RecapEncoding:
     av1_preset: int
     av1_crf: int
     av1_threads: int
     opus_bitrate: str
+    preview: bool = False
+
+    def video_arguments(self) -> list[str]:
+        if self.preview:
+            # Previews are for checking timing and card text, not for publishing.
+            return ["-c:v", "libx264", "-preset", "ultrafast", "-tune", "fastdecode", "-crf", "30"]
+        thread_args = ["-svtav1-params", f"lp={self.av1_threads}"] if self.av1_threads > 0 else []
+        return ["-c:v", "libsvtav1", "-preset", str(self.av1_preset), "-crf", str(self.av1_crf), *thread_args]
+
+
+@dataclass(frozen=True)
+class Rendition:
+    """One encoded output of a recap render; the defaults describe the full canvas."""
+
+    name: str = ""
+    size: tuple[int, int] | None = None
+    height: int | None = None
+    av1_crf: int | None = None
+    av1_preset: int | None = None
+    audio_only: bool = False
+
+    def frame_size(self, canvas: tuple[int, int]) -> tuple[int, int]:
+        if self.size is not None:
+            return self.size
+        if self.height is not None:
+            return max(2, round(canvas[0] * self.height / canvas[1] / 2) * 2), self.height
+        return canvas
+
+    def encoding(self, base: RecapEncoding) -> RecapEncoding:
+        return replace(
+            base,
+            av1_crf=base.av1_crf if self.av1_crf is None else self.av1_crf,
+            av1_preset=base.av1_preset if self.av1_preset is None else self.av1_preset,
+        )
+
+
+def rendition_filters(
+    renditions: Sequence[Rendition], canvas: tuple[int, int],
+) -> tuple[list[str], list[tuple[str | None, str]]]:
+    """Split the ``[vout]``/``[aout]`` pair of a recap graph into one pair per rendition.
+
+    Returns the extra filters and, per rendition, its video label (``None``
+    for audio-only renditions) and audio label.  When every rendition is
+    audio-only, the graph must be built without ``[vout]``.
+    """
+    video = [rendition for rendition in renditions if not rendition.audio_only]
+    if len(renditions) == 1 and video and video[0].frame_size(canvas) == canvas:
+        return [], [("[vout]", "[aout]")]
+    filters = [f"[aout]asplit={len(renditions)}" + "".join(f"[aout{index}]" for index in range(len(renditions)))]
+    if video:
+        filters.append(f"[vout]split={len(video)}" + "".join(f"[vsplit{index}]" for index in range(len(video))))
+    labels: list[tuple[str | None, str]] = []
+    video_index = 0
+    for index, rendition in enumerate(renditions):
+        if rendition.audio_only:
+            labels.append((None, f"[aout{index}]"))
+            continue
+        split = f"[vsplit{video_index}]"
+        video_index += 1
+        width, height = rendition.frame_size(canvas)
+        if (width, height) == canvas:
+            labels.append((split, f"[aout{index}]"))
+            continue
+        filters.append(f"{split}scale={width}:{height}:flags=lanczos,setsar=1[vout{index}]")
+        labels.append((f"[vout{index}]", f"[aout{index}]"))
+    return filters, labels
 
 
 def timestamp(seconds: float) -> str:
@@ -77,6 +194,34 @@ def _text(value: str | bytes | None) -> str:
     return value or ""
 
 
+def _av1_opus_arguments(
+    codecs: StreamCodecs,
+    height: int,
+    encoding: RecapEncoding,
+    preserve_flac: bool,
+    maximum_height: int | None,
+) -> list[str]:
+    """Copy AV1 and Opus (or kept FLAC) streams, encoding anything else or anything too tall."""
+    video_args = ["-c:v", "copy"]
+    downscale = maximum_height is not None and height > maximum_height
+    if codecs.video != "av1" or downscale:
+        video_args = [
+            "-c:v", "libsvtav1", "-preset", str(encoding.av1_preset),
+            "-crf", str(encoding.av1_crf), "-pix_fmt", "yuv420p",
+        ]
+        if downscale:
+            video_args[0:0] = ["-vf", f"scale=-2:{maximum_height}"]
+        if encoding.av1_threads > 0:
+            video_args.extend(["-svtav1-params", f"lp={encoding.av1_threads}"])
+
+    keep_flac = preserve_flac and codecs.audio == "flac"
+    audio_args = ["-c:a", "copy"] if codecs.audio == "opus" or keep_flac else [
+        "-c:a", "libopus", "-b:a", encoding.opus_bitrate,
+    ]
+    experimental_args = ["-strict", "-2"] if keep_flac else []
+    return [*video_args, *audio_args, "-map_metadata", "-1", *experimental_args]
+
+
 @dataclass(frozen=True)
 class FFmpeg:
     """A small facade for the media operations this application needs."""
@@ -88,7 +233,8 @@ class FFmpeg:
     def probe_media(self, path: Path) -> MediaProbe:
         result = self.run([
             self.probe_executable, "-v", "error", "-show_entries",
-            "stream=codec_type:stream_disposition=attached_pic", "-of", "json", str(path),
+            "stream=codec_type,width,height,sample_aspect_ratio:stream_disposition=attached_pic",
+            "-of", "json", str(path),
         ])
         streams = json.loads(_text(result.stdout)).get("streams", [])
 
@@ -103,7 +249,23 @@ class FFmpeg:
             and not stream.get("disposition", {}).get("attached_pic", 0)
             for stream in streams
         )
-        return MediaProbe(has_audio=has_audio, has_picture=has_picture, has_video=has_video)
+        video = next((
+            stream for stream in streams
+            if stream.get("codec_type") == "video"
+            and not stream.get("disposition", {}).get("attached_pic", 0)
+            and stream.get("width") and stream.get("height")
+        ), None)
+        properties = None
+        if video is not None:
+            sar_width, _, sar_height = str(video.get("sample_aspect_ratio", "1:1")).partition(":")
+            try:
+                sar = int(sar_width) / int(sar_height)
+            except (ValueError, ZeroDivisionError):
+                sar = 0
+            # FFprobe reports 0:1 when a stream does not declare its sample aspect ratio.
+            sar = sar if sar > 0 else 1
+            properties = VideoProperties(int(video["width"]) * sar / int(video["height"]), int(video["height"]))
+        return MediaProbe(has_audio=has_audio, has_picture=has_picture, has_video=has_video, video=properties)
 
     def video_properties(self, path: Path) -> VideoProperties:
         stream = self._video_stream(path)
@@ -158,14 +320,44 @@ class FFmpeg:
         ], capture=True)
         return math.ceil(float(_text(result.stdout).strip()))
 
-    def loudnorm_filter(self, path: Path, start: float, duration: float, mode: str) -> str:
+    def decode_audio(self, path: Path, output: Path, sample_rate: int) -> None:
+        """Decode the first audio stream to raw little-endian float32 mono samples."""
+        self.run([
+            self.executable, "-hide_banner", "-y", "-loglevel", "error", "-i", str(path),
+            "-map", "0:a:0", "-ac", "1", "-ar", str(sample_rate), "-f", "f32le", str(output),
+        ])
+
+    def loudness_log(self, path: Path) -> str:
+        """Return the per-100 ms EBU R128 frame log of a whole source's audio."""
+        result = self.run([
+            self.executable, "-hide_banner", "-nostats", "-loglevel", "info", "-i", str(path),
+            "-map", "0:a:0", "-af", "ebur128=peak=true:framelog=info", "-f", "null", "-",
+        ])
+        return _text(result.stderr)
+
+    def loudnorm_filter(
+        self, path: Path, start: float, duration: float, mode: str,
+        measurement: LoudnessMeasurement | None = None,
+    ) -> str:
+        """Return a loudnorm filter suffix; two-pass mode measures the range unless ``measurement`` is given.
+
+        A ``measurement`` only replaces the first pass when it allows linear normalization, where
+        loudnorm derives the gain itself. Dynamic normalization needs the ``target_offset`` that
+        only a real first pass reports.
+        """
         if mode == "none":
             return ""
-        base = "loudnorm=I=-14:TP=-1.5:LRA=11"
+        base = f"loudnorm=I={LOUDNORM_I:g}:TP={LOUDNORM_TP:g}:LRA={LOUDNORM_LRA:g}"
         if mode == "one-pass":
             return f",{base}"
         if mode != "two-pass":
             raise ValueError(f"Unknown audio normalization mode: {mode}")
+        if measurement is not None and measurement.is_linear():
+            return (
+                f",{base}:measured_I={measurement.integrated}:measured_TP={measurement.true_peak}:"
+                f"measured_LRA={measurement.lra}:measured_thresh={measurement.threshold}:"
+                "linear=true:print_format=summary"
+            )
 
         result = self.run([
             self.executable, "-hide_banner", "-loglevel", "info", "-ss", timestamp(start),
@@ -226,52 +418,130 @@ class FFmpeg:
         if maximum_height is not None and maximum_height <= 0:
             raise ValueError("Maximum video height must be positive")
         codecs = self.stream_codecs(source)
-        video_args = ["-c:v", "copy"]
-        downscale = maximum_height is not None and self.video_height(source) > maximum_height
-        if codecs.video != "av1" or downscale:
-            video_args = [
-                "-c:v", "libsvtav1", "-preset", str(encoding.av1_preset),
-                "-crf", str(encoding.av1_crf), "-pix_fmt", "yuv420p",
-            ]
-            if downscale:
-                video_args[0:0] = ["-vf", f"scale=-2:{maximum_height}"]
-            if encoding.av1_threads > 0:
-                video_args.extend(["-svtav1-params", f"lp={encoding.av1_threads}"])
-
-        keep_flac = preserve_flac and codecs.audio == "flac"
-        audio_args = ["-c:a", "copy"] if codecs.audio == "opus" or keep_flac else [
-            "-c:a", "libopus", "-b:a", encoding.opus_bitrate,
-        ]
-        experimental_args = ["-strict", "-2"] if keep_flac else []
+        height = self.video_height(source) if maximum_height is not None else 0
         self.run([
             self.executable, "-y", "-hide_banner", "-i", str(source),
-            "-map", "0:v:0", "-map", "0:a:0", *video_args, *audio_args,
-            "-map_metadata", "-1", *tags.arguments(), *experimental_args,
-            "-movflags", "+faststart", "-f", "mp4", str(output),
+            "-map", "0:v:0", "-map", "0:a:0",
+            *_av1_opus_arguments(codecs, height, encoding, preserve_flac, maximum_height),
+            *tags.arguments(), "-movflags", "+faststart", "-f", "mp4", str(output),
         ])
         return codecs
 
+    def remote_source(self, remote: RemoteInput) -> RemoteSource:
+        """Probe the codecs and height of a single remote file without downloading it."""
+        result = self.run([
+            self.probe_executable, "-v", "error", *remote.arguments(),
+            "-show_entries", "stream=codec_type,codec_name,height", "-of", "json",
+        ], capture=True)
+        streams = {
+            str(stream["codec_type"]): stream
+            for stream in json.loads(_text(result.stdout)).get("streams", [])
+            if stream.get("codec_type") in {"video", "audio"} and "codec_name" in stream
+        }
+        if "video" not in streams or "audio" not in streams:
+            raise RuntimeError(f"Remote media needs one video and one audio stream: {remote.url}")
+        codecs = StreamCodecs(video=str(streams["video"]["codec_name"]), audio=str(streams["audio"]["codec_name"]))
+        return RemoteSource((remote,), codecs, int(streams["video"].get("height", 0)))
+
+    def make_av1_opus_stream(
+        self,
+        source: RemoteSource,
+        output: Path,
+        tags: MediaTags,
+        encoding: RecapEncoding,
+        maximum_height: int | None = None,
+    ) -> StreamCodecs:
+        """Tag and encode remote streams as FFmpeg reads them, so no raw copy touches disk."""
+        if maximum_height is not None and maximum_height <= 0:
+            raise ValueError("Maximum video height must be positive")
+        audio_input = len(source.inputs) - 1
+        self.run([
+            self.executable, "-y", "-hide_banner",
+            *(argument for remote in source.inputs for argument in remote.arguments()),
+            "-map", "0:v:0", "-map", f"{audio_input}:a:0",
+            *_av1_opus_arguments(source.codecs, source.height, encoding, False, maximum_height),
+            *tags.arguments(), "-movflags", "+faststart", "-f", "mp4", str(output),
+        ])
+        return source.codecs
+
+    def move_if_tagged(
+        self, source: Path, output: Path, tags: MediaTags, maximum_height: int | None = None,
+    ) -> StreamCodecs | None:
+        """Rename a source already merged with ``tags`` into place when re-muxing would only copy it.
+
+        Returns ``None`` and leaves the source alone when it still needs
+        :meth:`make_av1_opus_video`.
+        """
+        result = self.run([
+            self.probe_executable, "-v", "error", "-show_entries",
+            "stream=codec_type,codec_name,height:format_tags=title,album_artist", "-of", "json", str(source),
+        ], capture=True)
+        value = json.loads(_text(result.stdout))
+        streams = {
+            str(stream["codec_type"]): stream
+            for stream in value.get("streams", [])
+            if stream.get("codec_type") in {"video", "audio"}
+        }
+        format_tags = {str(key).lower(): str(tag) for key, tag in value.get("format", {}).get("tags", {}).items()}
+        video, audio = streams.get("video"), streams.get("audio")
+        if (
+            video is None or audio is None
+            or video.get("codec_name") != "av1" or audio.get("codec_name") != "opus"
+            or (maximum_height is not None and int(video.get("height", 0)) > maximum_height)
+            or format_tags.get("title", "") != tags.title
+            or format_tags.get("album_artist") != tags.album_artist
+        ):
+            return None
+        source.replace(output)
+        return StreamCodecs(video="av1", audio="opus")
+
+    def make_still(self, visual: Path, card: Path, output: Path, normalizer: str, position: str) -> Path:
+        """Composite one frame of artwork under a card, scaled to the recap canvas."""
+        temporary_output = output.with_suffix(".temp.png")
+        self.run([
+            self.executable, "-hide_banner", "-y", "-loglevel", "error", "-i", str(visual), "-i", str(card),
+            "-filter_complex", f"[0:v:0]{normalizer}[base];[base][1:v:0]overlay={position}:format=auto[still]",
+            "-map", "[still]", "-frames:v", "1", "-update", "1", str(temporary_output),
+        ])
+        temporary_output.replace(output)
+        return output
+
     def render_recap(
         self,
         *,
         inputs: list[str],
         metadata: Path,
         graph: Path,
-        output: Path,
+        outputs: Sequence[tuple[Rendition, Path]],
+        canvas: tuple[int, int],
         title: str,
         metadata_input: int,
         encoding: RecapEncoding,
-    ) -> Path:
-        temporary_output = output.with_suffix(".temp.mp4")
-        thread_args = ["-svtav1-params", f"lp={encoding.av1_threads}"] if encoding.av1_threads > 0 else []
-        self.run([
+    ) -> list[Path]:
+        """Encode every rendition from one decode of the graph.
+
+        The graph must already end with :func:`rendition_filters` for the
+        same renditions and canvas.
+        """
+        _filters, labels = rendition_filters([rendition for rendition, _output in outputs], canvas)
+        command = [
             self.executable, "-hide_banner", "-y", "-loglevel", "error", *inputs,
             "-f", "ffmetadata", "-i", str(metadata), "-filter_complex_script", str(graph),
-            "-map", "[vout]", "-map", "[aout]", "-map_metadata", str(metadata_input),
-            "-metadata", f"title={title}", "-c:v", "libsvtav1",
-            "-preset", str(encoding.av1_preset), "-crf", str(encoding.av1_crf), *thread_args,
-            "-pix_fmt", "yuv420p", "-c:a", "libopus", "-b:a", encoding.opus_bitrate,
-            "-movflags", "+faststart", "-f", "mp4", str(temporary_output),
-        ])
-        temporary_output.replace(output)
-        return output
+        ]
+        temporary_outputs = []
+        for (rendition, output), (video_label, audio_label) in zip(outputs, labels):
+            temporary_output = output.with_suffix(".temp.mp4")
+            temporary_outputs.append(temporary_output)
+            rendition_encoding = rendition.encoding(encoding)
+            video_args = ["-vn"] if video_label is None else [
+                "-map", video_label, *rendition_encoding.video_arguments(), "-pix_fmt", "yuv420p",
+            ]
+            command.extend([
+                *video_args, "-map", audio_label, "-map_metadata", str(metadata_input),
+                "-metadata", f"title={title}", "-c:a", "libopus", "-b:a", encoding.opus_bitrate,
+                "-movflags", "+faststart", "-f", "mp4", str(temporary_output),
+            ])
+        self.run(command)
+        for temporary_output, (_rendition, output) in zip(temporary_outputs, outputs):
+            temporary_output.replace(output)
+        return [output for _rendition, output in outputs]
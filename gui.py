@@ -11,6 +11,7 @@ from typing import Callable, MutableMapping, cast
 import wx
 import wx.lib.scrolledpanel as scrolled
 
+import batch
 import common
 import gui_common
 import prepare
@@ -293,6 +294,7 @@ class ConfigPanel(ApiInputControls, scrolled.ScrolledPanel):
         )
         self.form.radio(root, "Recaps", "recap_mode", [label for _value, label in gui_common.RECAP_MODES])
         self.form.checkbox(root, "Upload to configured S3", "upload_recaps", True)
+        self.form.checkbox(root, "Fast preview only", "preview", False)
         self.refresh_upload_availability()
 
         self.run_button = wx.Button(self, label="Run recap maker")
@@ -346,6 +348,7 @@ class ConfigPanel(ApiInputControls, scrolled.ScrolledPanel):
         values["jobs"] = self.text("jobs")
         values["recap_mode"] = gui_common.recap_mode_from_label(self.choice("recap_mode"))
         values["upload_recaps"] = self.checked("upload_recaps")
+        values["preview"] = self.checked("preview")
         return values
 
     def run(self, _event) -> None:
@@ -626,13 +629,16 @@ class BatchDownloadPanel(ApiInputControls, scrolled.ScrolledPanel):
         )
         self.form.directory(root, "Output directory", "output_directory", "output", dialog_title="Choose directory")
         self.form.directory(root, "Temporary directory (optional)", "temporary_directory", dialog_title="Choose directory")
-        self.form.text(root, "Concurrent downloads (0=auto)", "jobs", "0")
+        self.form.text(root, "Concurrent downloads", "download_jobs", str(batch.DEFAULT_DOWNLOAD_JOBS))
+        self.form.text(root, "Concurrent encodes (0=auto)", "jobs", "0")
+        self.form.text(root, "Concurrent uploads", "publish_jobs", str(batch.DEFAULT_PUBLISH_JOBS))
         self.form.text(root, "Target video height", "target_height", "576")
 
         self.form.section(root, "Options")
         self.upload_check = self.form.checkbox(root, "Upload to configured S3", "upload", True)
         self.song_links_check = self.form.checkbox(root, "Update World Stage media links after upload", "update_song_links", True)
         self.upload_check.Bind(wx.EVT_CHECKBOX, self.update_song_links_availability)
+        self.form.checkbox(root, "Encode while downloading (no raw copy on disk)", "stream", False)
         self.form.checkbox(root, "Overwrite existing output files", "overwrite", False)
         self.form.checkbox(root, "Dry run (do not download or write files)", "dry_run", False)
 
@@ -732,6 +738,19 @@ class SettingsPanel(scrolled.ScrolledPanel):
         self.form.text(root, "Opus bitrate", "opus_bitrate", str(settings["opus_bitrate"]))
         self.form.choice(root, "Audio normalization", "audio_normalization", ["none", "one-pass", "two-pass"], str(settings["audio_normalization"]))
         self.form.text(root, "Render jobs (0=auto)", "jobs", str(settings["jobs"]))
+        self.form.text(
+            root, "Source cache budget (0=unlimited)", "source_cache_budget", str(settings["source_cache_budget"]),
+        )
+        self.form.choice(
+            root, "Source links", "source_link_mode", ["auto", "reflink", "hardlink", "symlink"],
+            str(settings["source_link_mode"]),
+        )
+        self.form.text(
+            root, "Downloads per host (blank=defaults)", "download_host_limits", str(settings["download_host_limits"]),
+        )
+        self.form.text(
+            root, "Download bandwidth per second (0=unlimited)", "download_bandwidth", str(settings["download_bandwidth"]),
+        )
 
         self.form.section(root, "S3 uploads")
         try:
@@ -745,6 +764,16 @@ class SettingsPanel(scrolled.ScrolledPanel):
         self.form.control(root, "Endpoint URL", self.s3_endpoint)
         self.form.control(root, "Bucket", self.s3_bucket)
         self.form.control(root, "AWS profile", self.s3_profile)
+        self.form.text(
+            root, "Multipart threshold", "upload_multipart_threshold",
+            str(settings["upload_multipart_threshold"]),
+        )
+        self.form.text(root, "Multipart part size", "upload_part_size", str(settings["upload_part_size"]))
+        self.form.text(root, "Concurrent part uploads", "upload_concurrency", str(settings["upload_concurrency"]))
+        self.form.choice(
+            root, "Unchanged upload detection", "upload_dedup", ["metadata", "content"],
+            str(settings["upload_dedup"]),
+        )
 
         self.save_button = wx.Button(self, label="Save persistent settings")
         self.save_button.Bind(wx.EVT_BUTTON, self.save)
@@ -160,7 +160,11 @@ def build_batch_download_request(values: Mapping[str, object]) -> batch.BatchDow
     temporary_directory = text("temporary_directory")
     jobs = int(text("jobs"))
     if jobs < 0:
-        raise ValueError("Concurrent downloads cannot be negative")
+        raise ValueError("Concurrent encodes cannot be negative")
+    download_jobs = int(text("download_jobs"))
+    publish_jobs = int(text("publish_jobs"))
+    if download_jobs < 1 or publish_jobs < 1:
+        raise ValueError("Concurrent downloads and uploads must be positive")
     target_height = int(text("target_height"))
     if target_height <= 0:
         raise ValueError("Target video height must be positive")
@@ -178,6 +182,9 @@ def build_batch_download_request(values: Mapping[str, object]) -> batch.BatchDow
         update_song_links=bool(values["update_song_links"]),
         overwrite=bool(values["overwrite"]),
         dry_run=bool(values["dry_run"]),
+        download_jobs=download_jobs,
+        publish_jobs=publish_jobs,
+        stream=bool(values["stream"]),
     )
 
 
@@ -233,6 +240,11 @@ def build_args(values: Mapping[str, object]) -> common.Args:
         cardsdir=tmpdir / "cards",
         clipsdir=tmpdir / "clips",
         upload_recaps=bool(values.get("upload_recaps", True)),
+        source_cache_budget=common.parse_byte_size(text("source_cache_budget") or "0"),
+        link_mode=text("source_link_mode") or "auto",
+        download_host_limits=text("download_host_limits"),
+        download_bandwidth=common.parse_byte_size(text("download_bandwidth") or "0"),
+        preview=bool(values.get("preview", False)),
     )
 
 
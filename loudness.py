@@ -0,0 +1,105 @@
+"""Per-source EBU R128 loudness index for measuring any snippet without decoding it again."""
+
+from __future__ import annotations
+
+from pathlib import Path
+import hashlib
+import math
+import os
+import re
+
+import numpy as np
+
+import common
+import ffmpeg_tools
+
+
+# ebur128 reports momentary (400 ms) and short-term (3 s) loudness every 100 ms.
+MOMENTARY_WINDOW = 0.4
+SHORT_TERM_WINDOW = 3.0
+ABSOLUTE_GATE = -70.0
+INDEX_VERSION = 1
+
+_FRAME_RE = re.compile(r"\bt:\s*(?P<t>[-\d.]+)\s.*?\bM:\s*(?P<m>[-\w.]+)\s+S:\s*(?P<s>[-\w.]+)")
+_FRAME_PEAK_RE = re.compile(r"\bFTPK:(?P<peaks>(?:\s+[-\w.]+)+)\s+dBFS")
+
+
+def index_path(cache_dir: Path, source: Path) -> Path:
+    """Name a source's index after its resolved path, size and mtime."""
+    stat = source.resolve().stat()
+    identity = f"{INDEX_VERSION}:{source.resolve()}:{stat.st_size}:{stat.st_mtime_ns}"
+    return cache_dir / f"{hashlib.sha256(identity.encode('utf-8')).hexdigest()}.npy"
+
+
+def parse_framelog(log: str) -> np.ndarray:
+    """Parse ``ebur128=framelog=info`` lines into rows of time, M, S and frame true peak."""
+    rows = []
+    for line in log.splitlines():
+        frame = _FRAME_RE.search(line)
+        if frame is None:
+            continue
+        peak = _FRAME_PEAK_RE.search(line)
+        # Older FFmpeg builds print no per-frame true peak.
+        frame_peak = max(map(float, peak["peaks"].split())) if peak is not None else math.nan
+        rows.append((float(frame["t"]), float(frame["m"]), float(frame["s"]), frame_peak))
+    return np.array(rows, dtype=np.float32).reshape(-1, 4)
+
+
+def build_index(media: ffmpeg_tools.FFmpeg, source: Path, cache_dir: Path) -> Path:
+    """Decode a source's audio once and store its loudness time series."""
+    output = index_path(cache_dir, source)
+    if output.exists():
+        return output
+    print(f"[recap] Indexing loudness of {source.name}", file=common.OUT_HANDLE)
+    index = parse_framelog(media.loudness_log(source))
+    if not len(index):
+        raise RuntimeError(f"Could not index loudness for {source}")
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    temporary = output.with_name(f"{output.stem}.{os.getpid()}.tmp.npy")
+    np.save(temporary, index)
+    temporary.replace(output)
+    return output
+
+
+def _mean_loudness(values: np.ndarray) -> float:
+    return float(10 * np.log10(np.mean(np.power(10.0, values.astype(np.float64) / 10))))
+
+
+def measure(index: np.ndarray, start: float, duration: float) -> ffmpeg_tools.LoudnessMeasurement:
+    """Derive BS.1770 integrated loudness, LRA and true peak for one window of an index."""
+    end = start + duration
+    times = index[:, 0]
+    # A block's time is its end; only blocks lying wholly inside the window count.
+    momentary = index[(times >= start + MOMENTARY_WINDOW - 0.05) & (times <= end + 0.05), 1]
+    momentary = momentary[momentary > ABSOLUTE_GATE]
+    if momentary.size:
+        threshold = _mean_loudness(momentary) - 10
+        gated = momentary[momentary > threshold]
+        integrated = _mean_loudness(gated) if gated.size else threshold + 10
+    else:
+        threshold, integrated = ABSOLUTE_GATE - 10, ABSOLUTE_GATE
+
+    short_term = index[(times >= start + SHORT_TERM_WINDOW - 0.05) & (times <= end + 0.05), 2]
+    short_term = short_term[short_term > ABSOLUTE_GATE]
+    lra = 0.0
+    if short_term.size:
+        short_term = short_term[short_term > _mean_loudness(short_term) - 20]
+        if short_term.size:
+            low, high = np.percentile(short_term, [10, 95])
+            lra = float(high - low)
+
+    peaks = index[(times > start) & (times <= end + 0.05), 3]
+    peaks = peaks[~np.isnan(peaks)]
+    # Without per-frame peaks, assume full scale so loudnorm stays cautious.
+    true_peak = float(peaks.max()) if peaks.size else 0.0
+    return ffmpeg_tools.LoudnessMeasurement(
+        integrated=round(integrated, 2), true_peak=round(max(true_peak, -99.0), 2),
+        lra=round(lra, 2), threshold=round(threshold, 2),
+    )
+
+
+def measure_window(
+    media: ffmpeg_tools.FFmpeg, source: Path, cache_dir: Path, start: float, duration: float,
+) -> ffmpeg_tools.LoudnessMeasurement:
+    """Measure a snippet from the source's index, building the index on first use."""
+    return measure(np.load(build_index(media, source, cache_dir)), start, duration)
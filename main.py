@@ -7,8 +7,10 @@ import sys
 import time
 import json
 
+import app_cache
 import cards
 import download
+import download_scheduler
 import ffmpeg_tools
 import recap
 #import thumbnails
@@ -16,6 +18,7 @@ import app_config
 import common
 import prepare
 import recap_api
+import snippets
 
 def cleanup(tmp: Path) -> None:
     for root, dirs, files in tmp.walk(top_down=False):
@@ -45,8 +48,7 @@ def resolve_output_size(clips: common.Clips, args: common.Args) -> None:
     if args.size is not None:
         return
 
-    videos: list[tuple[float, int, Path]] = []
-    seen: set[Path] = set()
+    paths: list[Path] = []
     for row in common.load_rows(args.csv):
         if row["type"] != "v":
             continue
@@ -55,12 +57,12 @@ def resolve_output_size(clips: common.Clips, args: common.Args) -> None:
             ro = f"{int(raw_ro):02d}"
         except ValueError:
             ro = raw_ro
-        path = clips[(row["show"].strip(), ro)][row["cc"].strip().upper()]
-        if path in seen:
-            continue
-        seen.add(path)
-        aspect, height = video_properties(path, args)
-        videos.append((aspect, height, path))
+        paths.append(clips[(row["show"].strip(), ro)][row["cc"].strip().upper()])
+    # Downloads record display properties, so this is normally one query and no ffprobe.
+    cached = download.cached_display_properties_many(args.vidsdir, paths)
+    videos: list[tuple[float, int, Path]] = [
+        (*(cached.get(path) or video_properties(path, args)), path) for path in dict.fromkeys(paths)
+    ]
 
     if videos:
         aspect, _height, source = max(videos, key=lambda value: value[0])
@@ -95,7 +97,7 @@ def exec(args: common.Args) -> None:
         sys.exit(1)
 
     try:
-        upload_session = prepare.open_upload_session(args.upload_recaps)
+        upload_session = prepare.open_upload_session(args.upload_recaps and not args.preview)
     except prepare.S3NotConfigured as exc:
         print(f"S3 is unavailable; continuing without recap uploads: {exc}", file=common.ERR_HANDLE)
         upload_session = None
@@ -106,6 +108,8 @@ def exec(args: common.Args) -> None:
 
     # Resolve an automatic canvas only after source video dimensions are known.
     resolve_output_size(clips, args)
+    if args.preview:
+        args = recap.preview_args(args)
 
     # Create cards
     cards.main(args)
@@ -114,7 +118,9 @@ def exec(args: common.Args) -> None:
     #thumbnails.main(args)
 
     # Create recap video
-    recap_outputs = recap.main(clips, args)
+    recap_outputs = recap.main(clips, args, download.content_digests(
+        args.vidsdir, (path for sources in clips.values() for path in sources.values()),
+    ))
 
     if upload_session is not None:
         # The preparation uploader already supplies content types and cache
@@ -150,7 +156,7 @@ def setup_args() -> argparse.ArgumentParser:
     parser.add_argument("--po-token", '-p', default=config["po_token"], help="PO token for YouTube downloads")
     parser.add_argument("--bgutil-url", default=config["bgutil_url"], help="Optional bgutil attestation server URL for YouTube downloads")
     parser.add_argument("--size", '-s', type=common.parse_size, help="Output size WxH (overrides automatic aspect ratio)")
-    parser.add_argument("--default-height", type=int, default=480, help="Default output height when all entries are audio")
+    parser.add_argument("--default-height", type=int, default=480, help="Default output height when all entries are audio; without --size it also caps downloaded video height")
     parser.add_argument("--fps", '-F', type=int, default=60, help="Output video FPS")
     parser.add_argument("--fade-duration", '-f', type=float, default=0.25, help="Fade duration in seconds")
     parser.add_argument("--av1-preset", type=int, default=config["av1_preset"], help="SVT-AV1 speed preset (higher is faster)")
@@ -159,11 +165,17 @@ def setup_args() -> argparse.ArgumentParser:
     parser.add_argument("--opus-bitrate", default=config["opus_bitrate"], help="Recap Opus audio bitrate")
     parser.add_argument("--audio-normalization", choices=["none", "one-pass", "two-pass"], default=config["audio_normalization"], help="Recap audio loudness mode")
     parser.add_argument("--jobs", type=int, default=config["jobs"], help="Concurrent recap renders (0 selects automatically)")
+    parser.add_argument("--source-cache-budget", type=common.parse_byte_size, default=config["source_cache_budget"], help="Evict least-recently-used sources above this size, such as 50G (0 keeps everything)")
+    parser.add_argument("--link-mode", choices=download.LINK_MODES, default=config["source_link_mode"], help="How show folders share cached sources (auto tries reflink, hard link, then symlink)")
+    parser.add_argument("--download-host-limits", default=config["download_host_limits"], help=f"Concurrent downloads per host, such as youtube=3,drive.google.com=2 (default {download_scheduler.DEFAULT_HOST_LIMITS}, {download_scheduler.DEFAULT_HOST_LIMIT} for other hosts)")
+    parser.add_argument("--download-bandwidth", type=common.parse_byte_size, default=config["download_bandwidth"], help="Total download rate limit in bytes per second, such as 20M (0 is unlimited)")
     parser.add_argument("--output", '-o', type=Path, default="output", help="Output video file name")
     parser.add_argument("--multiprocessing", '-m', action='store_true', help="Use multiprocessing")
     parser.add_argument("--cleanup", '-c', action='store_true', help="Cleanup temporary files after processing")
     parser.add_argument("--only-direct", '-d', default=False, action="store_true", dest="direct", help="Only create a straight recap")
     parser.add_argument("--only-reverse", '-r', default=False, action="store_true", dest="reverse", help="Only create a reverse recap")
+    parser.add_argument("--rendition", action="append", type=recap.parse_rendition, default=[], help="Also render NAME=HEIGHT|WxH|audio[,crf=N][,preset=N] from the same decode, such as low=480,crf=40 or audio=audio (repeatable)")
+    parser.add_argument("--preview", action="store_true", help="Render a fast low-resolution H.264 preview (.preview.mp4) instead of the final AV1 recap; nothing is uploaded")
     parser.add_argument("--upload-recaps", action=argparse.BooleanOptionalAction, default=prepare.s3_configured(), help="Upload recaps to the configured S3 bucket")
     parser.add_argument("--inkscape", default=config["inkscape"], help="Path to the inkscape executable")
     parser.add_argument("--card-renderer", choices=["inkscape", "resvg"], default=config["card_renderer"], help="SVG-to-PNG renderer")
@@ -189,6 +201,14 @@ def setup_configure_args() -> argparse.ArgumentParser:
     parser.add_argument("--opus-bitrate", default=argparse.SUPPRESS)
     parser.add_argument("--audio-normalization", choices=["none", "one-pass", "two-pass"], default=argparse.SUPPRESS)
     parser.add_argument("--jobs", default=argparse.SUPPRESS)
+    parser.add_argument("--source-cache-budget", default=argparse.SUPPRESS, help="Source cache size limit, such as 50G (0 keeps everything)")
+    parser.add_argument("--source-link-mode", choices=["auto", "reflink", "hardlink", "symlink"], default=argparse.SUPPRESS)
+    parser.add_argument("--download-host-limits", default=argparse.SUPPRESS, help="Concurrent downloads per host, such as youtube=3,drive.google.com=2")
+    parser.add_argument("--download-bandwidth", default=argparse.SUPPRESS, help="Total download rate limit per second, such as 20M (0 is unlimited)")
+    parser.add_argument("--upload-multipart-threshold", default=argparse.SUPPRESS, help="Upload size from which S3 multipart uploads are used, such as 64M")
+    parser.add_argument("--upload-part-size", default=argparse.SUPPRESS, help="S3 multipart part size, such as 32M")
+    parser.add_argument("--upload-concurrency", default=argparse.SUPPRESS, help="Concurrent S3 part uploads per file")
+    parser.add_argument("--upload-dedup", choices=["metadata", "content"], default=argparse.SUPPRESS, help="Detect unchanged uploads by file metadata or by content digest")
     parser.add_argument("--inkscape", default=argparse.SUPPRESS)
     parser.add_argument("--card-renderer", choices=["inkscape", "resvg"], default=argparse.SUPPRESS)
     parser.add_argument("--resvg", default=argparse.SUPPRESS)
@@ -196,7 +216,69 @@ def setup_configure_args() -> argparse.ArgumentParser:
     parser.add_argument("--ffprobe", default=argparse.SUPPRESS)
     return parser
 
+def setup_sources_args() -> argparse.ArgumentParser:
+    """Create the source-cache maintenance CLI."""
+    config = app_config.recap_settings()
+    parser = argparse.ArgumentParser(description="Inspect or clean the downloaded source cache.")
+    parser.add_argument("action", choices=["stats", "gc"], help="Report cache usage or remove reclaimable files")
+    parser.add_argument("--tmp", '-t', type=Path, default="temp", help="Temporary directory holding sources/")
+    parser.add_argument("--budget", type=common.parse_byte_size, default=config["source_cache_budget"], help="Size limit for least-recently-used eviction (0 keeps everything)")
+    parser.add_argument("--keep-show", action="append", default=[], help="Never evict sources of this show (repeatable)")
+    return parser
+
+
+def sources(args: argparse.Namespace) -> None:
+    vidsdir = args.tmp / "sources"
+    if not download.cache_database_path(vidsdir).exists():
+        print(f"No source cache in {vidsdir}")
+        return
+    download.initialize_cache(download.cache_database_path(vidsdir))
+    app_cache.initialize_database()
+    protected = download.protected_objects(vidsdir, args.keep_show)
+    if args.action == "gc":
+        freed = download.collect_garbage(vidsdir, args.budget, protected)
+        print(f"Freed {common.format_byte_size(freed)}")
+        return
+    stats = download.source_cache_stats(vidsdir, args.budget, protected)
+    hit_rate = "n/a" if stats.hit_rate is None else f"{stats.hit_rate:.1%}"
+    print(f"Entries:         {stats.entries}")
+    print(f"Total size:      {common.format_byte_size(stats.total_bytes)}")
+    print(f"Hit rate:        {hit_rate} ({stats.hits} hits, {stats.misses} misses)")
+    print(f"Orphaned files:  {common.format_byte_size(stats.orphan_bytes)}")
+    print(f"Stale partials:  {common.format_byte_size(stats.partial_bytes)}")
+    print(f"Over budget:     {common.format_byte_size(stats.evictable_bytes)}")
+    print(f"Reclaimable:     {common.format_byte_size(stats.reclaimable_bytes)}")
+    if stats.shared_bytes:
+        print(f"Held by aliases: {common.format_byte_size(stats.shared_bytes)} (hard-linked or reflinked, not reclaimable)")
+
+
+def setup_snippets_args() -> argparse.ArgumentParser:
+    """Create the snippet-suggestion CLI."""
+    config = app_config.recap_settings()
+    parser = argparse.ArgumentParser(description="Suggest snippet ranges for entries of a JSON show file from their downloaded audio.")
+    parser.add_argument("show", type=Path, help="JSON show file to update")
+    parser.add_argument("--tmp", '-t', type=Path, default="temp", help="Temporary directory holding sources/")
+    parser.add_argument("--overwrite", action="store_true", help="Replace existing snippet ranges instead of only filling missing ones")
+    parser.add_argument("--dry-run", action="store_true", help="Print suggestions without writing the show file")
+    parser.add_argument("--ffmpeg", default=config["ffmpeg"], help="Path to the ffmpeg executable")
+    parser.add_argument("--ffprobe", default=config["ffprobe"], help="Path to the ffprobe executable")
+    return parser
+
+
+def suggest_snippets(args: argparse.Namespace) -> None:
+    media = ffmpeg_tools.FFmpeg(args.ffmpeg, args.ffprobe, common.run)
+    changed = snippets.main(args.show, args.tmp / "sources", media, args.overwrite, args.dry_run)
+    action = "Would update" if args.dry_run else "Updated"
+    print(f"{action} {changed} entries")
+
+
 def main() -> None:
+    if len(sys.argv) > 1 and sys.argv[1] == "sources":
+        sources(setup_sources_args().parse_args(sys.argv[2:]))
+        return
+    if len(sys.argv) > 1 and sys.argv[1] == "snippets":
+        suggest_snippets(setup_snippets_args().parse_args(sys.argv[2:]))
+        return
     if len(sys.argv) > 1 and sys.argv[1] == "configure":
         args = setup_configure_args().parse_args(sys.argv[2:])
         if args.show:
@@ -259,6 +341,12 @@ def main() -> None:
         only_straight=args.direct,
         only_reverse=args.reverse,
         upload_recaps=args.upload_recaps,
+        source_cache_budget=args.source_cache_budget,
+        link_mode=args.link_mode,
+        download_host_limits=args.download_host_limits,
+        download_bandwidth=args.download_bandwidth,
+        preview=args.preview,
+        renditions=tuple(args.rendition),
     ))
 
 if __name__ == "__main__":
@@ -3,21 +3,26 @@
 
 import shlex
 import argparse
+import hashlib
 import json
+import math
 import os
 import re
 import sys
 import subprocess as sp
+from concurrent.futures import ThreadPoolExecutor
 from contextvars import ContextVar
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, IO, Union
+from typing import Any, IO, Iterable, Union
 
 import boto3
+from boto3.s3.transfer import TransferConfig
 from botocore.exceptions import BotoCoreError, ClientError
 
 import app_cache
 import app_config
+import common
 import country_schemes
 import ffmpeg_tools
 
@@ -25,6 +30,16 @@ base_url = 'https://media.world-stage.org'
 OUT_HANDLE = sys.stdout
 ERR_HANDLE = sys.stderr
 
+# S3 rejects parts below 5 MiB (except the last) and uploads above 10,000 parts.
+MINIMUM_PART_SIZE = 5 * 1024 * 1024
+MAXIMUM_PART_COUNT = 10_000
+UPLOAD_DEDUP_MODES = ("metadata", "content")
+# User metadata recording the uploaded file's MD5, independent of part size.
+CONTENT_MD5_METADATA = "source-md5"
+# boto3's default multipart threshold and part size, used by uploads made before transfer tuning.
+DEFAULT_BOTO_PART_SIZE = 8 * 1024 * 1024
+MEBIBYTE = 1024 * 1024
+
 
 @dataclass(frozen=True)
 class S3Config:
@@ -45,6 +60,68 @@ class S3NotConfigured(RuntimeError):
     """Raised when optional S3 settings have not been supplied."""
 
 
+@dataclass(frozen=True)
+class TransferSettings:
+    """Multipart thresholds, concurrency and change detection for uploads.
+
+    ``dedup="content"`` treats a file as unchanged when its MD5 matches the
+    cached or remote object, even if its path or modification time differ.
+    """
+
+    multipart_threshold: int
+    part_size: int
+    concurrency: int
+    dedup: str = "metadata"
+
+    def __post_init__(self) -> None:
+        if self.dedup not in UPLOAD_DEDUP_MODES:
+            raise ValueError(f"Unknown upload dedup mode: {self.dedup!r}")
+        if self.multipart_threshold < MINIMUM_PART_SIZE:
+            raise ValueError("Multipart threshold must be at least 5 MiB")
+        if self.part_size < MINIMUM_PART_SIZE:
+            raise ValueError("Upload part size must be at least 5 MiB")
+        if self.concurrency < 1:
+            raise ValueError("Upload concurrency must be positive")
+
+    def part_size_for(self, size: int) -> int:
+        """Grow the configured part size just enough to stay within S3's part limit."""
+        return max(self.part_size, math.ceil(size / MAXIMUM_PART_COUNT))
+
+    def boto_config(self) -> TransferConfig:
+        return TransferConfig(
+            multipart_threshold=self.multipart_threshold,
+            multipart_chunksize=self.part_size,
+            max_concurrency=self.concurrency,
+        )
+
+
+def transfer_settings() -> TransferSettings:
+    """Return the persisted upload tuning."""
+    settings = app_config.recap_settings()
+    return TransferSettings(
+        multipart_threshold=common.parse_byte_size(str(settings["upload_multipart_threshold"])),
+        part_size=common.parse_byte_size(str(settings["upload_part_size"])),
+        concurrency=int(str(settings["upload_concurrency"])),
+        dedup=str(settings["upload_dedup"]),
+    )
+
+
+@dataclass(frozen=True)
+class ContentDigest:
+    """A file's MD5 and the ETag S3 reports for it as a multipart upload of ``part_size`` parts."""
+
+    md5: str
+    multipart_etag: str
+    part_size: int
+
+    def matches_etag(self, etag: str) -> bool:
+        return etag.strip('"') in {self.md5, self.multipart_etag}
+
+    def etag_for(self, size: int, transfer: TransferSettings) -> str:
+        """Return the ETag S3 assigns when this file is uploaded with ``transfer``."""
+        return self.multipart_etag if size >= transfer.multipart_threshold else self.md5
+
+
 @dataclass(frozen=True)
 class PrepareRequest:
     """The GUI- and CLI-independent description of one preparation job."""
@@ -261,6 +338,9 @@ def setup_args() -> argparse.ArgumentParser:
     configure_s3.add_argument("--bucket", default="", help="Bucket name")
     configure_s3.add_argument("--profile", default="", help="AWS profile name")
 
+    reconcile = subparsers.add_parser("reconcile-uploads", help="Record objects already in the configured bucket as uploaded")
+    reconcile.add_argument("--prefix", default="", help="Only list objects below this key prefix")
+
     parser.set_defaults(upload=s3_configured())
 
     return parser
@@ -410,17 +490,241 @@ def open_upload_session(enabled: bool, *, dry_run_mode: bool = False) -> UploadS
     return UploadSession(config, create_s3_client(config))
 
 
-def upload(path: Path | None, config: S3Config, client, object_name: str | None = None) -> None:
+def content_digest(path: Path, transfer: TransferSettings, part_size: int | None = None) -> ContentDigest:
+    """Hash a file once per path, size, mtime and part size in a single streaming pass.
+
+    Each part is hashed alongside the whole file, so the result can be compared
+    with a single-part ETag (the object's MD5) or a multipart ETag (the MD5 of
+    the part MD5s, suffixed with the part count).  ``part_size`` defaults to the
+    one ``transfer`` would upload the file with.
+    """
+    part_size = part_size or transfer.part_size_for(path.stat().st_size)
+    cached = app_cache.cached_file_digest(path, part_size)
+    if cached is not None:
+        return ContentDigest(*cached, part_size)
+    whole = hashlib.md5(usedforsecurity=False)
+    part_digests: list[bytes] = []
+    with path.open("rb") as source:
+        while True:
+            part = hashlib.md5(usedforsecurity=False)
+            remaining = part_size
+            while remaining and (block := source.read(min(remaining, 1024 * 1024))):
+                whole.update(block)
+                part.update(block)
+                remaining -= len(block)
+            if remaining == part_size:
+                break
+            part_digests.append(part.digest())
+            if remaining:
+                break
+    combined = hashlib.md5(b"".join(part_digests), usedforsecurity=False).hexdigest()
+    digest = ContentDigest(whole.hexdigest(), f"{combined}-{max(1, len(part_digests))}", part_size)
+    app_cache.store_file_digest(path, part_size, digest.md5, digest.multipart_etag)
+    return digest
+
+
+def etag_part_sizes(etag: str, size: int, transfer: TransferSettings) -> list[int]:
+    """Return the part sizes that may have produced a multipart ``<md5>-<count>`` ETag.
+
+    The count does not pin the part size down, so this tries boto3's default,
+    the configured size and the smallest whole MiB splitting ``size`` into that
+    many parts, keeping those that give the same count.
+    """
+    head, _, count = etag.strip('"').rpartition("-")
+    if not head or not count.isdigit() or int(count) < 1:
+        return []
+    parts = int(count)
+    candidates = (
+        DEFAULT_BOTO_PART_SIZE,
+        transfer.part_size_for(size),
+        math.ceil(size / parts / MEBIBYTE) * MEBIBYTE,
+    )
+    return [part_size for part_size in dict.fromkeys(candidates) if math.ceil(size / part_size) == parts]
+
+
+def etag_matches(path: Path, transfer: TransferSettings, digest: ContentDigest, etag: str) -> bool:
+    """Compare a remote ETag with a file, rehashing it with any other part size the ETag implies."""
+    etag = etag.strip('"')
+    if digest.matches_etag(etag):
+        return True
+    return any(
+        content_digest(path, transfer, part_size).multipart_etag == etag
+        for part_size in etag_part_sizes(etag, path.stat().st_size, transfer)
+        if part_size != digest.part_size
+    )
+
+
+def matching_remote_etag(
+    config: S3Config, client, object_name: str, path: Path, digest: ContentDigest, transfer: TransferSettings,
+) -> str | None:
+    """Return the remote object's ETag if its recorded MD5 or its ETag matches a local file."""
+    try:
+        head = client.head_object(Bucket=config.bucket, Key=object_name)
+    except ClientError as exc:
+        if exc.response.get("Error", {}).get("Code") in {"404", "NoSuchKey", "NotFound"}:
+            return None
+        raise
+    etag = str(head.get("ETag", "")).strip('"')
+    if head.get("Metadata", {}).get(CONTENT_MD5_METADATA) == digest.md5:
+        return etag
+    if head.get("ContentLength") == path.stat().st_size and etag_matches(path, transfer, digest, etag):
+        return etag
+    return None
+
+
+def list_remote_objects(config: S3Config, client, prefix: str = "") -> Iterable[tuple[str, int, str]]:
+    """Yield every object's name, size and ETag below a prefix, one page at a time."""
+    paginator = client.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=config.bucket, Prefix=prefix, PaginationConfig={"PageSize": 1000}):
+        for item in page.get("Contents", []):
+            yield str(item["Key"]), int(item["Size"]), str(item["ETag"]).strip('"')
+
+
+def reconcile_upload_cache(session: UploadSession, prefix: str = "") -> tuple[int, int]:
+    """Populate the upload cache from a bucket listing instead of re-uploading."""
+    if session.client is None:
+        raise RuntimeError("S3 client was not initialized")
+    print(f"Listing s3://{session.config.bucket}/{prefix}", file=OUT_HANDLE)
+    try:
+        listed, removed = app_cache.reconcile_uploads(
+            session.config.endpoint_url, session.config.bucket, prefix,
+            list_remote_objects(session.config, session.client, prefix),
+        )
+    except (BotoCoreError, ClientError) as exc:
+        message = f"Could not list s3://{session.config.bucket}/{prefix}: {exc}"
+        print(message, file=ERR_HANDLE)
+        raise RuntimeError(message) from exc
+    print(
+        f"Recorded {listed} remote objects and forgot {removed} missing uploads "
+        f"in {app_cache.database_path()}",
+        file=OUT_HANDLE,
+    )
+    return listed, removed
+
+
+def upload_multipart(
+    path: Path,
+    config: S3Config,
+    client,
+    object_name: str,
+    extra_args: dict[str, Any],
+    transfer: TransferSettings,
+) -> None:
+    """Upload a large file in parts, resuming a cached upload from its last finished part.
+
+    The upload id and every accepted part are recorded in the application cache
+    as soon as S3 acknowledges them, so an interrupted run only re-sends the
+    parts that were still in flight.
+    """
+    stat = path.stat()
+    part_size = transfer.part_size_for(stat.st_size)
+    part_count = max(1, math.ceil(stat.st_size / part_size))
+    state = app_cache.cached_multipart_upload(config.endpoint_url, config.bucket, object_name)
+    if state is not None and (state.source_path, state.size, state.mtime_ns, state.part_size) != (
+        str(path.resolve()), stat.st_size, stat.st_mtime_ns, part_size,
+    ):
+        qprint(f"Discarding stale multipart upload of s3://{config.bucket}/{object_name}")
+        try:
+            client.abort_multipart_upload(Bucket=config.bucket, Key=object_name, UploadId=state.upload_id)
+        except ClientError:
+            pass
+        app_cache.clear_multipart_upload(config.endpoint_url, config.bucket, object_name)
+        state = None
+
+    if state is None:
+        response = client.create_multipart_upload(Bucket=config.bucket, Key=object_name, **extra_args)
+        upload_id = str(response["UploadId"])
+        app_cache.store_multipart_upload(
+            path, config.endpoint_url, config.bucket, object_name, upload_id, part_size,
+        )
+        parts: dict[int, str] = {}
+    else:
+        upload_id, parts = state.upload_id, dict(state.parts)
+        qprint(f"Resuming upload of {path}: {len(parts)} of {part_count} parts already uploaded")
+
+    def send_part(number: int) -> tuple[int, str]:
+        with path.open("rb") as source:
+            source.seek((number - 1) * part_size)
+            body = source.read(part_size)
+        response = client.upload_part(
+            Bucket=config.bucket, Key=object_name, UploadId=upload_id, PartNumber=number, Body=body,
+        )
+        etag = str(response["ETag"])
+        app_cache.store_multipart_part(upload_id, number, etag)
+        return number, etag
+
+    pending = [number for number in range(1, part_count + 1) if number not in parts]
+    with ThreadPoolExecutor(min(transfer.concurrency, max(1, len(pending)))) as pool:
+        for number, etag in pool.map(send_part, pending):
+            parts[number] = etag
+    client.complete_multipart_upload(
+        Bucket=config.bucket, Key=object_name, UploadId=upload_id,
+        MultipartUpload={"Parts": [
+            {"ETag": parts[number], "PartNumber": number} for number in sorted(parts)
+        ]},
+    )
+    app_cache.clear_multipart_upload(config.endpoint_url, config.bucket, object_name)
+
+
+def upload(
+    path: Path | None,
+    config: S3Config,
+    client,
+    object_name: str | None = None,
+    transfer: TransferSettings | None = None,
+) -> None:
     if path is None:
         return
     object_name = object_name or path.name
-
-    if not dry_run.get() and app_cache.is_cached_upload(path, config.endpoint_url, config.bucket, object_name):
+    try:
+        transfer = transfer or transfer_settings()
+    except ValueError as exc:
+        message = f"Invalid upload settings in {app_config.config_path()}: {exc}"
+        print(message, file=ERR_HANDLE)
+        raise RuntimeError(message) from exc
+    remote_only = None if dry_run.get() else app_cache.remote_upload_record(
+        config.endpoint_url, config.bucket, object_name,
+    )
+    # Objects known only from a bucket listing can be matched by content alone.
+    hash_content = transfer.dedup == "content" or (
+        remote_only is not None and remote_only[0] == path.stat().st_size
+    )
+    digest = content_digest(path, transfer) if hash_content and not dry_run.get() else None
+    digest_args: dict[str, str | None] = {
+        "content_md5": digest.md5 if digest is not None else None,
+        "etag": digest.etag_for(path.stat().st_size, transfer) if digest is not None else None,
+    }
+    if (
+        digest is not None and remote_only is not None and remote_only[0] == path.stat().st_size
+        and etag_matches(path, transfer, digest, remote_only[1])
+    ):
+        # The listed object may have been uploaded with another part size; keep its real ETag.
+        digest_args["etag"] = remote_only[1]
+
+    if not dry_run.get() and app_cache.is_cached_upload(
+        path, config.endpoint_url, config.bucket, object_name, **digest_args,
+    ):
         print(f"Skipping unchanged upload: {path}", file=OUT_HANDLE)
+        if digest is not None:
+            app_cache.store_upload(path, config.endpoint_url, config.bucket, object_name, **digest_args)
         return
+    if digest is not None and client is not None:
+        try:
+            remote_etag = matching_remote_etag(config, client, object_name, path, digest, transfer)
+        except (BotoCoreError, ClientError) as exc:
+            message = f"Could not inspect s3://{config.bucket}/{object_name}: {exc}"
+            print(message, file=ERR_HANDLE)
+            raise RuntimeError(message) from exc
+        if remote_etag is not None:
+            print(f"Skipping upload of identical remote content: {path}", file=OUT_HANDLE)
+            app_cache.store_upload(
+                path, config.endpoint_url, config.bucket, object_name,
+                content_md5=digest.md5, etag=remote_etag,
+            )
+            return
 
     suffix = path.suffix.lower()
-    extra_args: dict[str, str] = {}
+    extra_args: dict[str, Any] = {}
     if suffix == '.mov':
         extra_args['ContentType'] = 'video/mp4'
     elif suffix == '.m4a':
@@ -431,6 +735,8 @@ def upload(path: Path | None, config: S3Config, client, object_name: str | None
         extra_args['ContentType'] = 'image/png'
     elif suffix == '.webp':
         extra_args['ContentType'] = 'image/webp'
+    if digest is not None:
+        extra_args['Metadata'] = {CONTENT_MD5_METADATA: digest.md5}
 
     print(f"Uploading {path} to s3://{config.bucket}/{object_name}", file=OUT_HANDLE)
     if dry_run.get():
@@ -438,15 +744,26 @@ def upload(path: Path | None, config: S3Config, client, object_name: str | None
     if client is None:
         raise RuntimeError("S3 client was not initialized")
     try:
-        if extra_args:
-            client.upload_file(str(path), config.bucket, object_name, ExtraArgs=extra_args)
+        if path.stat().st_size >= transfer.multipart_threshold:
+            try:
+                upload_multipart(path, config, client, object_name, extra_args, transfer)
+            except ClientError as exc:
+                if exc.response.get("Error", {}).get("Code") != "NoSuchUpload":
+                    raise
+                # The bucket expired or aborted the cached upload; start afresh.
+                app_cache.clear_multipart_upload(config.endpoint_url, config.bucket, object_name)
+                upload_multipart(path, config, client, object_name, extra_args, transfer)
+        elif extra_args:
+            client.upload_file(
+                str(path), config.bucket, object_name, ExtraArgs=extra_args, Config=transfer.boto_config(),
+            )
         else:
-            client.upload_file(str(path), config.bucket, object_name)
+            client.upload_file(str(path), config.bucket, object_name, Config=transfer.boto_config())
     except (BotoCoreError, ClientError, OSError) as exc:
         message = f"Could not upload {path} to s3://{config.bucket}/{object_name}: {exc}"
         print(message, file=ERR_HANDLE)
         raise RuntimeError(message) from exc
-    app_cache.store_upload(path, config.endpoint_url, config.bucket, object_name)
+    app_cache.store_upload(path, config.endpoint_url, config.bucket, object_name, **digest_args)
 
 def execute(request: PrepareRequest) -> None:
     """Prepare one audio or video item, optionally uploading its artifacts."""
@@ -511,6 +828,15 @@ def main() -> None:
         path = save_s3_config(S3Config(args.endpoint_url, args.bucket, args.profile))
         print(f"Saved S3 configuration to {path}", file=OUT_HANDLE)
         return
+    if args.mode == "reconcile-uploads":
+        try:
+            session = open_upload_session(True)
+        except S3NotConfigured as exc:
+            print(f"S3 is not configured; nothing to reconcile: {exc}", file=ERR_HANDLE)
+            sys.exit(1)
+        assert session is not None
+        reconcile_upload_cache(session, args.prefix)
+        return
 
     settings = app_config.recap_settings()
     request = PrepareRequest(
@@ -1,20 +1,26 @@
 #!/usr/bin/env python3
 from collections import defaultdict
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass, replace
 from pathlib import Path
 from typing import Iterable
 import hashlib
 import json
 import multiprocessing as mp
+import re
 import time
 from urllib.parse import urlparse
 
 import app_cache
+import cards
 import common
 import country_schemes
 import ffmpeg_tools
+import loudness
 
 RECAP_MEDIA_TYPES = {"v", "a"}
+PREVIEW_HEIGHT = 360
+PREVIEW_FPS = 15
+STILL_VERSION = 1
 
 
 @dataclass(frozen=True)
@@ -29,6 +35,8 @@ class Data:
     snippet_end: float
     media_type: str
     cover_path: Path | None
+    # SHA-256 recorded when the source was downloaded into the cache.
+    content_sha256: str | None = None
 
     def make_straight(self, start: float, end: float) -> "Data":
         return Data(
@@ -42,33 +50,54 @@ class Data:
             snippet_end=end,
             media_type=self.media_type,
             cover_path=self.cover_path,
+            content_sha256=self.content_sha256,
         )
 
 
+@dataclass(frozen=True)
+class RecapOutput:
+    rendition: ffmpeg_tools.Rendition
+    path: Path
+    fingerprint: str
+
+
 @dataclass(frozen=True)
 class RenderJob:
     key: str
     rows: list[Data]
     metadata: Path
     graph: Path
-    output: Path
+    outputs: list[RecapOutput]
     reverse: bool
-    fingerprint: str
 
+    @property
+    def video(self) -> bool:
+        """Whether any stale output needs frames; audio-only jobs never decode video."""
+        return any(not output.rendition.audio_only for output in self.outputs)
 
-def file_identity(path: Path) -> tuple[str, int, int]:
+
+def file_identity(path: Path, content_sha256: str | None = None) -> tuple[str, int, int] | tuple[str, str]:
+    """Identify a file by its known content digest, otherwise by its resolved path, size and mtime."""
+    if content_sha256 is not None:
+        return ("sha256", content_sha256)
     stat = path.resolve().stat()
     return (str(path.resolve()), stat.st_size, stat.st_mtime_ns)
 
 
-def output_fingerprint(rows: list[Data], args: common.Args, reverse: bool) -> str:
+def output_fingerprint(
+    rows: list[Data], args: common.Args, reverse: bool, rendition: ffmpeg_tools.Rendition | None = None,
+) -> str:
     value = {
+        # Version 7 identifies cached sources by their download-time digest.
+        # Version 6 takes two-pass loudness measurements from a per-source index.
+        # Version 5 renders through the optimized filter graph.
+        # Version 4 renders audio entries from pre-composited stills.
         # Version 3 corrects non-square-pixel video sources by preserving
         # their display aspect ratio while converting them to square pixels.
         # Version 2 fixes audio artwork: attached pictures are now opened as
         # an unseeked visual input, rather than being discarded by the audio
         # snippet seek that starts after their timestamp-zero frame.
-        "version": 3,
+        "version": 7,
         "reverse": reverse,
         "size": args.size,
         "fps": args.fps,
@@ -80,16 +109,137 @@ def output_fingerprint(rows: list[Data], args: common.Args, reverse: bool) -> st
             {
                 "ro": row.ro, "country": row.country, "artist": row.artist, "title": row.title,
                 "range": [row.snippet_start, row.snippet_end], "type": row.media_type,
-                "source": file_identity(row.path),
+                "source": file_identity(row.path, row.content_sha256),
                 "cover": file_identity(row.cover_path) if row.cover_path and row.cover_path.exists() else None,
-                "card": file_identity(args.cardsdir / row.show / f"{row.ro}_{row.country}.png"),
+                "card": file_identity(card_path(row, args)),
             }
             for row in rows
         ],
     }
+    if rendition is not None and rendition != ffmpeg_tools.Rendition():
+        value["rendition"] = asdict(rendition)
     return hashlib.sha256(json.dumps(value, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
 
 
+def parse_rendition(value: str) -> ffmpeg_tools.Rendition:
+    """Parse ``NAME=HEIGHT|WxH|audio[,crf=N][,preset=N]``, such as ``low=480,crf=40``."""
+    name, separator, spec = value.partition("=")
+    name = name.strip()
+    if not separator or not re.fullmatch(r"[A-Za-z0-9_-]+", name):
+        raise ValueError(f"Invalid rendition: {value!r}")
+    target, *options = [part.strip() for part in spec.split(",")]
+    crf: int | None = None
+    preset: int | None = None
+    for option in options:
+        key, separator, number = option.partition("=")
+        if key not in {"crf", "preset"} or not separator or not number.isdigit():
+            raise ValueError(f"Invalid rendition option {option!r} in {value!r}")
+        if key == "crf":
+            crf = int(number)
+        else:
+            preset = int(number)
+    if target == "audio":
+        return ffmpeg_tools.Rendition(name, audio_only=True)
+    if target.isdigit() and int(target) >= 2:
+        height = int(target) - int(target) % 2
+        return ffmpeg_tools.Rendition(name, height=height, av1_crf=crf, av1_preset=preset)
+    if re.fullmatch(r"\d+x\d+", target):
+        return ffmpeg_tools.Rendition(name, size=common.parse_size(target), av1_crf=crf, av1_preset=preset)
+    raise ValueError(f"Invalid rendition size {target!r} in {value!r}")
+
+
+def rendition_path(output: Path, rendition: ffmpeg_tools.Rendition) -> Path:
+    """Name a rendition after the full-canvas recap it accompanies."""
+    if not rendition.name:
+        return output
+    suffix = ".m4a" if rendition.audio_only else output.suffix
+    return output.with_name(f"{output.stem}.{rendition.name}{suffix}")
+
+
+def card_path(row: Data, args: common.Args) -> Path:
+    return args.cardsdir / row.show / f"{row.ro}_{row.country}.png"
+
+
+def card_position(card: Path, offsets: dict[Path, tuple[int, int]]) -> str:
+    """Return the overlay position of a cropped card; uncropped cards are centred."""
+    offset = offsets.get(card.absolute())
+    return "(W-w)/2:(H-h)/2" if offset is None else f"{offset[0]}:{offset[1]}"
+
+
+def still_path(row: Data, args: common.Args) -> Path:
+    return args.cardsdir / "stills" / row.show / f"{row.ro}_{row.country}.png"
+
+
+def still_visual(row: Data) -> Path:
+    """Return the artwork of an audio entry: its cover, or the source's attached picture."""
+    if row.cover_path is not None and row.cover_path.exists():
+        return row.cover_path
+    return row.path
+
+
+def still_fingerprint(row: Data, args: common.Args) -> str:
+    visual = still_visual(row)
+    value = {
+        "version": STILL_VERSION, "size": args.size,
+        "visual": file_identity(visual, row.content_sha256 if visual == row.path else None), "card": file_identity(card_path(row, args)),
+    }
+    return hashlib.sha256(json.dumps(value, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def prepare_stills(rows: Iterable[Data], args: common.Args) -> None:
+    """Composite each audio entry's artwork and card once, so recaps only loop one frame."""
+    if args.size is None:
+        raise RuntimeError("Output size must be resolved before compositing stills")
+    media = ffmpeg_tools.FFmpeg(args.ffmpeg, args.ffprobe, common.run)
+    offsets = cards.card_offsets(args.cardsdir)
+    for row in {still_path(row, args): row for row in rows if row.media_type == "a"}.values():
+        output = still_path(row, args)
+        fingerprint = still_fingerprint(row, args)
+        if output.exists() and app_cache.cached_recap_fingerprint(output) == fingerprint:
+            continue
+        validate_media(row, media.probe_media(row.path))
+        output.parent.mkdir(parents=True, exist_ok=True)
+        card = card_path(row, args)
+        media.make_still(
+            still_visual(row), card, output, video_normalizer(*args.size), card_position(card, offsets),
+        )
+        app_cache.store_recap_fingerprint(output, fingerprint)
+
+
+def loudness_dir(args: common.Args) -> Path:
+    return args.vidsdir / "loudness"
+
+
+def prepare_loudness(rows: Iterable[Data], args: common.Args) -> None:
+    """Index each source's loudness once, so any snippet range is measured without decoding."""
+    if args.audio_normalization != "two-pass":
+        return
+    media = ffmpeg_tools.FFmpeg(args.ffmpeg, args.ffprobe, common.run)
+    for path in dict.fromkeys(row.path for row in rows):
+        loudness.build_index(media, path, loudness_dir(args))
+
+
+def preview_args(args: common.Args) -> common.Args:
+    """Scale a resolved recap down for a fast preview with the same timeline.
+
+    Cards are rendered for the smaller canvas into their own directory, and
+    loudness normalization is skipped because it needs a measuring pass.
+    """
+    if args.size is None:
+        raise RuntimeError("Output size must be resolved before preparing a preview")
+    width, height = args.size
+    preview_height = min(height, PREVIEW_HEIGHT)
+    return replace(
+        args,
+        size=(max(2, round(width * preview_height / height / 2) * 2), preview_height),
+        fps=min(args.fps, PREVIEW_FPS),
+        audio_normalization="none",
+        cardsdir=args.tmpdir / "preview-cards",
+        upload_recaps=False,
+        renditions=(),
+    )
+
+
 def parse_seconds(value: str | None) -> float | None:
     """Parse a string in the form SS, M:SS, or H:MM:SS."""
     if not value or not value.strip():
@@ -122,9 +272,11 @@ def clip_range(row: Data, fade_duration: float) -> tuple[float, float]:
     return start, end
 
 
-def validate_media(row: Data, probe: ffmpeg_tools.MediaProbe) -> None:
+def validate_media(row: Data, probe: ffmpeg_tools.MediaProbe, video: bool = True) -> None:
     if not probe.has_audio:
         raise RuntimeError(f"Source has no audio stream: {row.path}")
+    if not video:
+        return
     if row.media_type == "v" and not probe.has_video:
         raise RuntimeError(f"Video entry has no non-attached video stream: {row.path}")
     if row.media_type == "a" and not probe.has_picture and not (
@@ -133,19 +285,46 @@ def validate_media(row: Data, probe: ffmpeg_tools.MediaProbe) -> None:
         raise RuntimeError(f"Audio entry needs attached artwork or an image_link cover: {row.path}")
 
 
-def video_normalizer(width: int, height: int) -> str:
-    """Fit an input's display aspect ratio in a square-pixel output frame."""
+def video_normalizer(width: int, height: int, scaler: str = "lanczos", pixel_format: str | None = None) -> str:
+    """Fit an input's display aspect ratio in a square-pixel output frame.
+
+    A ``pixel_format`` is converted to inside the scaler, so padding and
+    everything after it already run in that format.
+    """
+    conversion = f"format={pixel_format}," if pixel_format else ""
     return (
         f"scale={width}:{height}:force_original_aspect_ratio=decrease:"
-        f"force_divisible_by=2:flags=lanczos:reset_sar=1,"
+        f"force_divisible_by=2:flags={scaler}:reset_sar=1,{conversion}"
         f"pad={width}:{height}:(ow-iw)/2:(oh-ih):color=black,setsar=1"
     )
 
 
+def video_scaler(source: ffmpeg_tools.VideoProperties | None, width: int, height: int) -> str:
+    """Pick the cheapest scaler that is still adequate for fitting ``source`` in the canvas."""
+    if source is None:
+        return "lanczos"
+    factor = min(width / (source.display_aspect * source.height), height / source.height)
+    if abs(factor - 1) < 0.02:
+        # Practically a copy: lanczos would only sharpen rounding differences.
+        return "bilinear"
+    fitted = round(source.height * factor)
+    if factor < 1 and fitted > 0 and source.height % fitted == 0:
+        # Whole-number downscales average exact pixel blocks.
+        return "area"
+    return "lanczos"
+
+
 def build_graph(
-    rows: list[Data], args: common.Args, media: ffmpeg_tools.FFmpeg,
+    rows: list[Data], args: common.Args, media: ffmpeg_tools.FFmpeg, optimize: bool = True, video: bool = True,
 ) -> tuple[list[str], str, int]:
-    """Create all FFmpeg inputs and a graph that emits one recap A/V pair."""
+    """Create all FFmpeg inputs and a graph that emits one recap A/V pair.
+
+    The optimized graph drops to the output frame rate right after trimming,
+    converts to yuv420p inside the scaler, converts each card and still once
+    instead of per frame, and picks the scaler per source.  ``optimize=False``
+    builds the previous graph for comparison.  Without ``video`` the graph
+    emits only ``[aout]`` and opens no cards or stills.
+    """
     if not rows:
         raise ValueError("Cannot render an empty recap")
 
@@ -156,20 +335,21 @@ def build_graph(
     filters: list[str] = []
     concat_inputs: list[str] = []
     probes: dict[Path, ffmpeg_tools.MediaProbe] = {}
+    offsets = cards.card_offsets(args.cardsdir)
     input_count = 0
 
     for entry_number, row in enumerate(rows):
-        if not row.path.exists(follow_symlinks=False):
+        if not row.path.exists():
             raise FileNotFoundError(f"Source media not found: {row.path}")
-        card = args.cardsdir / row.show / f"{row.ro}_{row.country}.png"
-        if not card.exists():
+        card = card_path(row, args)
+        if video and not card.exists():
             raise FileNotFoundError(f"Overlay card not found: {card}")
 
         probe = probes.get(row.path)
         if probe is None:
             probe = media.probe_media(row.path)
             probes[row.path] = probe
-        validate_media(row, probe)
+        validate_media(row, probe, video)
         start, end = clip_range(row, args.fade_duration)
         duration = end - start
         media_input = input_count
@@ -183,49 +363,82 @@ def build_graph(
             "-ss", ffmpeg_tools.timestamp(start), "-t", ffmpeg_tools.timestamp(duration), "-i", str(row.path),
         ])
 
-        if row.media_type == "a" and row.cover_path is not None and row.cover_path.exists():
-            visual_input_index = input_count
-            input_count += 1
-            input_args.extend([
-                "-loop", "1", "-framerate", str(args.fps), "-t", ffmpeg_tools.timestamp(duration), "-i", str(row.cover_path),
-            ])
-            visual_input = f"[{visual_input_index}:v:0]trim=duration={duration_text},setpts=PTS-STARTPTS"
+        fades = (
+            f"fade=t=in:st=0:d={args.fade_duration:.6f},"
+            f"fade=t=out:st={fade_start}:d={args.fade_duration:.6f}"
+        )
+        if not video:
+            # Unused video streams of the inputs are never decoded.
+            pass
         elif row.media_type == "a":
-            visual_input_index = input_count
+            # Artwork and card were composited once by prepare_stills; only
+            # that frame is looped, so the audio source is demuxed just once.
+            still = still_path(row, args)
+            if not still.exists():
+                raise FileNotFoundError(f"Audio still not found: {still}")
+            still_input = input_count
+            input_count += 1
+            if optimize:
+                # Decode and convert the still once; the loop filter repeats the converted frame.
+                input_args.extend(["-framerate", str(args.fps), "-i", str(still)])
+                filters.append(
+                    f"[{still_input}:v:0]format=yuv420p,setsar=1,loop=loop=-1:size=1:start=0,"
+                    f"trim=duration={duration_text},setpts=PTS-STARTPTS,{fades}[v{entry_number}]"
+                )
+            else:
+                input_args.extend([
+                    "-loop", "1", "-framerate", str(args.fps), "-t", ffmpeg_tools.timestamp(duration),
+                    "-i", str(still),
+                ])
+                filters.append(
+                    f"[{still_input}:v:0]trim=duration={duration_text},setpts=PTS-STARTPTS,setsar=1,"
+                    f"{fades},format=yuv420p[v{entry_number}]"
+                )
+        elif optimize:
+            card_input = input_count
             input_count += 1
-            input_args.extend(["-i", str(row.path)])
-            visual_input = (
-                f"[{visual_input_index}:v:0]loop=loop=-1:size=1:start=0,"
-                f"trim=duration={duration_text},setpts=PTS-STARTPTS"
-            )
+            # A single card frame is converted once; overlay repeats it to the end of the clip.
+            input_args.extend(["-i", str(card)])
+            scaler = video_scaler(probe.video, width, height)
+            filters.extend([
+                f"[{media_input}:v:0]trim=duration={duration_text},setpts=PTS-STARTPTS,fps=fps={args.fps},"
+                f"{video_normalizer(width, height, scaler, 'yuv420p')}[base{entry_number}]",
+                f"[{card_input}:v:0]format=yuva420p[card{entry_number}]",
+                f"[base{entry_number}][card{entry_number}]"
+                f"overlay={card_position(card, offsets)}:format=yuv420:eof_action=repeat,"
+                f"{fades}[v{entry_number}]",
+            ])
         else:
-            visual_input = (
-                f"[{media_input}:v:0]trim=duration={duration_text},setpts=PTS-STARTPTS"
-            )
-
-        card_input = input_count
-        input_count += 1
-        input_args.extend([
-            "-loop", "1", "-framerate", str(args.fps), "-t", ffmpeg_tools.timestamp(duration), "-i", str(card),
-        ])
+            card_input = input_count
+            input_count += 1
+            input_args.extend([
+                "-loop", "1", "-framerate", str(args.fps), "-t", ffmpeg_tools.timestamp(duration), "-i", str(card),
+            ])
+            filters.extend([
+                f"[{media_input}:v:0]trim=duration={duration_text},setpts=PTS-STARTPTS,"
+                f"{video_normalizer(width, height)}[base{entry_number}]",
+                f"[{card_input}:v:0]trim=duration={duration_text},setpts=PTS-STARTPTS[card{entry_number}]",
+                f"[base{entry_number}][card{entry_number}]"
+                f"overlay={card_position(card, offsets)}:format=auto,"
+                f"fade=t=in:st=0:d={args.fade_duration:.6f},"
+                f"fade=t=out:st={fade_start}:d={args.fade_duration:.6f},"
+                f"fps=fps={args.fps},format=yuv420p[v{entry_number}]",
+            ])
 
+        measurement = loudness.measure_window(
+            media, row.path, loudness_dir(args), start, duration,
+        ) if args.audio_normalization == "two-pass" else None
         filters.extend([
-            f"{visual_input},{video_normalizer(width, height)}[base{entry_number}]",
-            f"[{card_input}:v:0]trim=duration={duration_text},setpts=PTS-STARTPTS[card{entry_number}]",
-            f"[base{entry_number}][card{entry_number}]"
-            f"overlay=(W-w)/2:(H-h)/2:format=auto,"
-            f"fade=t=in:st=0:d={args.fade_duration:.6f},"
-            f"fade=t=out:st={fade_start}:d={args.fade_duration:.6f},"
-            f"fps=fps={args.fps},format=yuv420p[v{entry_number}]",
             f"[{media_input}:a:0]atrim=duration={duration_text},asetpts=PTS-STARTPTS"
-            f"{media.loudnorm_filter(row.path, start, duration, args.audio_normalization)},"
+            f"{media.loudnorm_filter(row.path, start, duration, args.audio_normalization, measurement)},"
             f"afade=t=in:st=0:d={args.fade_duration:.6f},"
             f"afade=t=out:st={fade_start}:d={args.fade_duration:.6f}[a{entry_number}]",
         ])
-        concat_inputs.extend([f"[v{entry_number}]", f"[a{entry_number}]"])
+        concat_inputs.extend([f"[v{entry_number}]", f"[a{entry_number}]"] if video else [f"[a{entry_number}]"])
 
     filters.append(
-        "".join(concat_inputs) + f"concat=n={len(rows)}:v=1:a=1[vout][aout]"
+        "".join(concat_inputs)
+        + (f"concat=n={len(rows)}:v=1:a=1[vout][aout]" if video else f"concat=n={len(rows)}:v=0:a=1[aout]")
     )
     return input_args, ";\n".join(filters) + "\n", input_count
 
@@ -250,11 +463,15 @@ def make_chapter_data(rows: Iterable[Data], args: common.Args, out_path: Path, r
     out_path.write_text("".join(chapters), encoding="utf-8")
 
 
-def render(job: RenderJob, args: common.Args) -> tuple[str, Path]:
+def render(job: RenderJob, args: common.Args) -> tuple[str, list[Path]]:
+    if args.size is None:
+        raise RuntimeError("Output size must be resolved before rendering a recap")
     rows = list(reversed(job.rows)) if job.reverse else job.rows
     media = ffmpeg_tools.FFmpeg(args.ffmpeg, args.ffprobe, common.run)
-    input_args, graph, input_count = build_graph(rows, args, media)
-    job.graph.write_text(graph, encoding="utf-8")
+    input_args, graph, input_count = build_graph(rows, args, media, video=job.video)
+    # Every rendition shares one decode, normalization and concat.
+    split, _labels = ffmpeg_tools.rendition_filters([output.rendition for output in job.outputs], args.size)
+    job.graph.write_text(";\n".join([graph.rstrip("\n"), *split]) + "\n", encoding="utf-8")
     metadata_input = input_count
     year, show_code = split_key(job.key)
     show_name = common.show_name_map.get(show_code, "NF")
@@ -264,15 +481,17 @@ def render(job: RenderJob, args: common.Args) -> tuple[str, Path]:
         inputs=input_args,
         metadata=job.metadata,
         graph=job.graph,
-        output=job.output,
+        outputs=[(output.rendition, output.path) for output in job.outputs],
+        canvas=args.size,
         title=f"{year} {show_name} {direction} Recap",
         metadata_input=metadata_input,
         encoding=ffmpeg_tools.RecapEncoding(
-            args.av1_preset, args.av1_crf, args.av1_threads, args.opus_bitrate,
+            args.av1_preset, args.av1_crf, args.av1_threads, args.opus_bitrate, preview=args.preview,
         ),
     )
-    app_cache.store_recap_fingerprint(job.output, job.fingerprint)
-    return job.key, job.output
+    for output in job.outputs:
+        app_cache.store_recap_fingerprint(output.path, output.fingerprint)
+    return job.key, [output.path for output in job.outputs]
 
 
 def worker_count(args: common.Args, job_count: int) -> int:
@@ -283,7 +502,10 @@ def worker_count(args: common.Args, job_count: int) -> int:
     return common.automatic_worker_count(job_count)
 
 
-def main(all_clips: common.Clips, args: common.Args) -> dict[str, list[Path]]:
+def main(
+    all_clips: common.Clips, args: common.Args, content_digests: dict[Path, str] | None = None,
+) -> dict[str, list[Path]]:
+    """Render every stale recap; ``content_digests`` identifies sources by content, not by stat."""
     direct: dict[str, list[Data]] = defaultdict(list)
     reverse: dict[str, list[Data]] = defaultdict(list)
     source_count = 0
@@ -325,6 +547,7 @@ def main(all_clips: common.Clips, args: common.Args) -> dict[str, list[Path]]:
                 args.vidsdir / show / f"{ro}_{country}.cover"
                 f"{Path(urlparse(row.get('image_link', '')).path).suffix.lower() or '.jpg'}"
             ) if row.get("image_link", "") else None,
+            content_sha256=(content_digests or {}).get(path),
         )
         reverse[show].append(value)
         direct_start = parse_seconds(row.get("snippet2_start"))
@@ -344,17 +567,24 @@ def main(all_clips: common.Clips, args: common.Args) -> dict[str, list[Path]]:
 
     def add_jobs(data: dict[str, list[Data]], is_reverse: bool) -> None:
         suffix = "" if is_reverse else "s"
+        extension = ".preview.mp4" if args.preview else ".mov"
         for key, rows in data.items():
-            output = args.output / f"{key}{suffix}.mov"
-            fingerprint = output_fingerprint(rows, args, is_reverse)
-            if output.exists() and app_cache.cached_recap_fingerprint(output) == fingerprint:
-                print(f"[recap] {output} exists, skipping", file=common.OUT_HANDLE)
-                available.append((key, output))
+            output = args.output / f"{key}{suffix}{extension}"
+            stale: list[RecapOutput] = []
+            for rendition in (ffmpeg_tools.Rendition(), *args.renditions):
+                path = rendition_path(output, rendition)
+                fingerprint = output_fingerprint(rows, args, is_reverse, rendition)
+                if path.exists() and app_cache.cached_recap_fingerprint(path) == fingerprint:
+                    print(f"[recap] {path} exists, skipping", file=common.OUT_HANDLE)
+                    available.append((key, path))
+                else:
+                    stale.append(RecapOutput(rendition, path, fingerprint))
+            if not stale:
                 continue
             metadata = scratch / f"{output.stem}.meta.txt"
             graph = scratch / f"{output.stem}.ffscript"
             make_chapter_data(rows, args, metadata, is_reverse)
-            jobs.append(RenderJob(key, rows, metadata, graph, output, is_reverse, fingerprint))
+            jobs.append(RenderJob(key, rows, metadata, graph, stale, is_reverse))
 
     if not args.only_reverse:
         add_jobs(direct, is_reverse=False)
@@ -363,6 +593,8 @@ def main(all_clips: common.Clips, args: common.Args) -> dict[str, list[Path]]:
 
     print(f"[recap] Rendering {len(jobs)} recaps from {source_count} entries...", file=common.OUT_HANDLE)
     start = time.time()
+    prepare_stills((row for job in jobs if job.video for row in job.rows), args)
+    prepare_loudness((row for job in jobs for row in job.rows), args)
     if jobs:
         count = worker_count(args, len(jobs))
         if count > 1:
@@ -374,7 +606,9 @@ def main(all_clips: common.Clips, args: common.Args) -> dict[str, list[Path]]:
         rendered = []
 
     result: dict[str, list[Path]] = defaultdict(list)
-    for key, output in [*available, *rendered]:
+    for key, output in available:
         result[key].append(output)
+    for key, outputs in rendered:
+        result[key].extend(outputs)
     print(f"[recap] Rendered {len(rendered)} recaps in {time.time() - start:.2f} seconds", file=common.OUT_HANDLE)
     return result
@@ -0,0 +1,190 @@
+"""Suggest recap snippet ranges from the audio of cached sources."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+import json
+import tempfile
+
+import numpy as np
+
+import common
+import download
+import ffmpeg_tools
+import recap
+
+
+SAMPLE_RATE = 11025
+FRAME_SIZE = 2048
+HOP_SIZE = 1024
+BANDS = 24
+# Ranges match recap.main's defaults for missing snippet_end and snippet2_end.
+SNIPPET_LENGTH = 20
+SNIPPET2_LENGTH = 10
+# Similar moments closer than this are the same passage, not a repeat.
+MINIMUM_REPEAT_LAG = 8
+EDGE_MARGIN = 5
+
+
+@dataclass(frozen=True)
+class Suggestion:
+    snippet_start: int
+    snippet_end: int
+    snippet2_start: int
+    snippet2_end: int
+
+
+def format_seconds(seconds: int) -> str:
+    """Format whole seconds as M:SS, which ``recap.parse_seconds`` reads back."""
+    return f"{seconds // 60}:{seconds % 60:02d}"
+
+
+def decode(media: ffmpeg_tools.FFmpeg, source: Path) -> np.ndarray:
+    """Decode a source's first audio stream once to low-rate mono float samples."""
+    with tempfile.TemporaryDirectory(prefix="world-stage-snippets-") as directory:
+        pcm = Path(directory) / "audio.f32"
+        media.decode_audio(source, pcm, SAMPLE_RATE)
+        return np.fromfile(pcm, dtype="<f4")
+
+
+def _zscore(values: np.ndarray) -> np.ndarray:
+    deviation = values.std()
+    return (values - values.mean()) / deviation if deviation > 0 else np.zeros_like(values)
+
+
+def features(samples: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Return per-second energy, novelty and repetition curves of a mono signal."""
+    count = 1 + (len(samples) - FRAME_SIZE) // HOP_SIZE
+    if count < 2:
+        raise ValueError("Source audio is too short to analyse")
+    frames = np.lib.stride_tricks.sliding_window_view(samples, FRAME_SIZE)[::HOP_SIZE][:count]
+    spectrum = np.abs(np.fft.rfft(frames * np.hanning(FRAME_SIZE), axis=1)) ** 2
+    # Log-spaced bands from 60 Hz to Nyquist summarise timbre and harmony.
+    frequencies = np.fft.rfftfreq(FRAME_SIZE, 1 / SAMPLE_RATE)
+    edges = np.geomspace(60, SAMPLE_RATE / 2, BANDS + 1)
+    band = np.clip(np.searchsorted(edges, frequencies) - 1, 0, BANDS - 1)
+    bands = np.zeros((count, BANDS))
+    np.add.at(bands.T, band, spectrum.T)
+    log_bands = np.log10(bands + 1e-10)
+
+    energy = 10 * np.log10(spectrum.sum(axis=1) + 1e-10)
+    flux = np.concatenate([[0.0], np.maximum(np.diff(log_bands, axis=0), 0).sum(axis=1)])
+
+    # Pool frames into the decoded second their centre falls in; a hop is not a fraction of a second.
+    seconds = len(samples) // SAMPLE_RATE
+    if seconds < 1:
+        raise ValueError("Source audio is too short to analyse")
+    second = (np.arange(count) * HOP_SIZE + FRAME_SIZE // 2) // SAMPLE_RATE
+    second = second[second < seconds]
+    frames_per_second = np.bincount(second, minlength=seconds)
+
+    def pool(values: np.ndarray) -> np.ndarray:
+        pooled = np.zeros((seconds, *values.shape[1:]))
+        np.add.at(pooled, second, values[:len(second)])
+        return pooled / frames_per_second.reshape(-1, *[1] * (values.ndim - 1))
+
+    timbre = pool(log_bands)
+    timbre = timbre - timbre.mean(axis=1, keepdims=True)
+    timbre /= np.linalg.norm(timbre, axis=1, keepdims=True) + 1e-10
+    similarity = timbre @ timbre.T
+    lags = np.abs(np.subtract.outer(np.arange(seconds), np.arange(seconds)))
+    similarity[lags < MINIMUM_REPEAT_LAG] = -1
+    # A chorus resembles several other moments of the song, not just one.
+    top = np.sort(similarity, axis=1)[:, -3:]
+    repetition = np.where(top > -1, top, 0).mean(axis=1)
+    return pool(energy), pool(flux), repetition
+
+
+def best_window(score: np.ndarray, novelty: np.ndarray, length: int, first: int, last: int) -> int:
+    """Return the start second maximising mean score over ``length`` seconds plus a boundary bonus."""
+    if last < first:
+        return max(0, min(first, len(score) - length))
+    sums = np.concatenate([[0.0], np.cumsum(score)])
+    starts = np.arange(first, last + 1)
+    window = (sums[starts + length] - sums[starts]) / length
+    return int(starts[np.argmax(window + 0.5 * novelty[starts])])
+
+
+def suggest(samples: np.ndarray, first: tuple[float, float] | None = None) -> Suggestion:
+    """Propose the likely chorus for the reverse recap and its strongest part for the direct one.
+
+    A given ``first`` range is kept and only the direct snippet is searched inside it.
+    """
+    energy, novelty, repetition = features(samples)
+    seconds = len(energy)
+    score = _zscore(energy) + _zscore(repetition)
+    novelty = _zscore(novelty)
+    if first is None:
+        length = min(SNIPPET_LENGTH, seconds)
+        start = best_window(score, novelty, length, min(EDGE_MARGIN, seconds - length), seconds - length - EDGE_MARGIN)
+    else:
+        start = min(max(0, int(first[0])), seconds - 1)
+        length = max(1, min(int(first[1]), seconds) - start)
+    short = min(SNIPPET2_LENGTH, length)
+    start2 = best_window(score, novelty, short, start, start + length - short)
+    return Suggestion(start, start + length, start2, start2 + short)
+
+
+def source_path(row: dict[str, str], sources_dir: Path) -> Path:
+    ro = row["ro"].strip()
+    data = download.Data(
+        ro=f"{int(ro):02d}" if ro.isdigit() else ro, show=row["show"].strip(),
+        country=row["cc"].strip().upper(), media_link=row["media_link"].strip(),
+        media_type=row["type"], image_link=row.get("image_link", "").strip(),
+    )
+    return download.create_filename(data, sources_dir)
+
+
+def main(show: Path, sources_dir: Path, media: ffmpeg_tools.FFmpeg, overwrite: bool, dry_run: bool) -> int:
+    """Fill missing snippet ranges of a JSON show file and return how many entries changed."""
+    if show.suffix.lower() != ".json":
+        raise ValueError(f"Snippet suggestions are written to JSON show files, not {show}")
+    entries = json.loads(show.read_text(encoding="utf-8"))
+    rows = common.load_rows(show)
+    # Each range is filled as a whole, so a hand-picked start never gets a computed end.
+    ranges = (("snippet_start", "snippet_end"), ("snippet2_start", "snippet2_end"))
+    changed = 0
+    for entry, row in zip(entries, rows):
+        if row["type"] not in {"v", "a"}:
+            continue
+        missing = [
+            fields for fields in ranges
+            if overwrite or not any(row.get(field, "").strip() for field in fields)
+        ]
+        if not missing:
+            continue
+        source = source_path(row, sources_dir)
+        label = f"{row['show']} #{row['ro']} {row['cc'].upper()}"
+        if not source.exists():
+            print(f"[snippets] {label}: no downloaded source at {source}; run the recap download first",
+                  file=common.ERR_HANDLE)
+            continue
+        first = None
+        if ranges[0] not in missing:
+            # The same defaults recap.main applies to a partial first range.
+            start = recap.parse_seconds(row.get("snippet_start"))
+            start = 50.0 if start is None else start
+            end = recap.parse_seconds(row.get("snippet_end"))
+            first = (start, start + SNIPPET_LENGTH if end is None else end)
+        try:
+            suggestion = suggest(decode(media, source), first)
+        except ValueError as exc:
+            print(f"[snippets] {label}: {exc}", file=common.ERR_HANDLE)
+            continue
+        values = {
+            "snippet_start": format_seconds(suggestion.snippet_start),
+            "snippet_end": format_seconds(suggestion.snippet_end),
+            "snippet2_start": format_seconds(suggestion.snippet2_start),
+            "snippet2_end": format_seconds(suggestion.snippet2_end),
+        }
+        updates = {field: values[field] for fields in missing for field in fields}
+        print(
+            f"[snippets] {label}: " + ", ".join(f"{field}={value}" for field, value in updates.items()),
+            file=common.OUT_HANDLE,
+        )
+        entry.update(updates)
+        changed += 1
+    if changed and not dry_run:
+        show.write_text(json.dumps(entries, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    return changed
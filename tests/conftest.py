@@ -0,0 +1,94 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+import sys
+import threading
+from typing import cast
+
+import pytest
+
+# The modules live at the repository root rather than in a package.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import app_cache  # noqa: E402
+import common  # noqa: E402
+
+
+@pytest.fixture
+def cache_database(tmp_path, monkeypatch):
+    """Point the shared application cache at a fresh database."""
+    database = tmp_path / "cache.sqlite3"
+    monkeypatch.setattr(app_cache, "database_path", lambda: database)
+    app_cache.initialize_database()
+    return database
+
+
+@pytest.fixture
+def args(tmp_path):
+    """Recap arguments with every directory below ``tmp_path``."""
+    return common.Args(
+        csv=tmp_path / "show.csv", api_query=None, style="70s", tmpdir=tmp_path, browser=None,
+        youtube_attestation_mode="none", po_token=None, bgutil_url=None, size=None, default_height=1080,
+        fps=30, fade_duration=0.5, av1_preset=8, av1_crf=30, av1_threads=0, opus_bitrate="128k",
+        audio_normalization="none", jobs=1, output=tmp_path / "out", multiprocessing=False, cleanup=False,
+        ffmpeg="ffmpeg", ffprobe="ffprobe", inkscape="inkscape", card_renderer="resvg", resvg="resvg",
+        only_straight=False, only_reverse=False, vidsdir=tmp_path / "sources", cardsdir=tmp_path / "cards",
+        clipsdir=tmp_path / "clips", link_mode="symlink",
+    )
+
+
+class _FileHandler(BaseHTTPRequestHandler):
+    """Serve the test server's body, honouring ``Range`` and ``If-Range`` like a static file host."""
+
+    def do_GET(self):
+        server = cast(FileServer, self.server)
+        server.requests.append(dict(self.headers))
+        body, etag = server.body, server.headers.get("ETag")
+        requested = self.headers.get("Range")
+        if_range = self.headers.get("If-Range")
+        if requested and (if_range is None or if_range == etag):
+            start = int(requested.removeprefix("bytes=").rstrip("-"))
+            if start >= len(body):
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(body)}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{len(body) - 1}/{len(body)}")
+            body = body[start:]
+        else:
+            self.send_response(200)
+            for name, value in server.headers.items():
+                self.send_header(name, value)
+        if etag is not None:
+            self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FileServer(ThreadingHTTPServer):
+    """A local HTTP server for one file; tests set ``body`` and full-response ``headers``."""
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _FileHandler)
+        self.body = b""
+        self.headers: dict[str, str] = {}
+        self.requests: list[dict[str, str]] = []
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/file.mov"
+
+
+@pytest.fixture
+def file_server():
+    server = FileServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,32 @@
+import app_cache
+
+ENDPOINT = "https://s3.example.test"
+BUCKET = "recaps"
+
+
+def test_reconcile_uploads_keeps_matching_records_and_forgets_missing(cache_database, tmp_path):
+    kept, changed, gone = (tmp_path / name for name in ("kept.mov", "changed.mov", "gone.mov"))
+    for path in (kept, changed, gone):
+        path.write_bytes(b"data")
+        app_cache.store_upload(path, ENDPOINT, BUCKET, etag="e1")
+
+    listed, removed = app_cache.reconcile_uploads(ENDPOINT, BUCKET, "", [
+        ("kept.mov", 4, "e1"), ("changed.mov", 4, "e2"), ("remote.mov", 9, "e3"),
+    ])
+
+    assert (listed, removed) == (3, 1)
+    assert app_cache.is_cached_upload(kept, ENDPOINT, BUCKET)
+    assert not app_cache.is_cached_upload(changed, ENDPOINT, BUCKET)
+    assert app_cache.remote_upload_record(ENDPOINT, BUCKET, "changed.mov") == (4, "e2")
+    assert app_cache.remote_upload_record(ENDPOINT, BUCKET, "remote.mov") == (9, "e3")
+    assert not app_cache.is_cached_upload(gone, ENDPOINT, BUCKET)
+
+
+def test_reconcile_uploads_only_forgets_records_below_the_prefix(cache_database, tmp_path):
+    for name in ("sf1/a.mov", "f/b.mov"):
+        path = tmp_path / name.replace("/", "_")
+        path.write_bytes(b"data")
+        app_cache.store_upload(path, ENDPOINT, BUCKET, name)
+
+    assert app_cache.reconcile_uploads(ENDPOINT, BUCKET, "sf1/", []) == (0, 1)
+    assert app_cache.is_cached_upload(tmp_path / "f_b.mov", ENDPOINT, BUCKET, "f/b.mov")
@@ -0,0 +1,157 @@
+import os
+from typing import Any, cast
+
+import pytest
+
+import batch
+import batch_journal
+
+TOPIC = {"thumbnail_url": "https://img.example/t.jpg", "thumbnail_suffix": ".jpg"}
+
+
+@pytest.fixture
+def journal(tmp_path):
+    database = batch_journal.journal_path(tmp_path)
+    batch_journal.initialize_journal(database)
+    return database
+
+
+def _artifact(tmp_path, name, data=b"data"):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return path
+
+
+def _entry(journal, name="ws2024se"):
+    return batch_journal.read_entries(journal)[name]
+
+
+def test_steps_advance_in_order_and_keep_artifacts(journal, tmp_path):
+    raw = _artifact(tmp_path, "ws2024se.download.mov")
+    media = _artifact(tmp_path, "ws2024se.mov")
+    batch_journal.record_inspection(journal, "ws2024se", "https://v.example/1", None)
+    assert _entry(journal).state == "inspected"
+
+    batch_journal.advance(journal, "ws2024se", "downloaded", raw=raw)
+    batch_journal.advance(journal, "ws2024se", "transcoded", "av1/opus", media=media, cover=None)
+    entry = _entry(journal)
+
+    assert (entry.state, entry.detail, entry.topic) == ("transcoded", "av1/opus", None)
+    assert entry.reached("downloaded") and entry.reached("transcoded") and not entry.reached("uploaded")
+    assert entry.artifact("raw") == raw.resolve()
+    assert entry.artifact("media") == media.resolve()
+    assert entry.artifact("cover") is None
+
+    batch_journal.advance(journal, "ws2024se", "uploaded")
+    assert _entry(journal).detail == "av1/opus"
+
+
+def test_unknown_state_is_rejected(journal):
+    with pytest.raises(ValueError, match="Unknown batch journal state"):
+        batch_journal.advance(journal, "ws2024se", "published")
+
+
+@pytest.mark.parametrize("change", ["size", "mtime", "delete"])
+def test_stale_artifacts_are_not_trusted(journal, tmp_path, change):
+    raw = _artifact(tmp_path, "ws2024se.download.mov")
+    batch_journal.record_inspection(journal, "ws2024se", "https://v.example/1", None)
+    batch_journal.advance(journal, "ws2024se", "downloaded", raw=raw)
+    stat = raw.stat()
+    if change == "size":
+        raw.write_bytes(b"truncated data")
+        os.utime(raw, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    elif change == "mtime":
+        os.utime(raw, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    else:
+        raw.unlink()
+
+    assert _entry(journal).artifact("raw") is None
+
+
+def test_record_inspection_starts_over(journal, tmp_path):
+    raw = _artifact(tmp_path, "ws2024se.download.m4a")
+    batch_journal.record_inspection(journal, "ws2024se", "https://v.example/1", None)
+    batch_journal.advance(journal, "ws2024se", "downloaded", "old", raw=raw)
+
+    batch_journal.record_inspection(journal, "ws2024se", "https://v.example/2", TOPIC)
+    entry = _entry(journal)
+
+    assert (entry.state, entry.media_link, entry.topic, entry.detail) == (
+        "inspected", "https://v.example/2", TOPIC, "",
+    )
+    assert entry.artifacts == {}
+
+
+def test_forget_removes_a_video(journal, tmp_path):
+    for name in ("ws2024se", "ws2024no"):
+        batch_journal.record_inspection(journal, name, "https://v.example/1", None)
+        batch_journal.advance(journal, name, "downloaded", raw=_artifact(tmp_path, f"{name}.mov"))
+
+    batch_journal.forget(journal, "ws2024se")
+
+    assert list(batch_journal.read_entries(journal)) == ["ws2024no"]
+    assert _entry(journal, "ws2024no").artifact("raw") is not None
+
+
+def _task(journal, tmp_path):
+    video = batch.BatchVideo("2024", "se", "Sweden", "someone", "Artist", "Title", "swe", "https://v.example/1")
+    return batch.BatchTask(
+        video=video, destination=tmp_path / "ws2024se.mov", raw_directory=tmp_path,
+        downloader_settings=cast(Any, None), ffprobe="ffprobe", encoding=cast(Any, None),
+        target_height=1080, overwrite=False, journal=journal, resume=_entry(journal),
+    )
+
+
+def test_resume_from_downloaded_reuses_the_raw_source(journal, tmp_path):
+    raw = _artifact(tmp_path, "ws2024se.download.mov")
+    batch_journal.record_inspection(journal, "ws2024se", "https://v.example/1", None)
+    batch_journal.advance(journal, "ws2024se", "downloaded", raw=raw)
+
+    resumed = batch._resume_task(_task(journal, tmp_path))
+
+    assert isinstance(resumed, batch.DownloadedMedia)
+    assert (resumed.destination, resumed.raw_path, resumed.cover) == (
+        tmp_path / "ws2024se.mov", raw.resolve(), None,
+    )
+
+
+def test_resume_from_transcoded_finishes_without_work(journal, tmp_path):
+    media = _artifact(tmp_path, "ws2024se.mov")
+    batch_journal.record_inspection(journal, "ws2024se", "https://v.example/1", None)
+    batch_journal.advance(journal, "ws2024se", "transcoded", "av1/opus", media=media)
+    batch_journal.advance(journal, "ws2024se", "metadata")
+
+    resumed = batch._resume_task(_task(journal, tmp_path))
+
+    assert isinstance(resumed, batch.BatchResult)
+    assert (resumed.destination, resumed.status, resumed.detail) == (media.resolve(), "complete", "av1/opus")
+    assert resumed.resumed is not None and resumed.resumed.state == "metadata"
+
+
+def test_resume_starts_over_without_a_valid_artifact(journal, tmp_path):
+    batch_journal.record_inspection(journal, "ws2024se", "https://v.example/1", None)
+    assert batch._resume_task(_task(journal, tmp_path)) is None
+
+    raw = _artifact(tmp_path, "ws2024se.download.mov")
+    batch_journal.advance(journal, "ws2024se", "downloaded", raw=raw)
+    raw.unlink()
+    assert batch._resume_task(_task(journal, tmp_path)) is None
+
+    media = _artifact(tmp_path, "ws2024se.mov")
+    batch_journal.advance(journal, "ws2024se", "transcoded", media=media)
+    media.write_bytes(b"partial write")
+    assert batch._resume_task(_task(journal, tmp_path)) is None
+
+
+def test_topic_audio_resumes_only_with_its_cover(journal, tmp_path):
+    raw = _artifact(tmp_path, "ws2024se.download.m4a")
+    cover = _artifact(tmp_path, "ws2024se.jpg")
+    batch_journal.record_inspection(journal, "ws2024se", "https://v.example/1", TOPIC)
+    batch_journal.advance(journal, "ws2024se", "downloaded", raw=raw, cover=cover)
+
+    resumed = batch._resume_task(_task(journal, tmp_path))
+    assert isinstance(resumed, batch.DownloadedMedia)
+    assert (resumed.destination, resumed.cover) == (tmp_path / "ws2024se.m4a", cover.resolve())
+
+    cover.unlink()
+    assert batch._resume_task(_task(journal, tmp_path)) is None
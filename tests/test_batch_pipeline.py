@@ -0,0 +1,125 @@
+from pathlib import Path
+import threading
+import time
+from typing import Any, cast
+
+import pytest
+
+import batch
+
+TASKS = list(range(20))
+
+
+def _fetched(number: int) -> batch.DownloadedMedia:
+    path = Path(f"{number}.mkv")
+    return batch.DownloadedMedia(cast(Any, number), path, path, None)
+
+
+def _wait_for(condition, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "the pipeline made no progress"
+        time.sleep(0.01)
+
+
+def _run(publish, failures: list[BaseException], **jobs) -> threading.Thread:
+    def target() -> None:
+        try:
+            batch.run_pipeline(cast(Any, TASKS), publish, **jobs)
+        except BaseException as exc:
+            failures.append(exc)
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    return thread
+
+
+def _stage_threads() -> list[threading.Thread]:
+    return [thread for thread in threading.enumerate() if thread.name.startswith("batch-")]
+
+
+@pytest.fixture
+def stages(monkeypatch):
+    """Replace the download and transcode stages with ones recording the tasks they saw."""
+    downloaded: list[int] = []
+    transcoded: list[int] = []
+    transcode_gate = threading.Event()
+    transcode_gate.set()
+
+    def download_task(task):
+        downloaded.append(task)
+        return _fetched(task)
+
+    def transcode_task(item):
+        transcode_gate.wait()
+        transcoded.append(item.task)
+        return item.task
+
+    monkeypatch.setattr(batch, "download_task", download_task)
+    monkeypatch.setattr(batch, "transcode_task", transcode_task)
+    return downloaded, transcoded, transcode_gate
+
+
+def test_pipeline_runs_every_task_through_every_stage(stages):
+    downloaded, transcoded, _gate = stages
+    published: list[Any] = []
+
+    batch.run_pipeline(cast(Any, TASKS), published.append, download_jobs=3, transcode_jobs=2, publish_jobs=2)
+
+    assert sorted(downloaded) == sorted(transcoded) == sorted(published) == TASKS
+    assert not _stage_threads()
+
+
+def test_slow_publishing_holds_back_encodes_and_downloads(stages):
+    downloaded, transcoded, _gate = stages
+    release = threading.Event()
+    published: list[Any] = []
+    failures: list[BaseException] = []
+
+    def publish(result):
+        release.wait()
+        published.append(result)
+
+    pipeline = _run(publish, failures, download_jobs=1, transcode_jobs=1, publish_jobs=1)
+    # One result publishing and one queued, one encode waiting to queue its
+    # result and one source queued, one download waiting to queue its source.
+    _wait_for(lambda: len(downloaded) == 5)
+    time.sleep(0.2)
+    assert (len(downloaded), len(transcoded), published) == (5, 3, [])
+
+    release.set()
+    pipeline.join(5)
+    assert not pipeline.is_alive() and not failures
+    assert sorted(published) == TASKS
+    assert not _stage_threads()
+
+
+def test_encoding_failure_drains_blocked_stages_and_is_raised(stages, monkeypatch):
+    downloaded, _transcoded, gate = stages
+    gate.clear()
+    published: list[Any] = []
+    failures: list[BaseException] = []
+    transcode_task = batch.transcode_task
+
+    def failing_transcode(item):
+        transcode_task(item)
+        raise RuntimeError(f"encode of {item.task} failed")
+
+    monkeypatch.setattr(batch, "transcode_task", failing_transcode)
+    pipeline = _run(published.append, failures, download_jobs=2, transcode_jobs=1, publish_jobs=1)
+    # The first source is encoding, one is queued and both downloaders wait on the full queue.
+    _wait_for(lambda: len(downloaded) == 4)
+    time.sleep(0.2)
+    assert len(downloaded) == 4
+
+    gate.set()
+    pipeline.join(5)
+    assert not pipeline.is_alive()
+    assert len(failures) == 1 and isinstance(failures[0], RuntimeError)
+    assert len(downloaded) == 4 and published == []
+    assert not _stage_threads()
+
+
+def test_pipeline_needs_a_worker_in_every_stage():
+    with pytest.raises(ValueError):
+        batch.run_pipeline([], print, download_jobs=1, transcode_jobs=0, publish_jobs=1)
@@ -0,0 +1,91 @@
+from dataclasses import replace
+from typing import Any, cast
+
+import pytest
+
+import batch
+import download
+import download_scheduler
+import ffmpeg_tools
+
+URL = "https://media.example.test/ws2024se.mp4"
+CODECS = ffmpeg_tools.StreamCodecs("h264", "aac")
+
+
+class FakeMedia:
+    """Fail every network read FFmpeg would make and tag downloaded sources by renaming them."""
+
+    def __init__(self, scheduler):
+        self.scheduler = scheduler
+        self.slots: list[int] = []
+
+    def _read(self):
+        self.slots.append(self.scheduler._active["media.example.test"])
+
+    def remote_source(self, remote):
+        self._read()
+        raise RuntimeError("probe failed")
+
+    def make_av1_opus_stream(self, source, output, tags, encoding, maximum_height=None):
+        self._read()
+        output.write_bytes(b"half an encode")
+        raise RuntimeError("connection reset")
+
+    def move_if_tagged(self, source, output, tags, maximum_height=None):
+        source.replace(output)
+        return CODECS
+
+
+@pytest.fixture
+def streaming(tmp_path, monkeypatch):
+    scheduler = download_scheduler.DownloadScheduler({}, default_limit=1)
+    media = FakeMedia(scheduler)
+    fetched: list[int] = []
+
+    def fetch_external(url, media_type, destination, settings):
+        fetched.append(scheduler._active["media.example.test"])
+        destination.write_bytes(b"downloaded source")
+        return download.FetchedMedia()
+
+    monkeypatch.setattr(batch, "_worker_media", lambda task: media)
+    monkeypatch.setattr(download, "fetch_external", fetch_external)
+    video = batch.BatchVideo("2024", "se", "Sweden", "someone", "Artist", "Title", "swe", URL)
+    task = batch.BatchTask(
+        video=video, destination=tmp_path / "ws2024se.mov", raw_directory=tmp_path,
+        downloader_settings=download.DownloadSettings(None, "ffmpeg"), ffprobe="ffprobe",
+        encoding=cast(Any, None), target_height=1080, overwrite=False, stream=True, scheduler=scheduler,
+    )
+    return task, media, fetched
+
+
+def test_probe_failure_downloads_the_source_first(streaming):
+    task, media, fetched = streaming
+
+    item = batch.download_task(task)
+
+    assert isinstance(item, batch.DownloadedMedia) and item.remote is None
+    assert item.raw_path.read_bytes() == b"downloaded source"
+    assert media.slots == [1] and fetched == [1]
+
+
+def test_stream_failure_removes_the_output_and_downloads_first(streaming):
+    task, media, fetched = streaming
+    remote = ffmpeg_tools.RemoteSource((ffmpeg_tools.RemoteInput(URL),), CODECS, 1080)
+    raw_path = task.raw_directory / "ws2024se.download.mov"
+    item = batch.DownloadedMedia(task, task.destination, raw_path, None, remote)
+
+    result = batch.transcode_task(item)
+
+    assert (result.status, result.detail) == ("complete", "h264/aac, tagged during merge")
+    assert task.destination.read_bytes() == b"downloaded source"
+    assert not raw_path.exists()
+    assert media.slots == [1] and fetched == [1]
+    assert task.scheduler is not None and task.scheduler._active["media.example.test"] == 0
+
+
+def test_sources_do_not_stream_under_a_bandwidth_limit(streaming):
+    task, media, _ = streaming
+    limited = download.DownloadSettings(None, "ffmpeg", bandwidth=download_scheduler.TokenBucket(1000))
+
+    assert batch._stream_source(replace(task, downloader_settings=limited)) is None
+    assert media.slots == []
@@ -0,0 +1,47 @@
+import pytest
+
+import cards
+import recap
+
+
+def _old_card_band(img_width: int, img_height: int) -> tuple[float, float, float, float]:
+    """Return left, top, width and height of the bottom quarter of the old centred 92.5% card.
+
+    The old PNG was the whole 92.5% box; its SVG viewBox kept the artwork's
+    aspect, so the artwork sat centred inside the box.
+    """
+    box_width, box_height = img_width * 0.925, img_height * 0.925
+    scale = min(box_width / cards.width, box_height / cards.height)
+    artwork_left = (img_width - box_width) / 2 + (box_width - cards.width * scale) / 2
+    artwork_top = (img_height - box_height) / 2 + (box_height - cards.height * scale) / 2
+    band_height = cards.height // 4
+    return (
+        artwork_left, artwork_top + (cards.height - band_height) * scale,
+        cards.width * scale, band_height * scale,
+    )
+
+
+@pytest.mark.parametrize("canvas", [(1920, 1080), (1980, 1080), (1280, 720), (1080, 1920), (1440, 1080), (3840, 1600)])
+def test_cropped_card_covers_the_old_card_band(canvas):
+    (width, height), (left, top) = cards.card_geometry(*canvas)
+    old_left, old_top, old_width, old_height = _old_card_band(*canvas)
+
+    assert left == pytest.approx(old_left, abs=1)
+    assert top == pytest.approx(old_top, abs=1)
+    assert width == pytest.approx(old_width, abs=1)
+    assert height == pytest.approx(old_height, abs=1)
+    assert 0 <= left and left + width <= canvas[0]
+    assert 0 <= top and top + height <= canvas[1]
+
+
+def test_card_position_uses_the_recorded_offset(tmp_path):
+    database = cards.cache_database_path(tmp_path)
+    cards.initialize_cache(database)
+    cropped, legacy = tmp_path / "01_SE.png", tmp_path / "02_NO.png"
+    _size, offset = cards.card_geometry(1920, 1080)
+    cards.store_fingerprint(database, cropped, "fingerprint", offset)
+
+    offsets = cards.card_offsets(tmp_path)
+
+    assert recap.card_position(cropped, offsets) == f"{offset[0]}:{offset[1]}"
+    assert recap.card_position(legacy, offsets) == "(W-w)/2:(H-h)/2"
@@ -0,0 +1,300 @@
+import asyncio
+import base64
+import hashlib
+import os
+import time
+from typing import Any, cast
+
+import aiohttp
+import pytest
+
+import download
+import download_scheduler
+
+SETTINGS = download.DownloadSettings(None, "ffmpeg")
+
+
+@pytest.mark.parametrize(("parts", "expected"), [
+    ([{"filesize": 100}, {"filesize_approx": 20.5}], 120),
+    ([{"filesize": 100}, {"filesize": None}], None),
+    ([{}], None),
+])
+def test_inspection_size_needs_every_part(monkeypatch, parts, expected):
+    monkeypatch.setattr(download, "youtube_info", lambda *args, **kwargs: {"channel": "Artist"})
+    monkeypatch.setattr(download, "_selected_format", lambda *args: {"format_id": "1", "requested_formats": parts})
+    inspection = download._inspect_youtube(cast(Any, None), "https://youtu.be/aaaaaaaaaaa", SETTINGS)
+    assert inspection.filesize == expected
+
+
+def _cached_source(sources_dir, key, data, last_used):
+    database = download.cache_database_path(sources_dir)
+    path = download.object_path(sources_dir, key, ".mov")
+    path.write_bytes(data)
+    download.write_cache_record(database, key, "https://example.test/" + key, None, path)
+    download.record_cache_access(database, key, hit=True)
+    with download.sqlite3.connect(database) as conn:
+        conn.execute("UPDATE source_cache SET accessed_at = ? WHERE cache_key = ?", (last_used, key))
+    return path
+
+
+def test_garbage_collection_does_not_count_hard_linked_objects_as_freed(cache_database, tmp_path):
+    sources_dir = tmp_path / "sources"
+    sources_dir.mkdir()
+    download.initialize_cache(download.cache_database_path(sources_dir))
+    linked = _cached_source(sources_dir, "linked", b"a" * 100, 1)
+    _cached_source(sources_dir, "single", b"b" * 10, 2)
+    download.link_source(sources_dir, linked, sources_dir / "sf1" / "01_SE.mov", "hardlink")
+
+    stats = download.source_cache_stats(sources_dir, budget=1)
+    assert (stats.evictable_bytes, stats.shared_bytes) == (10, 100)
+
+    assert download.collect_garbage(sources_dir, budget=1) == 10
+    assert not linked.exists()
+    assert (sources_dir / "sf1" / "01_SE.mov").read_bytes() == b"a" * 100
+
+
+def test_direct_sources_are_linked_from_the_fetched_objects(cache_database, args, tmp_path, monkeypatch):
+    args.vidsdir.mkdir()
+    download.initialize_cache(download.cache_database_path(args.vidsdir))
+    url = f"https://{download.WORLD_STAGE_HOST}/song.m4a"
+    rows = [
+        download.Data("01", show, "SE", url, "a", f"https://{download.WORLD_STAGE_HOST}/cover.png")
+        for show in ("sf1", "f")
+    ]
+    media, cover = args.vidsdir / "media.m4a", args.vidsdir / "cover.png"
+    media.write_bytes(b"audio")
+    cover.write_bytes(b"image")
+
+    def fetch_direct_sources(sources, *_):
+        return {source: media if source[2] == "media" else cover for source in sources}
+
+    def fetch_cached(*_args, **_kwargs):
+        raise AssertionError("direct sources must not be looked up twice")
+
+    monkeypatch.setattr(download, "fetch_direct_sources", fetch_direct_sources)
+    monkeypatch.setattr(download, "fetch_cached", fetch_cached)
+    clips = download._download_sources({(url, "a"): rows}, [], args)
+
+    assert sorted((show, path.read_bytes()) for show, _, _, path in clips) == [("f", b"audio"), ("sf1", b"audio")]
+    assert (args.vidsdir / "sf1" / "01_SE.cover.png").read_bytes() == b"image"
+
+
+def test_async_transfers_wait_out_a_throttled_host(args, monkeypatch):
+    scheduler = download_scheduler.DownloadScheduler({}, default_limit=2)
+    url = "https://throttled.test/"
+    paused_until = time.monotonic() + 0.2
+    scheduler._paused_until["throttled.test"] = paused_until
+    started: list[float] = []
+
+    async def fetch_cached_direct(session, url, *_):
+        started.append(time.monotonic())
+        return args.vidsdir / url.rsplit("/", 1)[-1]
+
+    monkeypatch.setattr(download, "_fetch_cached_direct", fetch_cached_direct)
+    sources = [(f"{url}{index}.mov", ".mov", "media", "v") for index in range(2)]
+    objects = asyncio.run(download._fetch_direct_sources(sources, args, scheduler))
+
+    assert sorted(path.name for path in objects.values()) == ["0.mov", "1.mov"]
+    assert len(started) == 2 and min(started) >= paused_until
+
+
+def test_async_download_writes_and_hashes_every_block(cache_database, file_server, tmp_path):
+    file_server.body = bytes(range(256)) * 8192
+    destination = tmp_path / "file.download.mov"
+
+    async def fetch():
+        async with aiohttp.ClientSession() as session:
+            return await download._download_direct_async(session, file_server.url, destination, None)
+
+    digest = asyncio.run(fetch())
+
+    assert destination.read_bytes() == file_server.body
+    assert digest == download.ContentDigest(hashlib.sha256(file_server.body).hexdigest(), len(file_server.body))
+
+
+class FakeYoutubeDL:
+    def __init__(self, options):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+@pytest.fixture
+def extractions(cache_database, monkeypatch):
+    """Count yt-dlp extractions and freeze the clock shared by the memo and the cache."""
+    urls: list[str] = []
+    clock = [1_000_000.0]
+
+    def extract(downloader, url):
+        urls.append(url)
+        return {"id": url[-11:], "extraction": len(urls)}
+
+    monkeypatch.setattr(download, "YoutubeDL", FakeYoutubeDL)
+    monkeypatch.setattr(download, "_extract_youtube_info", extract)
+    monkeypatch.setattr(download, "_youtube_info_memo", {})
+    monkeypatch.setattr(time, "time", lambda: clock[0])
+    return urls, clock
+
+
+def test_youtube_info_is_keyed_by_video_id_and_attestation_mode(extractions):
+    urls, _clock = extractions
+    bgutil = download.DownloadSettings(None, "ffmpeg", youtube_attestation_mode="bgutil", bgutil_url="http://127.0.0.1:4416")
+
+    first = download.youtube_info("https://www.youtube.com/watch?v=aaaaaaaaaaa", SETTINGS)
+    first["extraction"] = "changed by the caller"
+
+    assert download.youtube_info("https://youtu.be/aaaaaaaaaaa", SETTINGS)["extraction"] == 1
+    assert download.youtube_info("https://youtu.be/aaaaaaaaaaa", bgutil)["extraction"] == 2
+    assert download.youtube_info("https://youtu.be/bbbbbbbbbbb", SETTINGS)["extraction"] == 3
+    assert len(urls) == 3
+
+
+def test_youtube_info_expires_after_its_ttl(extractions, monkeypatch):
+    urls, clock = extractions
+    url = "https://youtu.be/aaaaaaaaaaa"
+    download.youtube_info(url, SETTINGS)
+
+    # A new process only has the shared cache.
+    monkeypatch.setattr(download, "_youtube_info_memo", {})
+    clock[0] += download.YOUTUBE_INFO_TTL - 10
+    assert download.youtube_info(url, SETTINGS)["extraction"] == 1
+
+    clock[0] += 20
+    assert download.youtube_info(url, SETTINGS)["extraction"] == 2
+    assert download.youtube_info(url, SETTINGS, refresh=True)["extraction"] == 3
+    assert len(urls) == 3
+
+
+def test_auth_failures_share_one_cookie_export_per_interval(tmp_path, monkeypatch):
+    exports: list[str] = []
+    clock = [1_000_000.0]
+
+    def export_browser_cookies(browser, destination):
+        exports.append(browser)
+        download._cookie_refreshed_at[destination] = clock[0]
+
+    monkeypatch.setattr(download, "export_browser_cookies", export_browser_cookies)
+    monkeypatch.setattr(download, "_cookie_refreshed_at", {})
+    monkeypatch.setattr(time, "time", lambda: clock[0])
+    settings = download.DownloadSettings("firefox", "ffmpeg", cookie_file=tmp_path / "cookies.txt")
+    auth_error = RuntimeError("Sign in to confirm you're not a bot")
+
+    assert not download.refresh_cookies_after(RuntimeError("Video unavailable"), settings)
+    assert not download.refresh_cookies_after(auth_error, download.DownloadSettings("firefox", "ffmpeg"))
+    assert exports == []
+
+    assert download.refresh_cookies_after(auth_error, settings)
+    clock[0] += download.COOKIE_REFRESH_INTERVAL
+    assert download.refresh_cookies_after(auth_error, settings)
+    assert exports == ["firefox"]
+
+    clock[0] += 1
+    assert download.refresh_cookies_after(auth_error, settings)
+    assert exports == ["firefox", "firefox"]
+
+
+@pytest.mark.parametrize(("info", "expected"), [
+    ({"vcodec": "vp9", "width": 1920, "height": 1080}, (16 / 9, 1080)),
+    ({"vcodec": "avc1", "width": 1440, "height": 1080, "stretched_ratio": 4 / 3}, (16 / 9, 1080)),
+    ({"vcodec": "none", "width": 1920, "height": 1080}, None),
+    ({"vcodec": "vp9", "width": None, "height": 1080}, None),
+    (None, None),
+])
+def test_display_properties_of_a_merged_format(info, expected):
+    properties = download._display_properties(info)
+    if expected is None:
+        assert properties is None
+    else:
+        assert properties == (pytest.approx(expected[0]), expected[1])
+
+
+def test_format_selection_is_capped_at_the_canvas_height():
+    capped = download.DownloadSettings(None, "ffmpeg", maximum_video_height=720)
+
+    assert download.youtube_video_format_selector(capped).startswith("bv*[height<=720]+ba/b[height<=720]/")
+    assert download.youtube_video_format_selector(SETTINGS) == "bv*+ba/b"
+
+
+def test_display_properties_are_read_for_objects_and_aliases_in_one_query(cache_database, tmp_path):
+    sources_dir = tmp_path / "sources"
+    sources_dir.mkdir()
+    download.initialize_cache(download.cache_database_path(sources_dir))
+    wide = _cached_source(sources_dir, "wide", b"a", 1)
+    narrow = _cached_source(sources_dir, "narrow", b"b", 2)
+    unprobed = _cached_source(sources_dir, "unprobed", b"c", 3)
+    alias = sources_dir / "sf1" / "01_SE.mov"
+    download.link_source(sources_dir, wide, alias, "hardlink")
+    download.store_display_properties(sources_dir, wide, 16 / 9, 1080)
+    download.store_display_properties(sources_dir, narrow, 4 / 3, 480)
+
+    properties = download.cached_display_properties_many(
+        sources_dir, [alias, narrow, unprobed, sources_dir / "missing.mov", alias],
+    )
+
+    assert properties == {alias: (16 / 9, 1080), narrow: (4 / 3, 480)}
+    assert properties[alias] == download.cached_display_properties(sources_dir, alias)
+
+
+def _b64(algorithm: str, data: bytes) -> str:
+    return base64.b64encode(hashlib.new(algorithm, data).digest()).decode()
+
+
+BODY = b"world stage source" * 100
+SHA256, MD5 = hashlib.sha256(BODY).hexdigest(), hashlib.md5(BODY).hexdigest()
+
+
+@pytest.mark.parametrize(("headers", "resumed", "expected"), [
+    ({"Repr-Digest": f"sha-256=:{_b64('sha256', BODY)}:"}, False, {"sha256": SHA256}),
+    ({"Digest": f"SHA-256={_b64('sha256', BODY)},MD5={_b64('md5', BODY)}"}, True, {"sha256": SHA256, "md5": MD5}),
+    ({"x-goog-hash": f"crc32c=n03x6A==,md5={_b64('md5', BODY)}"}, True, {"md5": MD5}),
+    ({"Content-MD5": _b64("md5", BODY)}, False, {"md5": MD5}),
+    ({"Content-MD5": _b64("md5", BODY)}, True, {}),
+    ({"Digest": f"sha-256={_b64('sha256', BODY)}", "Content-Encoding": "gzip"}, False, {}),
+    ({"Digest": f"sha-256={_b64('md5', BODY)}, md5=not base64!"}, False, {}),
+])
+def test_published_checksums(headers, resumed, expected):
+    assert download._published_checksums(headers, resumed) == expected
+
+
+def test_download_with_a_mismatched_checksum_is_rejected_and_removed(cache_database, file_server, tmp_path):
+    file_server.body = BODY
+    file_server.headers = {"Digest": f"sha-256={_b64('sha256', b'other content')}"}
+    destination = tmp_path / "file.download.mov"
+
+    with pytest.raises(RuntimeError, match="sha256 checksum"):
+        download.download_direct(file_server.url, destination)
+    assert not destination.exists()
+
+    file_server.headers = {"Digest": f"sha-256={_b64('sha256', BODY)}"}
+    assert download.download_direct(file_server.url, destination) == download.ContentDigest(SHA256, len(BODY))
+
+
+def test_content_digests_skip_changed_files_and_aliases(cache_database, tmp_path):
+    sources_dir = tmp_path / "sources"
+    sources_dir.mkdir()
+    database = download.cache_database_path(sources_dir)
+    download.initialize_cache(database)
+    objects = {}
+    for key in ("linked", "replaced", "grown", "unhashed"):
+        objects[key] = download.object_path(sources_dir, key, ".mov")
+        objects[key].write_bytes(BODY)
+        content = None if key == "unhashed" else download.ContentDigest(SHA256, len(BODY))
+        download.write_cache_record(database, key, f"https://example.test/{key}", None, objects[key], content)
+    linked, replaced = sources_dir / "sf1" / "01_SE.mov", sources_dir / "sf1" / "02_NO.mov"
+    download.link_source(sources_dir, objects["linked"], linked, "hardlink")
+    download.link_source(sources_dir, objects["replaced"], replaced, "symlink")
+    replaced.unlink()
+    replaced.write_bytes(b"edited by hand")
+    os.utime(replaced, ns=(1, 1))
+    with objects["grown"].open("ab") as grown:
+        grown.write(b"more")
+
+    digests = download.content_digests(
+        sources_dir, [linked, replaced, *objects.values(), sources_dir / "missing.mov"],
+    )
+
+    assert digests == {linked: SHA256, objects["linked"]: SHA256, objects["replaced"]: SHA256}
@@ -0,0 +1,190 @@
+from datetime import datetime, timezone
+from email.utils import format_datetime
+import threading
+import time
+from typing import Any, cast
+from urllib.error import HTTPError
+
+import pytest
+
+import download_scheduler
+from download_scheduler import DownloadScheduler, RetryPolicy, TokenBucket
+
+
+class FakeClock:
+    """Stand in for the ``time`` module: sleeping only advances the clock."""
+
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+        self.slept: list[float] = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def time(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(download_scheduler, "time", fake)
+    return fake
+
+
+def _throttled(retry_after: str | None = None) -> HTTPError:
+    headers = {"Retry-After": retry_after} if retry_after is not None else {}
+    return HTTPError("https://youtu.be/x", 429, "Too Many Requests", cast(Any, headers), None)
+
+
+def test_token_bucket_spends_its_burst_then_paces(clock):
+    bucket = TokenBucket(1000)
+
+    assert bucket.reserve(1000) == 0.0
+    assert bucket.reserve(500) == pytest.approx(0.5)
+    clock.now += 0.5
+    assert bucket.reserve(500) == pytest.approx(0.5)
+
+    bucket.consume(250)
+    assert clock.slept == [pytest.approx(0.75)]
+    clock.now += 60
+    assert bucket.reserve(1000) == 0.0
+
+
+def test_retry_delay_uses_full_jitter_up_to_the_cap(monkeypatch):
+    bounds = []
+    monkeypatch.setattr(download_scheduler.random, "uniform", lambda low, high: bounds.append((low, high)) or high)
+    policy = RetryPolicy(base_delay=2.0, max_delay=10.0)
+
+    assert [policy.delay(attempt) for attempt in range(4)] == [2.0, 4.0, 8.0, 10.0]
+    assert bounds[0] == (0, 2.0)
+    monkeypatch.setattr(download_scheduler.random, "uniform", lambda low, high: low)
+    assert policy.delay(3) == 0
+    assert policy.delay(3, retry_after=30.0) == 30.0
+
+
+def test_retry_after_accepts_seconds_and_http_dates(clock):
+    date = format_datetime(datetime.fromtimestamp(clock.now + 90, timezone.utc), usegmt=True)
+
+    assert download_scheduler.throttling(_throttled("12")) == (True, 12.0)
+    assert download_scheduler.throttling(_throttled(date)) == (True, pytest.approx(90.0))
+    assert download_scheduler.throttling(_throttled("soon")) == (True, None)
+    assert download_scheduler.throttling(RuntimeError("HTTP Error 503: busy")) == (True, None)
+    assert download_scheduler.throttling(RuntimeError("HTTP Error 404")) == (False, None)
+
+
+def test_backoff_pauses_the_whole_host_and_gives_up(clock, monkeypatch):
+    monkeypatch.setattr(download_scheduler.random, "uniform", lambda low, high: high)
+    scheduler = DownloadScheduler(retry=RetryPolicy(attempts=3, base_delay=1.0))
+
+    assert scheduler.backoff("https://www.youtube.com/watch?v=1", _throttled("5"), 0) == 5.0
+    assert scheduler._paused_until == {"youtube": clock.now + 5.0}
+    assert scheduler.backoff("https://youtu.be/2", _throttled(), 1) == 2.0
+    assert scheduler._paused_until == {"youtube": clock.now + 5.0}
+    assert scheduler.backoff("https://youtu.be/2", _throttled(), 2) is None
+    assert scheduler.backoff("https://youtu.be/2", RuntimeError("gone"), 0) is None
+
+
+def test_call_retries_throttled_transfers_after_sleeping(clock, monkeypatch):
+    monkeypatch.setattr(download_scheduler.random, "uniform", lambda low, high: high)
+    scheduler = DownloadScheduler(retry=RetryPolicy(attempts=3, base_delay=1.0))
+    outcomes = [_throttled(), _throttled(), "done"]
+
+    def transfer():
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    assert scheduler.call("https://youtu.be/1", transfer) == "done"
+    assert clock.slept == [1.0, 2.0]
+
+
+def test_host_limits_parse_and_group_youtube_hosts():
+    assert download_scheduler.parse_host_limits(" youtube=3, Drive.Google.com=2 ,") == {
+        "youtube": 3, "drive.google.com": 2,
+    }
+    for value in ("youtube", "youtube=0", "=2", "youtube=x"):
+        with pytest.raises(ValueError):
+            download_scheduler.parse_host_limits(value)
+    assert {download_scheduler.host_group(url) for url in (
+        "https://www.youtube.com/watch?v=1", "https://youtu.be/1", "https://rr1.googlevideo.com/x",
+    )} == {"youtube"}
+    scheduler = DownloadScheduler({"a.test": 2}, default_limit=3)
+    urls = ["https://a.test/1", "https://a.test/2", "https://a.test/3", "https://b.test/1"]
+    assert scheduler.concurrency(urls) == 3
+    assert scheduler.concurrency(urls, max_workers=2) == 2
+
+
+def test_map_interleaves_hosts_round_robin_and_keeps_order():
+    scheduler = DownloadScheduler({}, default_limit=1)
+    items = ["https://a.test/1", "https://a.test/2", "https://a.test/3", "https://b.test/1", "https://b.test/2"]
+    started: list[str] = []
+
+    def transfer(url: str) -> str:
+        started.append(url)
+        return url.upper()
+
+    assert scheduler.map(transfer, items, lambda url: url, max_workers=1) == [url.upper() for url in items]
+    assert started == [items[0], items[3], items[1], items[4], items[2]]
+
+
+def test_map_never_exceeds_a_host_limit():
+    scheduler = DownloadScheduler({"a.test": 2}, default_limit=1)
+    items = [f"https://a.test/{index}" for index in range(6)] + [f"https://b.test/{index}" for index in range(3)]
+    lock = threading.Lock()
+    running: dict[str, int] = {}
+    peak: dict[str, int] = {}
+
+    def transfer(url: str) -> None:
+        host = download_scheduler.host_group(url)
+        with lock:
+            running[host] = running.get(host, 0) + 1
+            peak[host] = max(peak.get(host, 0), running[host])
+        time.sleep(0.02)
+        with lock:
+            running[host] -= 1
+
+    scheduler.map(transfer, items, lambda url: url)
+    assert peak == {"a.test": 2, "b.test": 1}
+
+
+def test_map_stops_starting_transfers_after_a_failure():
+    scheduler = DownloadScheduler({}, default_limit=1)
+    started: list[str] = []
+
+    def transfer(url: str) -> None:
+        started.append(url)
+        raise RuntimeError(f"broken {url}")
+
+    with pytest.raises(RuntimeError, match="broken https://a.test/1"):
+        scheduler.map(transfer, ["https://a.test/1", "https://a.test/2"], lambda url: url)
+    assert started == ["https://a.test/1"]
+
+
+def test_slots_share_the_host_limit_with_map():
+    scheduler = DownloadScheduler({}, default_limit=1)
+    order: list[str] = []
+    holding = threading.Event()
+    release = threading.Event()
+
+    def stream() -> None:
+        with scheduler.slot("https://a.test/stream"):
+            order.append("stream")
+            holding.set()
+            release.wait(5)
+            order.append("stream done")
+
+    thread = threading.Thread(target=stream)
+    thread.start()
+    holding.wait(5)
+    threading.Timer(0.05, release.set).start()
+    scheduler.map(order.append, ["https://a.test/1"], lambda url: url)
+    thread.join()
+
+    assert order == ["stream", "stream done", "https://a.test/1"]
+    assert scheduler._active["a.test"] == 0
@@ -0,0 +1,51 @@
+import json
+import subprocess as sp
+
+import pytest
+
+import ffmpeg_tools
+
+TAGS = ffmpeg_tools.MediaTags("Artist - Title", "Artist", "2024", "", "2024", "Sweden", "swe")
+
+
+def _probe_result(video="av1", audio="opus", height=1080, title=TAGS.title, album_artist=TAGS.album_artist):
+    streams = [{"codec_type": "video", "codec_name": video, "height": height}] if video else []
+    streams += [{"codec_type": "audio", "codec_name": audio}] if audio else []
+    tags = {"TITLE": title} if title is not None else {}
+    if album_artist is not None:
+        tags["album_artist"] = album_artist
+    return json.dumps({"streams": streams, "format": {"tags": tags}})
+
+
+def _media(stdout: str) -> ffmpeg_tools.FFmpeg:
+    def run(command, **kwargs):
+        return sp.CompletedProcess(command, 0, stdout.encode(), b"")
+
+    return ffmpeg_tools.FFmpeg("ffmpeg", "ffprobe", run)
+
+
+def test_tagged_av1_opus_source_is_moved_into_place(tmp_path):
+    source, output = tmp_path / "merged.mkv", tmp_path / "ws2024se.mov"
+    source.write_bytes(b"merged")
+
+    codecs = _media(_probe_result()).move_if_tagged(source, output, TAGS, maximum_height=1080)
+
+    assert codecs == ffmpeg_tools.StreamCodecs(video="av1", audio="opus")
+    assert output.read_bytes() == b"merged" and not source.exists()
+
+
+@pytest.mark.parametrize("probe", [
+    {"video": "vp9"},
+    {"audio": "aac"},
+    {"audio": None},
+    {"height": 2160},
+    {"title": "Another title"},
+    {"title": None},
+    {"album_artist": None},
+])
+def test_sources_needing_a_remux_are_left_alone(tmp_path, probe):
+    source, output = tmp_path / "merged.mkv", tmp_path / "ws2024se.mov"
+    source.write_bytes(b"merged")
+
+    assert _media(_probe_result(**probe)).move_if_tagged(source, output, TAGS, maximum_height=1080) is None
+    assert source.exists() and not output.exists()
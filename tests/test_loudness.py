@@ -0,0 +1,77 @@
+from pathlib import Path
+import subprocess as sp
+
+import pytest
+
+import ffmpeg_tools
+import loudness
+
+
+FRAMELOG = (Path(__file__).parent / "data" / "ebur128_framelog.txt").read_text()
+
+
+def test_parse_framelog_reads_every_frame_line():
+    index = loudness.parse_framelog(FRAMELOG)
+
+    assert index.shape == (40, 4)
+    assert index[0, 0] == pytest.approx(0.1)
+    assert index[-1, 0] == pytest.approx(4.0)
+    assert index[3, 1] == pytest.approx(-16.0)
+    assert index[-1, 2] == pytest.approx(-15.0)
+    assert index[3, 3] == pytest.approx(-5.1)
+
+
+def test_measure_matches_the_framelog():
+    measurement = loudness.measure(loudness.parse_framelog(FRAMELOG), 0.0, 4.0)
+
+    assert measurement.integrated == pytest.approx(-16.0)
+    assert measurement.threshold == pytest.approx(-26.0)
+    assert measurement.true_peak == pytest.approx(-5.1)
+    assert measurement.lra == pytest.approx(1.7)
+    assert measurement.is_linear()
+
+
+def test_loudness_log_asks_for_printed_frame_lines(tmp_path):
+    commands = []
+
+    def run(command, **kwargs):
+        commands.append(command)
+        return sp.CompletedProcess(command, 0, b"", FRAMELOG.encode())
+
+    media = ffmpeg_tools.FFmpeg("ffmpeg", "ffprobe", run)
+
+    assert loudness.parse_framelog(media.loudness_log(tmp_path / "song.flac")).shape == (40, 4)
+    loglevel = commands[0][commands[0].index("-loglevel") + 1]
+    frame_level = commands[0][commands[0].index("-af") + 1].rpartition("framelog=")[2]
+    assert (loglevel, frame_level) == ("info", "info")
+
+
+def test_dynamic_normalization_takes_the_offset_from_a_first_pass(tmp_path):
+    first_pass = (
+        '[Parsed_loudnorm_0 @ 0x1] \n{\n\t"input_i" : "-24.10",\n\t"input_tp" : "-0.40",\n'
+        '\t"input_lra" : "14.20",\n\t"input_thresh" : "-34.60",\n\t"output_i" : "-14.30",\n'
+        '\t"output_tp" : "-1.50",\n\t"output_lra" : "9.80",\n\t"output_thresh" : "-24.50",\n'
+        '\t"normalization_type" : "dynamic",\n\t"target_offset" : "0.30"\n}\n'
+    )
+    commands = []
+
+    def run(command, **kwargs):
+        commands.append(command)
+        return sp.CompletedProcess(command, 0, b"", first_pass.encode())
+
+    media = ffmpeg_tools.FFmpeg("ffmpeg", "ffprobe", run)
+    dynamic = ffmpeg_tools.LoudnessMeasurement(integrated=-24.1, true_peak=-0.4, lra=14.2, threshold=-34.6)
+
+    assert not dynamic.is_linear()
+    assert media.loudnorm_filter(tmp_path / "song.flac", 10.0, 20.0, "two-pass", dynamic).endswith(
+        ":measured_thresh=-34.60:offset=0.30:linear=true:print_format=summary"
+    )
+    assert len(commands) == 1
+
+    linear = loudness.measure(loudness.parse_framelog(FRAMELOG), 0.0, 4.0)
+    suffix = media.loudnorm_filter(tmp_path / "song.flac", 0.0, 4.0, "two-pass", linear)
+    assert suffix == (
+        ",loudnorm=I=-14:TP=-1.5:LRA=11:measured_I=-16.0:measured_TP=-5.1:"
+        "measured_LRA=1.7:measured_thresh=-26.0:linear=true:print_format=summary"
+    )
+    assert len(commands) == 1
@@ -0,0 +1,81 @@
+import hashlib
+
+import app_cache
+import download
+
+BODY = bytes(range(256)) * 64
+
+
+def test_finished_partial_of_unknown_size_completes_on_416(cache_database, file_server, tmp_path):
+    file_server.body = BODY
+    file_server.headers = {"ETag": '"v1"'}
+    destination = tmp_path / "file.download.mov"
+    destination.write_bytes(BODY)
+    app_cache.store_partial_download(destination, file_server.url, None, '"v1"')
+
+    digest = download.download_direct(file_server.url, destination)
+
+    assert digest == download.ContentDigest(hashlib.sha256(BODY).hexdigest(), len(BODY))
+    assert file_server.requests[0]["Range"] == f"bytes={len(BODY)}-"
+    assert app_cache.cached_partial_download(destination) is None
+
+
+def test_partial_longer_than_the_file_starts_over_on_416(cache_database, file_server, tmp_path):
+    file_server.body = BODY
+    file_server.headers = {"ETag": '"v1"'}
+    destination = tmp_path / "file.download.mov"
+    destination.write_bytes(BODY + b"stale tail")
+    app_cache.store_partial_download(destination, file_server.url, None, '"v1"')
+
+    download.download_direct(file_server.url, destination)
+
+    assert destination.read_bytes() == BODY
+    assert [request.get("Range") for request in file_server.requests] == [f"bytes={len(BODY) + 10}-", None]
+
+
+def test_interrupted_partial_resumes_with_if_range(cache_database, file_server, tmp_path):
+    file_server.body = BODY
+    file_server.headers = {"ETag": '"v1"'}
+    destination = tmp_path / "file.download.mov"
+    destination.write_bytes(BODY[:1000])
+    app_cache.store_partial_download(destination, file_server.url, len(BODY), '"v1"')
+
+    digest = download.download_direct(file_server.url, destination)
+
+    assert destination.read_bytes() == BODY
+    assert digest.sha256 == hashlib.sha256(BODY).hexdigest()
+    assert (file_server.requests[0]["Range"], file_server.requests[0]["If-Range"]) == ("bytes=1000-", '"v1"')
+
+
+def test_downloads_directory_is_separate_per_output_directory(tmp_path, monkeypatch):
+    monkeypatch.setattr(app_cache, "user_cache_path", lambda *args, **kwargs: tmp_path / "cache")
+    first = app_cache.downloads_directory(tmp_path / "a")
+    second = app_cache.downloads_directory(tmp_path / "b")
+
+    assert first != second and first.is_dir() and second.is_dir()
+    assert app_cache.downloads_directory(tmp_path / "a") == first
+
+
+def test_google_drive_partial_of_a_resized_file_is_fetched_again(cache_database, tmp_path, monkeypatch):
+    url = "https://drive.google.com/file/d/abcdefghijklmnopqrstuvwxy/view"
+    destination = tmp_path / "file.download.mov"
+    (tmp_path / "file.download.movx1.part").write_bytes(b"old")
+    app_cache.store_partial_download(destination, url, 50, None)
+    calls = []
+
+    def gdown_download(id, output, progress, hasher, **kwargs):
+        calls.append(id)
+        body = b"new content"
+        for path in tmp_path.glob("*.part"):
+            path.unlink()
+        hasher.update(body)
+        progress(len(body), len(body))
+        (tmp_path / "file.download.mov").write_bytes(body)
+        return output
+
+    monkeypatch.setattr(download, "gdown_download", gdown_download)
+    fetched = download.fetch_external(url, "v", destination, download.DownloadSettings(None, "ffmpeg"))
+
+    assert len(calls) == 2
+    assert fetched.content == download.ContentDigest(hashlib.sha256(b"new content").hexdigest(), 11)
+    assert app_cache.cached_partial_download(destination) is None
@@ -0,0 +1,201 @@
+import hashlib
+import io
+import os
+import shutil
+
+import boto3
+from boto3.s3.transfer import TransferConfig
+import pytest
+from moto import mock_aws
+
+import app_cache
+import prepare
+
+BUCKET = "recaps"
+MIB = 1024 * 1024
+PART = prepare.MINIMUM_PART_SIZE
+TRANSFER = prepare.TransferSettings(multipart_threshold=PART, part_size=PART, concurrency=2)
+TUNED = prepare.TransferSettings(multipart_threshold=64 * 1024 * 1024, part_size=32 * 1024 * 1024, concurrency=2)
+
+
+@pytest.fixture
+def s3(cache_database, monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    with mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        yield prepare.S3Config("https://s3.example.test", BUCKET, "default"), client
+
+
+@pytest.fixture
+def messages(monkeypatch):
+    """Capture the module's status and error handles, which are bound at import."""
+    out, err = io.StringIO(), io.StringIO()
+    monkeypatch.setattr(prepare, "OUT_HANDLE", out)
+    monkeypatch.setattr(prepare, "ERR_HANDLE", err)
+    return out, err
+
+
+class FailingParts:
+    """Forward to a real client, failing every upload of the given part numbers."""
+
+    def __init__(self, client, failing: set[int]):
+        self.client = client
+        self.failing = failing
+        self.sent: list[int] = []
+
+    def upload_part(self, **kwargs):
+        if kwargs["PartNumber"] in self.failing:
+            raise OSError("connection reset")
+        self.sent.append(kwargs["PartNumber"])
+        return self.client.upload_part(**kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+
+def test_small_upload_is_skipped_when_unchanged(s3, tmp_path, messages):
+    config, client = s3
+    path = tmp_path / "song.m4a"
+    path.write_bytes(b"audio")
+    prepare.upload(path, config, client, transfer=TRANSFER)
+    head = client.head_object(Bucket=BUCKET, Key="song.m4a")
+    assert head["ContentType"] == "audio/mp4"
+
+    prepare.upload(path, config, client, transfer=TRANSFER)
+    assert "Skipping unchanged upload" in messages[0].getvalue()
+
+
+def test_interrupted_multipart_upload_resumes_missing_parts(s3, tmp_path):
+    config, client = s3
+    path = tmp_path / "video.mov"
+    data = bytes(range(256)) * (PART * 2 // 256) + b"tail"
+    path.write_bytes(data)
+
+    flaky = FailingParts(client, failing={3})
+    with pytest.raises(RuntimeError, match="Could not upload"):
+        prepare.upload(path, config, flaky, transfer=TRANSFER)
+    state = app_cache.cached_multipart_upload(config.endpoint_url, BUCKET, "video.mov")
+    assert state is not None and sorted(state.parts) == [1, 2]
+
+    resumed = FailingParts(client, failing=set())
+    prepare.upload(path, config, resumed, transfer=TRANSFER)
+    assert resumed.sent == [3]
+    assert client.get_object(Bucket=BUCKET, Key="video.mov")["Body"].read() == data
+    assert app_cache.cached_multipart_upload(config.endpoint_url, BUCKET, "video.mov") is None
+
+
+def test_changed_file_discards_cached_multipart_upload(s3, tmp_path):
+    config, client = s3
+    path = tmp_path / "video.mov"
+    path.write_bytes(b"a" * (PART + 1))
+    with pytest.raises(RuntimeError):
+        prepare.upload(path, config, FailingParts(client, failing={2}), transfer=TRANSFER)
+
+    path.write_bytes(b"b" * (PART + 2))
+    resumed = FailingParts(client, failing=set())
+    prepare.upload(path, config, resumed, transfer=TRANSFER)
+    assert sorted(resumed.sent) == [1, 2]
+    assert client.get_object(Bucket=BUCKET, Key="video.mov")["Body"].read() == path.read_bytes()
+    assert client.list_multipart_uploads(Bucket=BUCKET).get("Uploads", []) == []
+
+
+def test_invalid_transfer_settings_are_reported(s3, tmp_path, monkeypatch, messages):
+    config, client = s3
+    path = tmp_path / "song.m4a"
+    path.write_bytes(b"audio")
+    monkeypatch.setattr(prepare.app_config, "recap_settings", lambda: {
+        "upload_multipart_threshold": "1K", "upload_part_size": "8M",
+        "upload_concurrency": "4", "upload_dedup": "metadata",
+    })
+    with pytest.raises(RuntimeError, match="Invalid upload settings"):
+        prepare.upload(path, config, client)
+    assert "at least 5 MiB" in messages[1].getvalue()
+
+
+@pytest.mark.parametrize("chunk_size", [8 * 1024 * 1024, 6 * 1024 * 1024])
+def test_reconciled_objects_from_untuned_uploads_are_not_sent_again(s3, tmp_path, messages, chunk_size):
+    config, client = s3
+    path = tmp_path / "ws2024se.mov"
+    path.write_bytes(bytes(range(256)) * (17 * 1024 * 1024 // 256))
+    # Historical objects were uploaded with boto3's defaults or other part sizes, without metadata.
+    client.upload_file(str(path), BUCKET, path.name, Config=TransferConfig(
+        multipart_threshold=prepare.DEFAULT_BOTO_PART_SIZE, multipart_chunksize=chunk_size,
+    ))
+    assert client.head_object(Bucket=BUCKET, Key=path.name)["ETag"].endswith('-3"')
+
+    prepare.reconcile_upload_cache(prepare.UploadSession(config, client))
+    sent = FailingParts(client, failing=set())
+    prepare.upload(path, config, sent, transfer=TUNED)
+
+    assert "Skipping unchanged upload" in messages[0].getvalue()
+    assert "Uploading" not in messages[0].getvalue()
+    assert sent.sent == []
+    prepare.upload(path, config, sent, transfer=TUNED)
+    assert messages[0].getvalue().count("Skipping unchanged upload") == 2
+
+
+CONTENT = prepare.TransferSettings(multipart_threshold=PART, part_size=PART, concurrency=2, dedup="content")
+
+
+def test_touched_or_copied_files_are_skipped_by_content(s3, tmp_path, messages):
+    config, client = s3
+    path = tmp_path / "ws2024se.mov"
+    path.write_bytes(b"v" * (PART + 3))
+    prepare.upload(path, config, client, transfer=CONTENT)
+
+    os.utime(path, ns=(1, 1))
+    prepare.upload(path, config, client, transfer=CONTENT)
+    copy = tmp_path / "copy" / path.name
+    copy.parent.mkdir()
+    shutil.copyfile(path, copy)
+    sent = FailingParts(client, failing=set())
+    prepare.upload(copy, config, sent, transfer=CONTENT)
+
+    assert messages[0].getvalue().count("Skipping unchanged upload") == 2
+    assert messages[0].getvalue().count("Uploading") == 1
+    assert sent.sent == []
+
+
+def test_content_digest_is_cached_per_part_size(cache_database, tmp_path):
+    path = tmp_path / "video.mov"
+    path.write_bytes(b"a" * (2 * PART + 1))
+    digest = prepare.content_digest(path, TRANSFER)
+    parts = [hashlib.md5(b"a" * PART).digest()] * 2 + [hashlib.md5(b"a").digest()]
+    assert digest == prepare.ContentDigest(
+        hashlib.md5(path.read_bytes()).hexdigest(), hashlib.md5(b"".join(parts)).hexdigest() + "-3", PART,
+    )
+    assert prepare.content_digest(path, TRANSFER, 3 * PART).multipart_etag.endswith("-1")
+
+    # Same size and mtime: the cached digests are returned without reading the file.
+    stat = path.stat()
+    path.write_bytes(b"b" * (2 * PART + 1))
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert prepare.content_digest(path, TRANSFER) == digest
+    assert app_cache.cached_file_digest(path, 3 * PART) is not None
+
+
+def test_remote_object_without_metadata_is_matched_by_etag(s3, tmp_path, messages):
+    config, client = s3
+    path = tmp_path / "ws2024se.mov"
+    path.write_bytes(b"x" * (2 * prepare.DEFAULT_BOTO_PART_SIZE + 5))
+    client.upload_file(str(path), BUCKET, path.name)
+
+    prepare.upload(path, config, client, transfer=CONTENT)
+
+    assert "Skipping upload of identical remote content" in messages[0].getvalue()
+    etag = client.head_object(Bucket=BUCKET, Key=path.name)["ETag"].strip('"')
+    assert app_cache.remote_upload_record(config.endpoint_url, BUCKET, path.name) is None
+    assert app_cache.is_cached_upload(path, config.endpoint_url, BUCKET, etag=etag)
+
+
+@pytest.mark.parametrize(("etag", "size", "expected"), [
+    ("abc", 10, []),
+    ("abc-3", 17 * MIB, [8 * MIB, 6 * MIB]),
+    ("abc-1", 17 * MIB, [32 * MIB, 17 * MIB]),
+    ("abc-4", 100 * MIB, [32 * MIB, 25 * MIB]),
+    ("abc-20", 10 * MIB, []),
+])
+def test_etag_part_sizes(etag, size, expected):
+    assert prepare.etag_part_sizes(etag, size, TUNED) == expected
@@ -0,0 +1,75 @@
+from typing import Any, cast
+
+import pytest
+
+import ffmpeg_tools
+import recap
+
+
+class FakeMedia:
+    """Answer the probes build_graph makes without running ffprobe."""
+
+    def probe_media(self, path):
+        return ffmpeg_tools.MediaProbe(has_audio=True, has_picture=False, has_video=True)
+
+    def loudnorm_filter(self, path, start, duration, mode, measurement=None):
+        return ""
+
+
+@pytest.mark.parametrize(("value", "expected"), [
+    ("low=481,crf=40", ffmpeg_tools.Rendition("low", height=480, av1_crf=40)),
+    ("small=640x360,preset=10", ffmpeg_tools.Rendition("small", size=(640, 360), av1_preset=10)),
+    ("audio=audio", ffmpeg_tools.Rendition("audio", audio_only=True)),
+])
+def test_parse_rendition(value, expected):
+    assert recap.parse_rendition(value) == expected
+
+
+@pytest.mark.parametrize("value", ["low", "low=1", "low=480,crf=x", "low=480,bitrate=3"])
+def test_parse_rendition_rejects_invalid_values(value):
+    with pytest.raises(ValueError):
+        recap.parse_rendition(value)
+
+
+def test_audio_only_job_builds_a_graph_without_video(args, tmp_path):
+    args.size = (1920, 1080)
+    source = tmp_path / "song.mov"
+    source.write_bytes(b"")
+    row = recap.Data("01", "sf1", "SE", "Artist", "Title", source, 50.0, 70.0, "v", None)
+    audio = ffmpeg_tools.Rendition("audio", audio_only=True)
+
+    inputs, graph, count = recap.build_graph([row], args, cast(Any, FakeMedia()), video=False)
+    split, labels = ffmpeg_tools.rendition_filters([audio], args.size)
+
+    assert (inputs.count("-i"), count) == (1, 1)
+    assert "[vout]" not in graph + "".join(split)
+    assert graph.rstrip().endswith("concat=n=1:v=0:a=1[aout]")
+    assert labels == [(None, "[aout0]")]
+
+
+def test_job_needs_video_unless_every_output_is_audio_only(tmp_path):
+    def job(*renditions):
+        outputs = [recap.RecapOutput(rendition, tmp_path / "x", "") for rendition in renditions]
+        return recap.RenderJob("2026sf1", [], tmp_path, tmp_path, outputs, False)
+
+    assert not job(ffmpeg_tools.Rendition("audio", audio_only=True)).video
+    assert job(ffmpeg_tools.Rendition(), ffmpeg_tools.Rendition("audio", audio_only=True)).video
+
+
+@pytest.mark.parametrize(("aspect", "source_height", "expected"), [
+    (16 / 9, 1080, "bilinear"),
+    (16 / 9, 1090, "bilinear"),
+    (4 / 3, 1080, "bilinear"),
+    (16 / 9, 2160, "area"),
+    (16 / 9, 3240, "area"),
+    (16 / 9, 1440, "lanczos"),
+    (16 / 9, 720, "lanczos"),
+    (21 / 9, 2160, "lanczos"),
+])
+def test_video_scaler_choice(aspect, source_height, expected):
+    source = ffmpeg_tools.VideoProperties(aspect, source_height)
+    assert recap.video_scaler(source, 1920, 1080) == expected
+
+
+def test_unprobed_sources_use_lanczos():
+    assert recap.video_scaler(None, 1920, 1080) == "lanczos"
@@ -0,0 +1,26 @@
+import numpy as np
+
+import snippets
+
+
+def _noise(seconds: float, level: float, rng: np.random.Generator) -> np.ndarray:
+    return (level * rng.standard_normal(int(seconds * snippets.SAMPLE_RATE))).astype(np.float32)
+
+
+def test_suggestions_stay_within_the_decoded_audio():
+    rng = np.random.default_rng(1)
+    suggestion = snippets.suggest(_noise(15, 0.1, rng))
+
+    assert suggestion.snippet_end <= 15
+    assert suggestion.snippet2_end <= 15
+    assert len(snippets.features(_noise(15.5, 0.1, rng))[0]) == 15
+
+
+def test_a_loud_section_is_suggested_where_it_plays():
+    rng = np.random.default_rng(2)
+    samples = np.concatenate([_noise(120, 0.02, rng), _noise(20, 0.5, rng), _noise(60, 0.02, rng)])
+
+    suggestion = snippets.suggest(samples)
+
+    assert abs(suggestion.snippet_start - 120) <= 1
+    assert 120 <= suggestion.snippet2_start <= suggestion.snippet2_end <= 140